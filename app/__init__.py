@@ -17,9 +17,36 @@ def create_app(config=None):
             'DATABASE_URL',
             'postgresql://localhost/worker_resource_tracking'
         )
+        
+        # Connection pool settings (see app.database.ConnectionPool)
+        for key in ('DB_POOL_MIN_SIZE', 'DB_POOL_MAX_SIZE', 'DB_POOL_TIMEOUT',
+                    'DB_POOL_MAX_LIFETIME', 'DB_POOL_HEALTH_CHECK_INTERVAL'):
+            if os.getenv(key):
+                app.config[key] = os.getenv(key)
+        
+        # In-memory headcount index (see app.headcount)
+        app.config['HEADCOUNT_INDEX'] = os.getenv('HEADCOUNT_INDEX', '').lower() in ('1', 'true', 'yes')
+        app.config['HEADCOUNT_INDEX_MAX_AGE'] = float(os.getenv('HEADCOUNT_INDEX_MAX_AGE', 300))
+        
+        # As-of query engine: 'sql' or 'memory' (see app.bitemporal)
+        app.config['AS_OF_ENGINE'] = os.getenv('AS_OF_ENGINE', 'sql').lower()
+        app.config['AS_OF_INDEX_MAX_AGE'] = float(os.getenv('AS_OF_INDEX_MAX_AGE', 300))
+        
+        # Columnar resource snapshot (see app.snapshot)
+        app.config['RESOURCE_SNAPSHOT'] = os.getenv('RESOURCE_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+        app.config['RESOURCE_SNAPSHOT_MAX_STALENESS'] = float(os.getenv('RESOURCE_SNAPSHOT_MAX_STALENESS', 5))
+        
+        # As-of query result cache (see app.cache)
+        app.config['AS_OF_CACHE'] = os.getenv('AS_OF_CACHE', '').lower() in ('1', 'true', 'yes')
+        app.config['AS_OF_CACHE_MAX_BYTES'] = int(os.getenv('AS_OF_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        app.config['AS_OF_CACHE_NOW_TTL'] = float(os.getenv('AS_OF_CACHE_NOW_TTL', 5))
+        
+        # Forecast and budget series cache (see app.cache)
+        app.config['FORECAST_CACHE'] = os.getenv('FORECAST_CACHE', '').lower() in ('1', 'true', 'yes')
+        app.config['FORECAST_CACHE_MAX_BYTES'] = int(os.getenv('FORECAST_CACHE_MAX_BYTES', 16 * 1024 * 1024))
     
     # Enable CORS for frontend
-    CORS(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'ETag'])
     
     # Initialize database
     init_db(app)
@@ -30,8 +57,19 @@ def create_app(config=None):
     except Exception as e:
         app.logger.warning(f"Could not load static data: {e}")
     
+    # Materialize forecast rows missing for any budget date
+    try:
+        from app.services import ForecastService
+        ForecastService.backfill()
+    except Exception as e:
+        app.logger.warning(f"Could not backfill forecasts: {e}")
+    
     # Register blueprints
     from app.routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+    
     return app
@@ -0,0 +1,215 @@
+"""In-memory bi-temporal index over resource versions.
+
+Versions are indexed by processing period in a static centered interval
+tree, so an as-of lookup visits only the versions whose processing period
+contains the requested time and then filters them on business time. Writes
+made after the tree was built are kept in a small overlay (new versions and
+closed proc_end values) that is folded into a fresh tree once it grows.
+"""
+import threading
+import time
+from bisect import bisect_right
+from app.cache import ProcessWide, older_than
+from app.models import INFINITY_DATETIME
+
+
+ROW_FIELDS = ('rid', 'version', 'wid', 'name', 'org', 'type',
+              'res_start', 'res_end', 'proc_start', 'proc_end')
+
+
+class _Node:
+    """Interval tree node holding the intervals that contain its center."""
+    
+    __slots__ = ('center', 'by_start', 'starts', 'by_end', 'left', 'right')
+    
+    def __init__(self, center, items):
+        self.center = center
+        self.by_start = sorted(items, key=lambda row: row['proc_start'])
+        self.starts = [row['proc_start'] for row in self.by_start]
+        self.by_end = sorted(items, key=lambda row: row['proc_end'], reverse=True)
+        self.left = None
+        self.right = None
+
+
+def _build(rows):
+    """Build a centered interval tree over the [proc_start, proc_end) periods of rows."""
+    if not rows:
+        return None
+    starts = sorted(row['proc_start'] for row in rows)
+    center = starts[len(starts) // 2]
+    here, left, right = [], [], []
+    for row in rows:
+        if row['proc_end'] <= center:
+            left.append(row)
+        elif row['proc_start'] > center:
+            right.append(row)
+        else:
+            here.append(row)
+    node = _Node(center, here)
+    node.left = _build(left)
+    node.right = _build(right)
+    return node
+
+
+def _stab(node, t, out):
+    """Append every row whose processing period contains t."""
+    while node is not None:
+        if t < node.center:
+            # Node rows end after the center, so only the start matters
+            out.extend(node.by_start[:bisect_right(node.starts, t)])
+            node = node.left
+        else:
+            # Node rows start at or before the center, so only the end matters
+            for row in node.by_end:
+                if row['proc_end'] <= t:
+                    break
+                out.append(row)
+            node = node.right
+
+
+class BitemporalIndex:
+    """Answers as-of queries over resource versions joined with workers."""
+    
+    def __init__(self, rows=(), rebuild_threshold=1024):
+        self._lock = threading.Lock()
+        self._rebuild_threshold = rebuild_threshold
+        self._rows = {}        # (rid, version) -> row dict
+        self._tree = None
+        self._recent = []      # rows added since the tree was built
+        self._closed = {}      # (rid, version) -> proc_end set since the tree was built
+        self.loaded_at = time.monotonic()
+        for row in rows:
+            self._rows[(row['rid'], row['version'])] = dict(row)
+        self._rebuild()
+    
+    @classmethod
+    def load(cls, cursor):
+        """
+        Build an index from every resource version in the database.
+        
+        Args:
+            cursor: Cursor to read resource and worker rows with
+        
+        Returns:
+            A populated BitemporalIndex
+        """
+        cursor.execute(
+            """SELECT r.RID, r.version, r.WID, w.name, w.org, w.type,
+                      r.res_start, r.res_end, r.proc_start, r.proc_end
+               FROM resource r
+               JOIN worker w ON r.WID = w.WID"""
+        )
+        return cls(cursor.fetchall())
+    
+    def _rebuild(self):
+        """Fold the overlay into a new tree. Caller holds the lock (or is __init__)."""
+        self._tree = _build([
+            row for row in self._rows.values() if row['proc_start'] < row['proc_end']
+        ])
+        self._recent = []
+        self._closed = {}
+    
+    def _maybe_rebuild(self):
+        if len(self._recent) + len(self._closed) > self._rebuild_threshold:
+            self._rebuild()
+    
+    def add_version(self, row):
+        """
+        Add a new resource version.
+        
+        Args:
+            row: Mapping with the fields in ROW_FIELDS
+        """
+        row = {field: row[field] for field in ROW_FIELDS}
+        with self._lock:
+            self._rows[(row['rid'], row['version'])] = row
+            self._recent.append(row)
+            self._maybe_rebuild()
+    
+    def close_version(self, rid, version, proc_end):
+        """
+        Set the processing end of an existing version.
+        
+        Args:
+            rid: Resource ID
+            version: Version being closed
+            proc_end: Processing end datetime
+        """
+        with self._lock:
+            key = (rid, version)
+            row = self._rows.get(key)
+            if row is None:
+                return
+            # Replace rather than mutate so rows already handed out stay unchanged
+            self._rows[key] = dict(row, proc_end=proc_end)
+            if any(r is row for r in self._recent):
+                self._recent = [self._rows[key] if r is row else r for r in self._recent]
+            else:
+                self._closed[key] = proc_end
+            self._maybe_rebuild()
+    
+    def as_of(self, business_date, processing_datetime):
+        """
+        Get versions valid at a processing time and active on a business date.
+        
+        Same predicate as the SQL as-of query:
+        proc_start <= processing_datetime < proc_end and
+        res_start <= business_date < res_end.
+        
+        Returns:
+            List of row dicts with the fields in ROW_FIELDS
+        """
+        t = processing_datetime
+        candidates = []
+        with self._lock:
+            _stab(self._tree, t, candidates)
+            closed = self._closed
+            recent = self._recent
+            result = []
+            for row in candidates:
+                proc_end = closed.get((row['rid'], row['version']), row['proc_end'])
+                if t < proc_end and row['res_start'] <= business_date < row['res_end']:
+                    result.append(dict(row, proc_end=proc_end) if proc_end != row['proc_end'] else row)
+            for row in recent:
+                if (row['proc_start'] <= t < row['proc_end']
+                        and row['res_start'] <= business_date < row['res_end']):
+                    result.append(row)
+        return result
+    
+    def __len__(self):
+        return len(self._rows)
+
+
+_index = ProcessWide()
+
+
+def get_bitemporal_index(max_age=None):
+    """
+    Get the process-wide bi-temporal index, loading it on first use.
+    
+    Writes made by other processes reach it only when it is rebuilt, once
+    it is older than max_age seconds.
+    
+    Args:
+        max_age: Seconds before the index is reloaded, or None to never reload
+    """
+    return _index.get(lambda index, conn: BitemporalIndex.load(conn.cursor()), older_than(max_age))
+
+
+def loaded_bitemporal_index():
+    """Get the bi-temporal index if it has been loaded, else None."""
+    return _index.loaded()
+
+
+def reset_bitemporal_index():
+    """Drop the process-wide index so the next use reloads it."""
+    _index.reset()
+
+
+def open_row(rid, version, wid, name, org, type_, res_start, res_end, proc_start):
+    """Build an index row for a newly created open version."""
+    return {
+        'rid': rid, 'version': version, 'wid': wid, 'name': name, 'org': org,
+        'type': type_, 'res_start': res_start, 'res_end': res_end,
+        'proc_start': proc_start, 'proc_end': INFINITY_DATETIME,
+    }
@@ -0,0 +1,329 @@
+"""In-process caches of query results.
+
+LRUCache is a mapping bounded by the estimated memory held by its values,
+with hit, miss, eviction and invalidation counters. AsOfCache keeps as-of query results
+in one: processing time only moves forward for writes made through the
+application, so the answer for a processing time safely in the past does
+not change. Those entries are kept until evicted, or until the database's
+history version moves (a write that may have changed the past: a backdated
+insert, a delete or truncate, a worker or org change; see
+present_write). Entries for the current time are short-lived and are
+dropped by any write. ForecastBudgetCache keeps each org's budget and
+forecast series while no resource, worker or budget row of its subtree has
+been written (see get_org_data_versions). ProcessWide holds one in-process
+engine (an index or snapshot) per process, loaded from committed data.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.database import get_connection, release_connection
+from app.models import local_naive
+
+
+# Items sampled when estimating the size of a long list
+SIZE_SAMPLE = 100
+
+_MISSING = object()
+
+
+def estimate_size(value):
+    """
+    Approximate the bytes held by value.
+    
+    Lists, tuples and dicts are walked (dict keys are assumed shared between
+    rows and not counted); long lists are estimated from a sample of their items.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        if len(value) > SIZE_SAMPLE:
+            step = len(value) // SIZE_SAMPLE
+            sample = value[::step][:SIZE_SAMPLE]
+            return size + sum(estimate_size(item) for item in sample) * len(value) // len(sample)
+        return size + sum(estimate_size(item) for item in value)
+    return size
+
+
+class LRUCache:
+    """Least recently used mapping bounded by the total estimated size of its values."""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key, default=None, valid=None):
+        """
+        Get the value cached for key, counting a hit or a miss.
+        
+        Args:
+            valid: Optional check of the cached value; a value failing it is
+                dropped and counted as an invalidation and a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and valid is not None and not valid(entry[0]):
+                self._remove(key)
+                self.invalidations += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value, size=None):
+        """
+        Cache value under key, evicting least recently used entries to make room.
+        
+        Args:
+            size: Bytes held by value, estimated when None
+        
+        Returns:
+            Whether value was cached (a value larger than max_bytes is not)
+        """
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return False
+            while self.bytes + size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self.bytes += size
+            return True
+    
+    def discard(self, key):
+        """Drop the entry for key, if any."""
+        with self._lock:
+            self._remove(key)
+    
+    def discard_where(self, predicate):
+        """Drop the entries whose key satisfies predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+    
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+    
+    def stats(self):
+        """Get entry, byte, hit, miss, eviction and invalidation counts."""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class ProcessWide:
+    """
+    One value per process, loaded from the database on first use and reloaded on demand.
+    
+    Loads read committed data on a pool connection of their own, outside the
+    request's unit of work: the writes of that unit reach the value through
+    on_commit once they commit, and would otherwise be applied twice.
+    """
+    
+    def __init__(self):
+        self._value = None
+        self._lock = threading.Lock()
+    
+    def get(self, load, needs_load):
+        """
+        Get the value, (re)loading it first when needs_load says so.
+        
+        Args:
+            load: Callable taking the current value (None before the first
+                load) and a connection, returning the loaded value
+            needs_load: Callable taking the current value, true when it must be loaded
+        """
+        with self._lock:
+            if needs_load(self._value):
+                conn = get_connection()
+                try:
+                    self._value = load(self._value, conn)
+                    conn.rollback()
+                finally:
+                    release_connection(conn)
+            return self._value
+    
+    def loaded(self):
+        """Get the value if it has been loaded, else None."""
+        return self._value
+    
+    def reset(self):
+        """Drop the value so the next get loads it again."""
+        with self._lock:
+            self._value = None
+
+
+def older_than(max_age):
+    """
+    Build a needs_load check for ProcessWide.get.
+    
+    The check is true for a value not loaded yet, or loaded (loaded_at)
+    more than max_age seconds ago; with max_age None, only the first.
+    """
+    def needs_load(value):
+        return value is None or (max_age is not None and time.monotonic() - value.loaded_at > max_age)
+    return needs_load
+
+
+class AsOfCache:
+    """
+    As-of query results keyed by query arguments.
+    
+    A result is cached for good when its processing time is at least
+    past_margin seconds old (writes are stamped before they commit, so a
+    query for the last moments may not see a write that is about to land),
+    and is valid while the history version it was read at is current. A
+    result for the current time (processing_datetime None) is valid while
+    the data version it was read at is current, for at most now_ttl seconds.
+    """
+    
+    def __init__(self, max_bytes, now_ttl=5, past_margin=60):
+        self.entries = LRUCache(max_bytes)
+        self.now_ttl = now_ttl
+        self.past_margin = timedelta(seconds=past_margin)
+        self._history_version = None
+    
+    def cacheable(self, processing_datetime):
+        """Whether results for processing_datetime (None for now) may be cached."""
+        if processing_datetime is None:
+            return True
+        return local_naive(processing_datetime) <= datetime.now() - self.past_margin
+    
+    def _sync(self, history_version):
+        if history_version != self._history_version:
+            self.entries.clear()
+            self._history_version = history_version
+    
+    def get(self, key, processing_datetime, version, history_version):
+        """
+        Get the cached result for key, or None.
+        
+        Args:
+            key: Query arguments, hashable
+            processing_datetime: The query's processing time, None for now
+            version: Current data version
+            history_version: Current history version
+        """
+        self._sync(history_version)
+        
+        def valid(entry):
+            _, read_version, expires = entry
+            return read_version == version and time.monotonic() <= expires
+        
+        entry = self.entries.get(
+            (processing_datetime is None, key), valid=valid if processing_datetime is None else None
+        )
+        return entry[0] if entry is not None else None
+    
+    def put(self, key, processing_datetime, version, history_version, result):
+        """Cache result, read at the given data and history versions."""
+        self._sync(history_version)
+        self.entries.put(
+            (processing_datetime is None, key),
+            (result, version, time.monotonic() + self.now_ttl),
+            estimate_size(result)
+        )
+    
+    def invalidate_now(self):
+        """Drop the results for the current time."""
+        self.entries.discard_where(lambda key: key[0])
+
+
+class ForecastBudgetCache:
+    """
+    Budget and forecast series per org.
+    
+    Entries are keyed by hierarchy version and org, and each is valid while
+    the org's subtree data version it was computed at is current.
+    """
+    
+    def __init__(self, max_bytes):
+        self.entries = LRUCache(max_bytes)
+    
+    def get(self, org, hierarchy_version, version):
+        """Get the cached series of org, or None."""
+        entry = self.entries.get((hierarchy_version, org), valid=lambda entry: entry[0] == version)
+        return entry[1] if entry is not None else None
+    
+    def put(self, org, hierarchy_version, version, series):
+        """Cache the series of org, computed at the given versions."""
+        self.entries.put((hierarchy_version, org), (version, series))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_forecast_cache = None
+
+
+def get_as_of_cache(max_bytes, now_ttl=5):
+    """Get the process-wide as-of result cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AsOfCache(max_bytes, now_ttl)
+        return _cache
+
+
+def loaded_as_of_cache():
+    """Get the as-of result cache if it has been created, else None."""
+    return _cache
+
+
+def reset_as_of_cache():
+    """Drop the process-wide as-of result cache."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def get_forecast_budget_cache(max_bytes):
+    """Get the process-wide forecast and budget series cache, creating it on first use."""
+    global _forecast_cache
+    with _cache_lock:
+        if _forecast_cache is None:
+            _forecast_cache = ForecastBudgetCache(max_bytes)
+        return _forecast_cache
+
+
+def loaded_forecast_budget_cache():
+    """Get the forecast and budget series cache if it has been created, else None."""
+    return _forecast_cache
+
+
+def reset_forecast_budget_cache():
+    """Drop the process-wide forecast and budget series cache."""
+    global _forecast_cache
+    with _cache_lock:
+        _forecast_cache = None
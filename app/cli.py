@@ -0,0 +1,108 @@
+"""Flask CLI commands."""
+import click
+from app.database import create_schema
+
+
+def register_commands(app):
+    """Register CLI commands on the Flask app."""
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the schema and apply pending migrations."""
+        create_schema()
+        click.echo('Schema is up to date.')
+    
+    @app.cli.command('rebuild-forecasts')
+    def rebuild_forecasts_command():
+        """Recompute all materialized forecast rows in hc_series."""
+        from app.services import ForecastService
+        count = ForecastService.rebuild()
+        click.echo(f'Wrote {count} forecast rows.')
+    
+    @app.cli.command('bench-serialization')
+    @click.option('--rows', default=100000, show_default=True, help='Number of synthetic rows.')
+    def bench_serialization_command(rows):
+        """Measure resource list serialization throughput in rows/second."""
+        import json
+        import time
+        from datetime import date, datetime, timedelta
+        from app import serialization
+        from app.models import INFINITY_DATE, INFINITY_DATETIME
+        from app.serialization import RESOURCE_FIELDS, ResourceEncoder, resource_columns
+        
+        columns = resource_columns()
+        start = datetime(2024, 1, 1, 9, 0, 0, 123456)
+        tuples = [
+            (i, 1, i, f'Worker {i}', 'Sales', 'Employee', date(2024, 1, 1), INFINITY_DATE,
+             start + timedelta(seconds=i), INFINITY_DATETIME)
+            for i in range(rows)
+        ]
+        dicts = [dict(zip(columns, row)) for row in tuples]
+        encoder = ResourceEncoder(columns=columns)
+        
+        def baseline():
+            # Per-row dict with isoformat strings, then json.dumps (the previous route code)
+            result = []
+            for r in dicts:
+                item = {}
+                for field in RESOURCE_FIELDS:
+                    value = r[field.lower()]
+                    item[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+                result.append(item)
+            return json.dumps(result).encode()
+        
+        cases = [
+            ('baseline (dict rows, json)', baseline),
+            ('encoder (dict rows)', lambda: encoder.encode(dicts)),
+            ('encoder (tuple rows)', lambda: encoder.encode(tuples)),
+            ('encoder (tuple rows, ndjson stream)', lambda: b''.join(encoder.iter_encode(tuples, 'ndjson'))),
+        ]
+        click.echo(f"Encoder: {'orjson' if serialization.orjson is not None else 'json'}, {rows} rows")
+        for label, encode in cases:
+            began = time.perf_counter()
+            encode()
+            elapsed = time.perf_counter() - began
+            click.echo(f'{label:40} {rows / elapsed:12,.0f} rows/s')
+    
+    @app.cli.command('bench-resource-lists')
+    @click.option('--repeat', default=3, show_default=True, help='Runs per path; the best is reported.')
+    def bench_resource_lists_command(repeat):
+        """Measure GET /api/resources/open throughput per encoding path against the database."""
+        import json
+        import time
+        from app.serialization import RESOURCE_FIELDS
+        
+        client = app.test_client()
+        
+        def previous():
+            # Dict rows encoded per row with isoformat strings, as the routes used to
+            from app.services import ResourceService
+            with app.app_context():
+                result = []
+                for r in ResourceService.get_open_resource_records():
+                    item = {}
+                    for field in RESOURCE_FIELDS:
+                        value = r[field.lower()]
+                        item[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+                    result.append(item)
+                return len(result), json.dumps(result)
+        
+        def endpoint(query):
+            def run():
+                body = client.get('/api/resources/open' + query).get_data()
+                return body.count(b'"RID"'), body
+            return run
+        
+        cases = [
+            ('previous (dict rows, json)', previous),
+            ('app encoder (tuple rows)', endpoint('')),
+            ('assemble=db', endpoint('?assemble=db')),
+        ]
+        for label, run in cases:
+            best = None
+            for _ in range(repeat):
+                began = time.perf_counter()
+                rows, _ = run()
+                elapsed = time.perf_counter() - began
+                best = elapsed if best is None else min(best, elapsed)
+            click.echo(f'{label:30} {rows:8} rows {rows / best:12,.0f} rows/s')
@@ -1,41 +1,935 @@
 """Database connection and initialization."""
+import os
+import threading
+import time
+import uuid
+from collections import deque
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
+from flask import g, has_app_context, jsonify
+from app.models import INFINITY_DATETIME
 
 
 _db_config = None
+_pool = None
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+    
+    Connections are handed out LIFO so the most recently used (warm)
+    connections are reused first. A connection is discarded instead of
+    being reused when it is closed, broken, older than ``max_lifetime``
+    seconds, or fails the ``SELECT 1`` health check that runs when it has
+    been idle for longer than ``health_check_interval`` seconds.
+    """
+    
+    def __init__(self, dsn, min_size=1, max_size=10, timeout=30.0,
+                 max_lifetime=3600.0, health_check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        
+        self._cond = threading.Condition()
+        self._idle = deque()       # (conn, last_used) pairs, most recent last
+        self._created_at = {}      # conn -> creation time
+        self._size = 0             # open connections, idle or in use
+        self._warmed = False
+        self._closed = False
+        self._pid = os.getpid()
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'acquired': 0,
+            'released': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'expired': 0,
+        }
+        self._wait_time_total = 0.0
+    
+    def _connect(self):
+        """Open a new physical connection."""
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        with self._cond:
+            self._created_at[conn] = time.monotonic()
+            self._counters['connections_created'] += 1
+        return conn
+    
+    def _discard(self, conn):
+        """Close a connection and free its slot. Caller must not hold the lock."""
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created_at.pop(conn, None)
+            self._size -= 1
+            self._counters['connections_closed'] += 1
+            self._cond.notify()
+    
+    def _expired(self, conn, now):
+        created_at = self._created_at.get(conn, now)
+        return self.max_lifetime is not None and now - created_at >= self.max_lifetime
+    
+    def _is_usable(self, conn, last_used):
+        """Check a connection taken from the idle list before handing it out."""
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if self._expired(conn, now):
+            with self._cond:
+                self._counters['expired'] += 1
+            return False
+        if (self.health_check_interval is not None
+                and now - last_used >= self.health_check_interval):
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+                conn.rollback()
+            except Exception:
+                with self._cond:
+                    self._counters['health_check_failures'] += 1
+                return False
+        return True
+    
+    def _check_pid(self):
+        """Forget connections inherited from a parent process after a fork."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._created_at.clear()
+            self._size = 0
+            self._warmed = False
+    
+    def _warm(self):
+        """Open connections up to min_size. Failures are left to acquire()."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                return
+            with self._cond:
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+    
+    def acquire(self):
+        """
+        Get a connection from the pool, opening one if below max_size.
+        
+        Returns:
+            An open psycopg2 connection using RealDictCursor
+        
+        Raises:
+            PoolTimeoutError: If no connection is available within the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            self._check_pid()
+            warm = not self._warmed
+            self._warmed = True
+        if warm:
+            self._warm()
+        
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection"
+                        )
+                    if not waited:
+                        self._counters['waits'] += 1
+                        waited = True
+                    started = time.monotonic()
+                    self._cond.wait(remaining)
+                    self._wait_time_total += time.monotonic() - started
+            
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                conn, last_used = entry
+                if not self._is_usable(conn, last_used):
+                    self._discard(conn)
+                    continue
+            
+            with self._cond:
+                self._counters['acquired'] += 1
+            return conn
+    
+    def release(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+        
+        Args:
+            conn: Connection obtained from acquire()
+            discard: Close the connection instead of reusing it
+        """
+        with self._cond:
+            self._counters['released'] += 1
+            foreign = conn not in self._created_at
+        if foreign:
+            # Opened before a fork or by a previous pool; just close it
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        
+        if not discard and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+        
+        if (discard or conn.closed or self._closed
+                or self._expired(conn, time.monotonic())):
+            self._discard(conn)
+            return
+        
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def close(self):
+        """Close all idle connections; in-use connections close on release."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+    
+    def stats(self):
+        """Return a snapshot of pool sizing and usage counters."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'wait_time_total': round(self._wait_time_total, 6),
+                **self._counters,
+            }
 
 
 def init_db(app):
-    """Initialize database configuration from Flask app."""
-    global _db_config
+    """Initialize database configuration and connection pool from Flask app."""
+    global _db_config, _pool
     _db_config = app.config['DATABASE_URL']
+    
+    if _pool is not None:
+        _pool.close()
+    _pool = ConnectionPool(
+        _db_config,
+        min_size=int(app.config.get('DB_POOL_MIN_SIZE', 1)),
+        max_size=int(app.config.get('DB_POOL_MAX_SIZE', 10)),
+        timeout=float(app.config.get('DB_POOL_TIMEOUT', 30)),
+        max_lifetime=float(app.config.get('DB_POOL_MAX_LIFETIME', 3600)),
+        health_check_interval=float(app.config.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+    )
+    
+    # One connection and transaction per request / app context
+    app.after_request(_commit_after_request)
+    app.teardown_appcontext(close_session)
 
 
-def get_connection():
-    """Get a database connection."""
-    if _db_config is None:
+def get_pool():
+    """Get the application connection pool."""
+    if _pool is None:
         raise RuntimeError("Database not initialized. Call init_db first.")
-    return psycopg2.connect(_db_config, cursor_factory=RealDictCursor)
+    return _pool
+
+
+def get_pool_stats():
+    """Get connection pool statistics for monitoring."""
+    return get_pool().stats()
+
+
+def get_connection():
+    """Get a database connection from the pool."""
+    return get_pool().acquire()
+
+
+def release_connection(conn, discard=False):
+    """Return a connection obtained from get_connection() to the pool."""
+    get_pool().release(conn, discard=discard)
+
+
+def stream_rows(sql, params=None, batch_size=1000, tuples=False):
+    """
+    Yield the rows of a query without holding the whole result in memory.
+    
+    Rows are read through a server-side (named) cursor, batch_size at a
+    time, on a pool connection of their own: a streamed response is still
+    being read after the request's unit of work has been committed. The
+    connection is taken on the first next() and returned when the generator
+    is exhausted or closed.
+    
+    Args:
+        sql: Query to run
+        params: Query parameters
+        batch_size: Rows fetched per round trip
+        tuples: Yield plain tuples instead of row dicts
+    """
+    conn = get_connection()
+    try:
+        cursor_factory = psycopg2.extensions.cursor if tuples else None
+        cursor = conn.cursor(name=f'stream_{uuid.uuid4().hex}', cursor_factory=cursor_factory)
+        cursor.itersize = batch_size
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+    finally:
+        release_connection(conn)
+
+
+class _Session:
+    """Connection and pending after-commit callbacks for one app context."""
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.on_commit = []
+        self.data_version_deferred = False
+
+
+def _get_session(create=True):
+    """Get the unit-of-work session bound to the current app context."""
+    session = g.get('_db_session')
+    if session is None and create:
+        session = _Session(get_connection())
+        g._db_session = session
+    return session
+
+
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        callback()
+
+
+def on_commit(callback):
+    """
+    Register a callback to run after the current unit of work commits.
+    
+    Inside an app context the callback runs once the request-scoped
+    transaction commits and is dropped if it rolls back. Outside an app
+    context it runs immediately.
+    
+    Args:
+        callback: Callable taking no arguments
+    """
+    if has_app_context() and g.get('_db_session') is not None:
+        g._db_session.on_commit.append(callback)
+    else:
+        callback()
+
+
+def _commit(session):
+    """Commit the session's transaction, applying a deferred data_version bump just before."""
+    if session.data_version_deferred:
+        flush_data_version(session.conn.cursor())
+        session.data_version_deferred = False
+    session.conn.commit()
+
+
+def commit_session():
+    """Commit the request-scoped transaction, if any, and run on_commit callbacks."""
+    session = _get_session(create=False) if has_app_context() else None
+    if session is None:
+        return
+    _commit(session)
+    callbacks, session.on_commit = session.on_commit, []
+    _run_callbacks(callbacks)
+
+
+def rollback_session():
+    """Roll back the request-scoped transaction, if any, discarding callbacks."""
+    session = _get_session(create=False) if has_app_context() else None
+    if session is None:
+        return
+    session.on_commit = []
+    session.data_version_deferred = False
+    session.conn.rollback()
+
+
+def close_session(exc=None):
+    """
+    End the unit of work for the current app context.
+    
+    Commits when the context ends without an error, otherwise rolls back,
+    then returns the connection to the pool.
+    """
+    session = g.pop('_db_session', None)
+    if session is None:
+        return
+    discard = False
+    try:
+        if exc is None:
+            _commit(session)
+            _run_callbacks(session.on_commit)
+        else:
+            session.conn.rollback()
+    except Exception:
+        discard = True
+        try:
+            session.conn.rollback()
+        except Exception:
+            pass
+        if exc is None:
+            raise
+    finally:
+        release_connection(session.conn, discard=discard)
+
+
+def _commit_after_request(response):
+    """Commit the unit of work before the response is sent so failures surface as 500s."""
+    try:
+        commit_session()
+    except Exception as e:
+        try:
+            rollback_session()
+        except Exception:
+            pass
+        response = jsonify({'error': str(e)})
+        response.status_code = 500
+    return response
 
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
+    """
+    Context manager for database connections.
+    
+    Inside a Flask app context every call shares one request-scoped
+    connection and transaction, committed once when the request (or app
+    context) ends. An exception raised inside the block rolls back the
+    whole unit of work. Outside an app context a pooled connection is
+    used and committed per block.
+    """
+    if has_app_context():
+        session = _get_session()
+        try:
+            yield session.conn
+        except Exception:
+            try:
+                rollback_session()
+            except Exception:
+                # Connection is unusable; start afresh on the next get_db()
+                g.pop('_db_session', None)
+                session.on_commit = []
+                release_connection(session.conn, discard=True)
+            raise
+        return
+    
     conn = get_connection()
+    discard = False
     try:
         yield conn
         conn.commit()
-    except Exception:
-        conn.rollback()
+    except Exception as e:
+        discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        try:
+            conn.rollback()
+        except Exception:
+            discard = True
         raise
     finally:
-        conn.close()
+        release_connection(conn, discard=discard)
+
+
+# SQL literal for open (current) resource versions, used in partial index predicates
+OPEN_PROC_END = f"'{INFINITY_DATETIME.isoformat(sep=' ')}'"
+
+# Tables whose writes bump the data_version counter (migration 7)
+VERSIONED_TABLES = ('resource', 'worker', 'org', 'worker_type', 'hc_series')
+
+# Tables that feed as-of results; writes to them bump history_version unless
+# declared present-time writes with present_write (migration 8)
+HISTORY_TABLES = ('resource', 'worker', 'org')
+
+# Tables whose rows are counted into an org's forecast and budget series;
+# writes bump org_data_version for the orgs of the changed rows (migration 9)
+ORG_DATA_TABLES = ('resource', 'worker', 'hc_series')
+
+# Ordered schema migrations applied by create_schema() after the base tables.
+# Each entry is (version, description, statements). Append new migrations with
+# the next version number; never edit one that has been released.
+MIGRATIONS = [
+    (1, 'Bi-temporal and org indexes', [
+        # Open versions: active/open listings and forecast counts
+        f"""CREATE INDEX IF NOT EXISTS resource_open_idx
+            ON resource (res_start, res_end) INCLUDE (WID)
+            WHERE proc_end = {OPEN_PROC_END}""",
+        # At most one open version per resource
+        f"""CREATE UNIQUE INDEX IF NOT EXISTS resource_one_open_version_idx
+            ON resource (RID) WHERE proc_end = {OPEN_PROC_END}""",
+        "CREATE INDEX IF NOT EXISTS worker_org_idx ON worker (org)",
+        # proc_start <= t < proc_end and res_start <= d < res_end lookups
+        "CREATE INDEX IF NOT EXISTS resource_proc_range_idx ON resource (proc_start, proc_end)",
+        "CREATE INDEX IF NOT EXISTS resource_res_range_idx ON resource (res_start, res_end)",
+    ]),
+    (2, 'Range-typed business/processing periods with GiST indexes', [
+        # [res_start, res_end) and [proc_start, proc_end) as range values, so
+        # "res_start <= d < res_end" becomes "business_period @> d"
+        """ALTER TABLE resource ADD COLUMN IF NOT EXISTS business_period daterange
+            GENERATED ALWAYS AS (daterange(res_start, res_end, '[)')) STORED""",
+        """ALTER TABLE resource ADD COLUMN IF NOT EXISTS processing_period tsrange
+            GENERATED ALWAYS AS (tsrange(proc_start, proc_end, '[)')) STORED""",
+        # As-of queries: containment on both periods
+        """CREATE INDEX IF NOT EXISTS resource_periods_gist_idx
+            ON resource USING gist (business_period, processing_period)""",
+        # Active listings and forecast counts over open versions
+        f"""CREATE INDEX IF NOT EXISTS resource_open_business_gist_idx
+            ON resource USING gist (business_period)
+            WHERE proc_end = {OPEN_PROC_END}""",
+        # Superseded by the GiST indexes above
+        "DROP INDEX IF EXISTS resource_open_idx",
+        "DROP INDEX IF EXISTS resource_res_range_idx",
+        # No two versions of a RID may overlap in processing time. Needs the
+        # btree_gist contrib extension; skipped where it is not installed.
+        """DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist') THEN
+                CREATE EXTENSION IF NOT EXISTS btree_gist;
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = 'resource_processing_no_overlap'
+                ) THEN
+                    ALTER TABLE resource ADD CONSTRAINT resource_processing_no_overlap
+                        EXCLUDE USING gist (RID WITH =, processing_period WITH &&);
+                END IF;
+            END IF;
+        END
+        $$""",
+    ]),
+    (3, 'Org closure table maintained by trigger', [
+        """CREATE TABLE IF NOT EXISTS org_closure (
+            ancestor TEXT NOT NULL,
+            descendant TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor, descendant)
+        )""",
+        "CREATE INDEX IF NOT EXISTS org_closure_descendant_idx ON org_closure (descendant)",
+        # Every (ancestor, descendant) pair including each org with itself at
+        # depth 0. The org table is small, so it is rebuilt wholesale.
+        """CREATE OR REPLACE FUNCTION rebuild_org_closure() RETURNS void AS $$
+        BEGIN
+            DELETE FROM org_closure;
+            INSERT INTO org_closure (ancestor, descendant, depth)
+            WITH RECURSIVE tree AS (
+                SELECT name AS ancestor, name AS descendant, 0 AS depth FROM org
+                UNION ALL
+                SELECT t.ancestor, o.name, t.depth + 1
+                FROM tree t JOIN org o ON o.parent = t.descendant
+                WHERE t.depth < 64
+            )
+            SELECT ancestor, descendant, MIN(depth) FROM tree GROUP BY ancestor, descendant;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION org_closure_trigger() RETURNS trigger AS $$
+        BEGIN
+            PERFORM rebuild_org_closure();
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS org_closure_refresh ON org",
+        """CREATE TRIGGER org_closure_refresh
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON org
+            FOR EACH STATEMENT EXECUTE FUNCTION org_closure_trigger()""",
+        "SELECT rebuild_org_closure()",
+    ]),
+    (4, 'Index on closed processing ends', [
+        # Finds versions closed in a processing time window (snapshot
+        # refreshes); open versions are covered by the unique index on RID
+        f"""CREATE INDEX IF NOT EXISTS resource_proc_end_idx ON resource (proc_end)
+            WHERE proc_end < {OPEN_PROC_END}""",
+    ]),
+    (5, 'Keyset index on open versions', [
+        # Serves paged open/active lists in (RID, version) order
+        f"""CREATE INDEX IF NOT EXISTS resource_open_keyset_idx ON resource (RID, version)
+            WHERE proc_end = {OPEN_PROC_END}""",
+    ]),
+    (6, 'Worker name prefix index', [
+        # Serves name prefix filters (name LIKE 'prefix%') on resource lists
+        "CREATE INDEX IF NOT EXISTS worker_name_prefix_idx ON worker (name text_pattern_ops)",
+    ]),
+    (7, 'Data version counter bumped by writes', [
+        # One row, updated in the writing transaction so a new version only
+        # becomes visible together with the data that caused it
+        """CREATE TABLE IF NOT EXISTS data_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL,
+            modified_at TIMESTAMPTZ NOT NULL
+        )""",
+        """INSERT INTO data_version (id, version, modified_at) VALUES (TRUE, 1, now())
+            ON CONFLICT (id) DO NOTHING""",
+        """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE data_version SET version = version + 1, modified_at = now();
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+    ] + [
+        statement
+        for table in VERSIONED_TABLES
+        for statement in (
+            f"DROP TRIGGER IF EXISTS {table}_data_version ON {table}",
+            f"""CREATE TRIGGER {table}_data_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()""",
+        )
+    ]),
+    (8, 'History version bumped by writes that may change the past', [
+        "ALTER TABLE data_version ADD COLUMN IF NOT EXISTS history_version BIGINT NOT NULL DEFAULT 1",
+        # A trigger created with the 'history' argument also bumps
+        # history_version, unless the transaction set app.present_write
+        """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE data_version SET
+                version = version + 1,
+                modified_at = now(),
+                history_version = history_version + CASE
+                    WHEN TG_NARGS > 0 AND TG_ARGV[0] = 'history'
+                         AND coalesce(current_setting('app.present_write', true), '') <> 'on'
+                    THEN 1 ELSE 0 END;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+    ] + [
+        statement
+        for table in HISTORY_TABLES
+        for statement in (
+            f"DROP TRIGGER IF EXISTS {table}_data_version ON {table}",
+            f"""CREATE TRIGGER {table}_data_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('history')""",
+        )
+    ]),
+    (9, 'Per-org data versions and hierarchy version', [
+        "ALTER TABLE data_version ADD COLUMN IF NOT EXISTS hierarchy_version BIGINT NOT NULL DEFAULT 1",
+        """CREATE TABLE IF NOT EXISTS org_data_version (
+            org TEXT PRIMARY KEY,
+            version BIGINT NOT NULL
+        )""",
+        """CREATE OR REPLACE FUNCTION bump_hierarchy_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE data_version SET hierarchy_version = hierarchy_version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        # Resource rows take their org from the worker; old_rows and new_rows
+        # are the transition tables of the firing trigger
+        """CREATE OR REPLACE FUNCTION bump_org_data_version() RETURNS trigger AS $$
+        DECLARE
+            orgs TEXT[] := '{}';
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                IF TG_TABLE_NAME = 'resource' THEN
+                    orgs := orgs || ARRAY(
+                        SELECT w.org FROM old_rows r JOIN worker w ON w.WID = r.WID
+                    );
+                ELSE
+                    orgs := orgs || ARRAY(SELECT org FROM old_rows);
+                END IF;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                IF TG_TABLE_NAME = 'resource' THEN
+                    orgs := orgs || ARRAY(
+                        SELECT w.org FROM new_rows r JOIN worker w ON w.WID = r.WID
+                    );
+                ELSE
+                    orgs := orgs || ARRAY(SELECT org FROM new_rows);
+                END IF;
+            END IF;
+            INSERT INTO org_data_version (org, version)
+            SELECT DISTINCT org, 1 FROM unnest(orgs) AS org
+            ON CONFLICT (org) DO UPDATE SET version = org_data_version.version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        # Org changes move subtrees; a truncate leaves no rows to name orgs by
+        "DROP TRIGGER IF EXISTS org_hierarchy_version ON org",
+        """CREATE TRIGGER org_hierarchy_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON org
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_hierarchy_version()""",
+    ] + [
+        statement
+        for table in ORG_DATA_TABLES
+        for statement in (
+            f"DROP TRIGGER IF EXISTS {table}_org_version_insert ON {table}",
+            f"""CREATE TRIGGER {table}_org_version_insert
+                AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_org_data_version()""",
+            f"DROP TRIGGER IF EXISTS {table}_org_version_update ON {table}",
+            f"""CREATE TRIGGER {table}_org_version_update
+                AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_org_data_version()""",
+            f"DROP TRIGGER IF EXISTS {table}_org_version_delete ON {table}",
+            f"""CREATE TRIGGER {table}_org_version_delete
+                AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_org_data_version()""",
+            f"DROP TRIGGER IF EXISTS {table}_org_version_truncate ON {table}",
+            f"""CREATE TRIGGER {table}_org_version_truncate
+                AFTER TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_hierarchy_version()""",
+        )
+    ]),
+    (10, 'Deferred data version bumps', [
+        # The data_version row stays locked from the bump until commit. A
+        # transaction that set app.defer_data_version only records the bump
+        # and applies it in its last statement (see defer_data_version)
+        """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        DECLARE
+            history BOOLEAN := TG_NARGS > 0 AND TG_ARGV[0] = 'history'
+                AND coalesce(current_setting('app.present_write', true), '') <> 'on';
+        BEGIN
+            IF coalesce(current_setting('app.defer_data_version', true), '') = 'on' THEN
+                PERFORM set_config('app.data_version_pending', 'on', true);
+                IF history THEN
+                    PERFORM set_config('app.history_version_pending', 'on', true);
+                END IF;
+            ELSE
+                UPDATE data_version SET
+                    version = version + 1,
+                    modified_at = now(),
+                    history_version = history_version + CASE WHEN history THEN 1 ELSE 0 END;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION flush_data_version() RETURNS void AS $$
+        BEGIN
+            IF coalesce(current_setting('app.data_version_pending', true), '') = 'on' THEN
+                UPDATE data_version SET
+                    version = version + 1,
+                    modified_at = now(),
+                    history_version = history_version + CASE
+                        WHEN coalesce(current_setting('app.history_version_pending', true), '') = 'on'
+                        THEN 1 ELSE 0 END;
+                PERFORM set_config('app.data_version_pending', 'off', true);
+                PERFORM set_config('app.history_version_pending', 'off', true);
+            END IF;
+        END
+        $$ LANGUAGE plpgsql""",
+    ]),
+]
+
+
+def run_migrations(cursor):
+    """
+    Apply pending schema migrations in version order.
+    
+    Applied versions are recorded in the schema_version table. An advisory
+    lock serializes concurrent runners (e.g. several app processes starting).
+    
+    Args:
+        cursor: Cursor on the connection to migrate
+    
+    Returns:
+        The schema version after migrating
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('schema_version'))")
+    cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_version")
+    current = cursor.fetchone()['version']
+    
+    for version, description, statements in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(
+            "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        current = version
+    
+    return current
+
+
+def get_data_version():
+    """
+    Get the data version counter, bumped by every write statement on VERSIONED_TABLES.
+    
+    Returns:
+        Tuple of (version, modified_at)
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version, modified_at FROM data_version")
+        row = cursor.fetchone()
+        return row['version'], row['modified_at']
+
+
+def get_data_versions():
+    """
+    Get the data version and history version counters.
+    
+    history_version only moves on writes that may change results for past
+    processing times (see present_write).
+    
+    Returns:
+        Tuple of (version, history_version)
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version, history_version FROM data_version")
+        row = cursor.fetchone()
+        return row['version'], row['history_version']
+
+
+def get_org_data_versions(orgs):
+    """
+    Get the hierarchy version and the data version of each org's subtree.
+    
+    An org's subtree version is the sum of org_data_version over the org and
+    its descendants, so it grows whenever a resource, worker or hc_series row
+    of any of them is written. The hierarchy version moves when the org
+    table changes or one of those tables is truncated.
+    
+    Args:
+        orgs: Org names
+    
+    Returns:
+        Tuple of (hierarchy_version, {org: version}); orgs missing from the
+        hierarchy are left out
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT hierarchy_version FROM data_version")
+        hierarchy_version = cursor.fetchone()['hierarchy_version']
+        cursor.execute("""
+            SELECT c.ancestor AS org, COALESCE(SUM(v.version), 0)::bigint AS version
+            FROM org_closure c
+            LEFT JOIN org_data_version v ON v.org = c.descendant
+            WHERE c.ancestor = ANY(%s)
+            GROUP BY c.ancestor
+        """, (list(orgs),))
+        return hierarchy_version, {row['org']: row['version'] for row in cursor.fetchall()}
+
+
+@contextmanager
+def present_write(cursor):
+    """
+    Declare the write statements run inside the block as present-time writes.
+    
+    A present-time write only stamps new versions with the current time and
+    closes open versions at it, so results for past processing times stay
+    as they were and history_version is left alone. The flag is turned off
+    again when the block ends: the transaction is the whole unit of work,
+    and a later write in it may change the past. After an error the
+    transaction is rolled back, which clears the flag as well.
+    
+    Args:
+        cursor: Cursor of the writing transaction
+    """
+    cursor.execute("SET LOCAL app.present_write = 'on'")
+    yield
+    cursor.execute("SELECT set_config('app.present_write', 'off', true)")
+
+
+def defer_data_version(cursor):
+    """
+    Defer the data_version bump of the current unit of work to its commit.
+    
+    The data_version row stays locked from the bump until commit, so bumping
+    in the first write statement would make every other writer wait for the
+    rest of the unit of work. With the bump deferred, write statements only
+    record it, and the commit applies it in its last statement before
+    COMMIT (see flush_data_version). Outside an app context get_db commits
+    each block on its own, and the bump is left immediate.
+    
+    Args:
+        cursor: Cursor of the unit of work's connection
+    """
+    session = _get_session(create=False) if has_app_context() else None
+    if session is None:
+        return
+    cursor.execute("SET LOCAL app.defer_data_version = 'on'")
+    session.data_version_deferred = True
+
+
+def flush_data_version(cursor):
+    """
+    Apply the data_version bump deferred by defer_data_version, if any write recorded one.
+    
+    Args:
+        cursor: Cursor of the writing transaction, right before it commits
+    """
+    cursor.execute("SELECT flush_data_version()")
+
+
+def get_schema_version():
+    """Get the latest applied schema migration version (0 if none)."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('schema_version') AS t")
+        if cursor.fetchone()['t'] is None:
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_version")
+        return cursor.fetchone()['version']
 
 
 def create_schema():
-    """Create database schema with worker, resource, org, worker_type, and hc_series tables."""
+    """Create database schema with worker, resource, org, worker_type, and hc_series tables.
+    
+    Pending migrations from MIGRATIONS are applied afterwards.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -97,6 +991,9 @@ def create_schema():
             CREATE SEQUENCE IF NOT EXISTS resource_rid_seq
         """)
         
+        # Apply indexes and later schema changes
+        run_migrations(cursor)
+        
         conn.commit()
 
 
@@ -0,0 +1,200 @@
+"""Vectorized headcount forecasting over arbitrary date ranges.
+
+Open resource periods are loaded once as NumPy arrays of day numbers; the
+headcount on every requested date is then the number of periods started on
+or before the date minus the number ended on or before it, computed for all
+dates at once with two searchsorted calls.
+"""
+import numpy as np
+from app.models import INFINITY_DATETIME
+
+
+GRANULARITIES = ('daily', 'weekly', 'monthly')
+
+
+def date_points(start, end, granularity='monthly'):
+    """
+    Build the evaluation dates between start and end (inclusive).
+    
+    Args:
+        start: First date of the range
+        end: Last date of the range
+        granularity: 'daily' (every day), 'weekly' (every 7 days from start)
+            or 'monthly' (the first day of each month within the range)
+    
+    Returns:
+        numpy datetime64[D] array of dates
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    first = np.datetime64(start, 'D')
+    last = np.datetime64(end, 'D')
+    if granularity == 'daily':
+        return np.arange(first, last + 1, dtype='datetime64[D]')
+    if granularity == 'weekly':
+        return np.arange(first, last + 1, 7, dtype='datetime64[D]')
+    months = np.arange(
+        first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1, dtype='datetime64[M]'
+    ).astype('datetime64[D]')
+    return months[months >= first]
+
+
+def headcount_at(res_starts, res_ends, dates):
+    """
+    Count the [res_start, res_end) periods containing each date.
+    
+    Args:
+        res_starts: Array of period starts (datetime64[D] or day numbers)
+        res_ends: Array of period ends, same length and units as res_starts
+        dates: Array of dates to evaluate, same units
+    
+    Returns:
+        numpy int64 array of counts, one per date
+    """
+    starts = np.sort(np.asarray(res_starts))
+    ends = np.sort(np.asarray(res_ends))
+    dates = np.asarray(dates)
+    started = np.searchsorted(starts, dates, side='right')
+    ended = np.searchsorted(ends, dates, side='right')
+    return (started - ended).astype(np.int64)
+
+
+def forecast_evolution(res_starts, res_ends, proc_starts, proc_ends, dates, times):
+    """
+    Headcount on each business date as of each processing time.
+    
+    Each version contributes +1 at proc_start and -1 at proc_end to every
+    date in [res_start, res_end). Each boundary is placed with searchsorted
+    at the first processing time it applies to and on the date range it
+    covers, and added to a difference array over (time, date) slots, so
+    memory is O(versions + times * dates); cumulative sums over dates and
+    then times give the counts.
+    
+    Args:
+        res_starts: Array of business period starts (datetime64[D])
+        res_ends: Array of business period ends (datetime64[D])
+        proc_starts: Array of processing period starts (datetime64[us])
+        proc_ends: Array of processing period ends (datetime64[us])
+        dates: Array of business dates to evaluate (datetime64[D]), sorted and unique
+        times: Array of processing times to evaluate (datetime64[us]), sorted and unique
+    
+    Returns:
+        numpy int64 array of counts with shape (len(times), len(dates))
+    """
+    dates = np.asarray(dates)
+    times = np.asarray(times)
+    boundaries = np.concatenate([np.asarray(proc_starts), np.asarray(proc_ends)])
+    signs = np.concatenate([
+        np.ones(len(proc_starts), dtype=np.int64), -np.ones(len(proc_ends), dtype=np.int64)
+    ])
+    
+    # A boundary counts at every processing time at or after it, on the
+    # dates from the first >= res_start up to the first >= res_end
+    slots = np.searchsorted(times, boundaries, side='left')
+    first = np.searchsorted(dates, np.asarray(res_starts), side='left')
+    last = np.searchsorted(dates, np.asarray(res_ends), side='left')
+    first = np.concatenate([first, first])
+    last = np.concatenate([last, last])
+    
+    diff = np.zeros((len(times) + 1, len(dates) + 1), dtype=np.int64)
+    np.add.at(diff, (slots, first), signs)
+    np.add.at(diff, (slots, last), -signs)
+    return np.cumsum(np.cumsum(diff, axis=1), axis=0)[:len(times), :len(dates)]
+
+
+def load_version_periods(cursor, start, end, since, until, scope_sql='', params=None):
+    """
+    Load business and processing periods of versions relevant to a window.
+    
+    Selects versions whose business period overlaps [start, end] and whose
+    processing period overlaps [since, until]; versions outside either
+    window cannot be counted at any of its points.
+    
+    Returns:
+        Tuple of (res_starts, res_ends, proc_starts, proc_ends) arrays,
+        datetime64[D] for business and datetime64[us] for processing bounds
+    """
+    cursor.execute(
+        """SELECT COALESCE(array_agg(r.res_start - DATE '1970-01-01'), '{}') AS res_starts,
+                  COALESCE(array_agg(r.res_end - DATE '1970-01-01'), '{}') AS res_ends,
+                  COALESCE(array_agg(r.proc_start), '{}') AS proc_starts,
+                  COALESCE(array_agg(r.proc_end), '{}') AS proc_ends
+           FROM resource r
+           JOIN worker w ON r.WID = w.WID
+           WHERE r.business_period && daterange(%(start)s::date, %(end)s::date, '[]')
+             AND r.processing_period && tsrange(%(since)s::timestamp, %(until)s::timestamp, '[]')"""
+        + (f" AND ({scope_sql})" if scope_sql else ''),
+        {'start': start, 'end': end, 'since': since, 'until': until, **(params or {})}
+    )
+    row = cursor.fetchone()
+    return (
+        np.array(row['res_starts'], dtype=np.int64).astype('datetime64[D]'),
+        np.array(row['res_ends'], dtype=np.int64).astype('datetime64[D]'),
+        np.array(row['proc_starts'], dtype='datetime64[us]'),
+        np.array(row['proc_ends'], dtype='datetime64[us]'),
+    )
+
+
+def _load_periods(cursor, where_sql, params):
+    """Aggregate res_start/res_end of resource r (joined to worker w) matching where_sql."""
+    cursor.execute(
+        """SELECT COALESCE(array_agg(r.res_start - DATE '1970-01-01'), '{}') AS starts,
+                  COALESCE(array_agg(r.res_end - DATE '1970-01-01'), '{}') AS ends
+           FROM resource r
+           JOIN worker w ON r.WID = w.WID
+           WHERE """ + where_sql,
+        params
+    )
+    row = cursor.fetchone()
+    starts = np.array(row['starts'], dtype=np.int64).astype('datetime64[D]')
+    ends = np.array(row['ends'], dtype=np.int64).astype('datetime64[D]')
+    return starts, ends
+
+
+def load_open_periods(cursor, scope_sql='', params=None):
+    """
+    Load the business periods of open resource versions as NumPy arrays.
+    
+    The periods are aggregated into two arrays server-side, so the client
+    receives one row regardless of how many resources match.
+    
+    Args:
+        cursor: Database cursor
+        scope_sql: Optional extra condition on worker w (e.g. an org scope)
+        params: Parameters for scope_sql, as a dict
+    
+    Returns:
+        Tuple of (res_starts, res_ends) datetime64[D] arrays
+    """
+    return _load_periods(
+        cursor,
+        "r.proc_end = %(infinity)s" + (f" AND ({scope_sql})" if scope_sql else ''),
+        {'infinity': INFINITY_DATETIME, **(params or {})}
+    )
+
+
+def load_periods_as_of(cursor, processing_datetime, start, end, scope_sql='', params=None):
+    """
+    Load the business periods of versions valid at a processing time.
+    
+    Uses the as-of predicate (processing_period @> processing_datetime),
+    restricted to periods overlapping [start, end].
+    
+    Args:
+        cursor: Database cursor
+        processing_datetime: Processing time the versions must be valid at
+        start: First business date of interest
+        end: Last business date of interest
+        scope_sql: Optional extra condition on worker w
+        params: Parameters for scope_sql, as a dict
+    
+    Returns:
+        Tuple of (res_starts, res_ends) datetime64[D] arrays
+    """
+    return _load_periods(
+        cursor,
+        """r.processing_period @> %(processing)s::timestamp
+           AND r.business_period && daterange(%(start)s::date, %(end)s::date, '[]')"""
+        + (f" AND ({scope_sql})" if scope_sql else ''),
+        {'processing': processing_datetime, 'start': start, 'end': end, **(params or {})}
+    )
@@ -0,0 +1,133 @@
+"""In-memory headcount index over open resource versions.
+
+Each open resource contributes +1 at res_start and -1 at res_end for its
+worker's (org, type). Headcount on a date is the sum of deltas dated on or
+before it, answered with a binary search into per-(org, type) prefix sums.
+"""
+import threading
+import time
+from bisect import bisect_right
+from app.cache import ProcessWide, older_than
+from app.models import INFINITY_DATETIME
+
+
+class HeadcountIndex:
+    """Headcount deltas with lazily rebuilt prefix sums per (org, type)."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas = {}    # (org, type) -> {date: delta}
+        self._series = {}    # (org, type) -> (sorted dates, cumulative sums)
+        self.loaded_at = time.monotonic()
+    
+    @classmethod
+    def load(cls, cursor):
+        """
+        Build an index from the open resource versions in the database.
+        
+        Args:
+            cursor: Cursor to read resource and worker rows with
+        
+        Returns:
+            A populated HeadcountIndex
+        """
+        cursor.execute(
+            """SELECT w.org, w.type, r.res_start, r.res_end
+               FROM resource r
+               JOIN worker w ON r.WID = w.WID
+               WHERE r.proc_end = %s""",
+            (INFINITY_DATETIME,)
+        )
+        index = cls()
+        for row in cursor.fetchall():
+            index.add(row['org'], row['type'], row['res_start'], row['res_end'])
+        return index
+    
+    def add(self, org, type_, res_start, res_end, sign=1):
+        """
+        Add (or with sign=-1, remove) one resource active over [res_start, res_end).
+        """
+        if res_start >= res_end:
+            return
+        key = (org, type_)
+        with self._lock:
+            deltas = self._deltas.setdefault(key, {})
+            for day, delta in ((res_start, sign), (res_end, -sign)):
+                deltas[day] = deltas.get(day, 0) + delta
+                if deltas[day] == 0:
+                    del deltas[day]
+            self._series.pop(key, None)
+    
+    def remove(self, org, type_, res_start, res_end):
+        """Remove one resource previously added with the same bounds."""
+        self.add(org, type_, res_start, res_end, sign=-1)
+    
+    def _prefix_sums(self, key):
+        """Get (dates, cumulative sums) for a key, rebuilding if stale. Caller holds the lock."""
+        series = self._series.get(key)
+        if series is None:
+            dates = sorted(self._deltas.get(key, {}))
+            sums = []
+            total = 0
+            for day in dates:
+                total += self._deltas[key][day]
+                sums.append(total)
+            series = self._series[key] = (dates, sums)
+        return series
+    
+    def counts(self, dates, orgs=None, types=None):
+        """
+        Headcount on each date, optionally restricted to orgs and worker types.
+        
+        Args:
+            dates: Iterable of dates
+            orgs: Collection of org names, or None for all orgs
+            types: Collection of worker types, or None for all types
+        
+        Returns:
+            List of counts in the order of dates
+        """
+        dates = list(dates)
+        result = [0] * len(dates)
+        with self._lock:
+            keys = [
+                key for key in self._deltas
+                if (orgs is None or key[0] in orgs) and (types is None or key[1] in types)
+            ]
+            for key in keys:
+                days, sums = self._prefix_sums(key)
+                if not days:
+                    continue
+                for i, day in enumerate(dates):
+                    pos = bisect_right(days, day)
+                    if pos:
+                        result[i] += sums[pos - 1]
+        return result
+    
+    def count(self, on_date, orgs=None, types=None):
+        """Headcount on a single date."""
+        return self.counts([on_date], orgs, types)[0]
+
+
+_index = ProcessWide()
+
+
+def get_headcount_index(max_age=None):
+    """
+    Get the process-wide headcount index, loading it on first use.
+    
+    Args:
+        max_age: Seconds before the index is rebuilt from committed data,
+            or None to never rebuild
+    """
+    return _index.get(lambda index, conn: HeadcountIndex.load(conn.cursor()), older_than(max_age))
+
+
+def loaded_headcount_index():
+    """Get the headcount index if it has been loaded, else None."""
+    return _index.loaded()
+
+
+def reset_headcount_index():
+    """Drop the process-wide index so the next use reloads it."""
+    _index.reset()
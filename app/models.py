@@ -8,6 +8,20 @@ INFINITY_DATE = date(9999, 12, 31)
 INFINITY_DATETIME = datetime(9999, 12, 31, 23, 59, 0)
 
 
+def local_naive(value):
+    """
+    Convert an offset-aware datetime to naive local time, as processing times are stored.
+    
+    PostgreSQL reads an aware value against a timestamp column in the session
+    time zone (the server's local time); the in-memory engines compare with
+    naive values, so aware input is converted the same way first. Naive
+    values and None are returned unchanged.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
 @dataclass
 class Worker:
     """Worker model."""
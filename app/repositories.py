@@ -106,14 +106,6 @@ class WorkerRepository:
 class ResourceRepository:
     """Repository for resource data access."""
     
-    @staticmethod
-    def _get_next_rid() -> int:
-        """Get the next RID from the sequence."""
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT nextval('resource_rid_seq') as rid")
-            return cursor.fetchone()['rid']
-    
     @staticmethod
     def create(wid: int, res_start, res_end, proc_start, proc_end) -> tuple:
         """
@@ -140,7 +132,6 @@ class ResourceRepository:
         validate_business_time_range(res_start, res_end)
         validate_processing_time_range(proc_start, proc_end)
         
-        rid = ResourceRepository._get_next_rid()
         version = 1
         
         with get_db() as conn:
@@ -148,9 +139,11 @@ class ResourceRepository:
             cursor.execute(
                 """INSERT INTO resource 
                    (RID, version, WID, res_start, res_end, proc_start, proc_end)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (rid, version, wid, res_start, res_end, proc_start, proc_end)
+                   VALUES (nextval('resource_rid_seq'), %s, %s, %s, %s, %s, %s)
+                   RETURNING RID""",
+                (version, wid, res_start, res_end, proc_start, proc_end)
             )
+            rid = cursor.fetchone()['rid']
         
         return rid, version
     
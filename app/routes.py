@@ -1,12 +1,340 @@
 """API routes for worker and resource management."""
-from flask import Blueprint, request, jsonify
-from datetime import datetime, date
-from app.services import ResourceService
+import base64
+import json
+import math
+from flask import Blueprint, Response, g, request, jsonify
+from datetime import datetime, date, timedelta
+from app.services import ResourceService, enabled_in_memory_engines
+from app.cache import loaded_as_of_cache, loaded_forecast_budget_cache
+from app.database import get_data_version, get_pool_stats
+from app.forecast import GRANULARITIES, date_points
+from app.serialization import (
+    ARROW_FORMATS,
+    FORMATS,
+    RESOURCE_FIELDS,
+    ResourceEncoder,
+    UnsupportedFormatError,
+    check_format,
+    dumps,
+    resource_columns
+)
 from app.validation import ValidationError
 
 
 api_bp = Blueprint('api', __name__)
 
+# Upper bounds on the processing times and business dates of a forecast
+# evolution request, and on step_days (about a century)
+MAX_EVOLUTION_POINTS = 1000
+MAX_EVOLUTION_DATES = 3660
+MAX_EVOLUTION_STEP_DAYS = 36525
+
+# Page sizes for the resource list endpoints
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10000
+
+# Rows serialized per chunk of a streamed response
+STREAM_CHUNK_ROWS = 1000
+
+# Rows per Arrow record batch or Parquet row group
+COLUMNAR_BATCH_ROWS = 10000
+
+# Accept header media types -> output format, preferred first
+MEDIA_TYPE_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'text/csv': 'csv',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+}
+
+# GET endpoints whose responses do not follow the data version
+UNVERSIONED_ENDPOINTS = {'api.get_db_pool_stats', 'api.get_cache_stats'}
+
+# GET endpoints each in-process engine may answer. Those engines reload on
+# their own schedule and can lag the data version (by minutes in other
+# processes), so these responses are not tagged while the engine is enabled.
+ENGINE_ENDPOINTS = {
+    'headcount_index': {'api.get_forecast_budget', 'api.get_forecast_budget_batch', 'api.get_headcount'},
+    'as_of_index': {'api.as_of_query'},
+    'resource_snapshot': {
+        'api.get_active_resources', 'api.get_open_resource_records', 'api.as_of_query',
+        'api.get_forecast_series', 'api.get_headcount',
+    },
+}
+
+
+@api_bp.before_request
+def _check_not_modified():
+    """
+    Answer a conditional GET with 304 while the data version is unchanged.
+    
+    The ETag is the data version plus today's date (defaults such as the
+    active resources' business date move at midnight). It is read before
+    the endpoint reads the database, so a write committed in between can
+    only make the tag older than the body, never newer. Endpoints that may
+    be answered by an enabled in-process engine are not tagged (see
+    ENGINE_ENDPOINTS).
+    """
+    if request.method != 'GET' or request.endpoint in UNVERSIONED_ENDPOINTS:
+        return None
+    if any(request.endpoint in ENGINE_ENDPOINTS[engine] for engine in enabled_in_memory_engines()):
+        return None
+    version, modified_at = get_data_version()
+    g.data_etag = f'{version}-{date.today().isoformat()}'
+    g.data_modified_at = modified_at
+    if request.if_none_match.contains_weak(g.data_etag):
+        return Response(status=304)
+    return None
+
+
+@api_bp.after_request
+def _add_validators(response):
+    """Tag GET responses with the data version read by _check_not_modified."""
+    if 'data_etag' in g and response.status_code in (200, 304):
+        response.set_etag(g.data_etag, weak=True)
+        response.last_modified = g.data_modified_at
+        # Let browsers cache, but revalidate on every use
+        response.cache_control.no_cache = True
+        response.vary.add('Accept')
+    return response
+
+
+def _json_response(body, status=200):
+    """Build a JSON response from bytes encoded by app.serialization."""
+    return Response(body, mimetype='application/json'), status
+
+
+def _encode_cursor(rid, version):
+    """Encode a (RID, version) as an opaque continuation token."""
+    payload = json.dumps([rid, version]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode_cursor(token):
+    """Decode a continuation token back into (rid, version)."""
+    try:
+        rid, version = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(rid, int) or not isinstance(version, int):
+            raise ValueError
+        return rid, version
+    except (ValueError, TypeError):
+        raise ValidationError('Invalid cursor')
+
+
+def _page_args():
+    """
+    Parse the limit and cursor parameters of a resource list endpoint.
+    
+    Returns:
+        Tuple of (after, limit), both None when the request is not paged
+    
+    Raises:
+        ValidationError: If limit or cursor is invalid
+    """
+    limit = request.args.get('limit')
+    token = request.args.get('cursor')
+    if limit is None and token is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValidationError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValidationError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return (_decode_cursor(token) if token else None), limit
+
+
+def _int_list_arg(name):
+    """Parse a repeatable and/or comma-separated integer query parameter."""
+    values = [v for arg in request.args.getlist(name) for v in arg.split(',') if v.strip()]
+    try:
+        return [int(v) for v in values]
+    except ValueError:
+        raise ValidationError(f'{name} must be a list of integers')
+
+
+def _filter_args():
+    """
+    Parse the filter and projection parameters of a resource list endpoint.
+    
+    Returns:
+        Tuple of (filters, fields): the filters dict for ResourceService (None
+        when unfiltered) and the requested fields in response order (None for all)
+    
+    Raises:
+        ValidationError: If an id list or field name is invalid
+    """
+    filters = {
+        'orgs': request.args.getlist('org'),
+        'types': request.args.getlist('type'),
+        'wids': _int_list_arg('wid'),
+        'rids': _int_list_arg('rid'),
+        'name_prefix': request.args.get('name_prefix'),
+    }
+    filters = {key: value for key, value in filters.items() if value}
+    
+    fields = None
+    if request.args.get('fields'):
+        requested = {f.strip().lower() for f in request.args['fields'].split(',') if f.strip()}
+        unknown = requested - {field.lower() for field in RESOURCE_FIELDS}
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = [field for field in RESOURCE_FIELDS if field.lower() in requested]
+    
+    return filters or None, fields
+
+
+def _stream_arg():
+    """
+    Parse the stream parameter: 'json' (or true/1) streams a JSON array,
+    'ndjson' one JSON object per line; None when not streaming.
+    """
+    value = request.args.get('stream', '').lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    if value in ('1', 'true', 'yes', 'json'):
+        return 'json'
+    if value == 'ndjson':
+        return 'ndjson'
+    raise ValidationError('stream must be json or ndjson')
+
+
+def _assemble_arg():
+    """
+    Parse the assemble parameter: 'db' has the database build the JSON
+    document, 'app' (the default) encodes rows in Python.
+    """
+    value = request.args.get('assemble', 'app').lower()
+    if value not in ('app', 'db'):
+        raise ValidationError('assemble must be app or db')
+    return value == 'db'
+
+
+def _format_arg(stream):
+    """
+    Pick the output format: the format parameter, else ndjson for
+    stream=ndjson, else the best match for the Accept header (json when
+    there is none). 'columns' is only available through the format parameter.
+    
+    Raises:
+        ValidationError: If the format parameter is unknown
+        UnsupportedFormatError: If no acceptable format can be produced
+    """
+    fmt = request.args.get('format')
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValidationError(f"format must be one of {', '.join(FORMATS)}")
+    elif stream == 'ndjson':
+        fmt = 'ndjson'
+    elif not request.headers.get('Accept'):
+        fmt = 'json'
+    else:
+        best = request.accept_mimetypes.best_match(list(MEDIA_TYPE_FORMATS))
+        if best is None:
+            raise UnsupportedFormatError(
+                f"Acceptable media types: {', '.join(MEDIA_TYPE_FORMATS)}"
+            )
+        fmt = MEDIA_TYPE_FORMATS[best]
+    check_format(fmt)
+    return fmt
+
+
+def _list_args():
+    """
+    Parse the paging, filter, projection, format and streaming parameters of a list endpoint.
+    
+    NDJSON, CSV, Arrow and Parquet are streamed unless the request is paged.
+    
+    Returns:
+        Tuple of (query, limit, fields, fmt): keyword arguments for the
+        ResourceService list method, the page size (None when not paged), the
+        fields to return and the output format (see _format_arg)
+    """
+    after, limit = _page_args()
+    filters, fields = _filter_args()
+    stream = _stream_arg()
+    fmt = _format_arg(stream)
+    assemble = _assemble_arg()
+    if stream and limit:
+        raise ValidationError('stream cannot be combined with limit or cursor')
+    if stream and fmt == 'columns':
+        raise ValidationError('stream cannot be combined with format=columns')
+    if assemble and (stream or fmt != 'json'):
+        raise ValidationError('assemble=db only returns unstreamed json')
+    query = {
+        'after': after,
+        'limit': limit + 1 if limit else None,
+        'filters': filters,
+        'fields': [field.lower() for field in fields] if fields else None,
+    }
+    if assemble:
+        # The database reads the extra row itself and reports the next page
+        query.update(limit=limit, assemble=True)
+    else:
+        streamed = bool(stream) or (fmt not in ('json', 'columns') and not limit)
+        query.update(stream=streamed, tuples=True)
+    return query, limit, fields, fmt
+
+
+def _stream_response(resources, encoder, fmt):
+    """
+    Stream a resource list in fmt, STREAM_CHUNK_ROWS rows per chunk
+    (COLUMNAR_BATCH_ROWS per record batch or row group for Arrow and Parquet).
+    
+    Rows are serialized as they are read, so memory stays flat however large
+    the result. An error after the first chunk can only end the response early.
+    The chunks are not tied to the request context: the request's unit of
+    work ends (and its connection goes back to the pool) before the body is
+    sent, and the rows are read on the stream's own connection (see stream_rows).
+    """
+    chunk_rows = COLUMNAR_BATCH_ROWS if fmt in ARROW_FORMATS else STREAM_CHUNK_ROWS
+    chunks = encoder.iter_encode(resources, fmt, chunk_rows)
+    return Response(chunks, mimetype=FORMATS[fmt]), 200
+
+
+def _list_response(resources, query, limit, fields=None, fmt='json'):
+    """
+    Build the response for a resource list read with the query from _list_args.
+    
+    Paged callers fetch limit + 1 rows; when the extra row is present it is
+    dropped and the X-Next-Cursor header carries the token for the next page.
+    With assemble=db, resources is the (document, next_after) pair built by
+    the database and the document is passed through as is.
+    """
+    if query.get('assemble'):
+        document, next_after = resources
+        response, status = _json_response(document.encode())
+        if next_after:
+            response.headers['X-Next-Cursor'] = _encode_cursor(*next_after)
+        return response, status
+    columns = resource_columns(query['fields'], paged=query['limit'] is not None)
+    encoder = ResourceEncoder(fields, columns)
+    if query['stream']:
+        return _stream_response(resources, encoder, fmt)
+    resources = list(resources)
+    next_cursor = None
+    if limit is not None and len(resources) > limit:
+        resources = resources[:limit]
+        last = resources[-1]
+        if isinstance(last, tuple):
+            # Paged tuple rows start with rid and version (see resource_columns)
+            next_cursor = _encode_cursor(last[0], last[1])
+        else:
+            next_cursor = _encode_cursor(last['rid'], last['version'])
+    if fmt == 'json':
+        body = encoder.encode(resources)
+    elif fmt == 'columns':
+        body = encoder.encode_columns(resources)
+    else:
+        body = b''.join(encoder.iter_encode(resources, fmt, max(len(resources), 1)))
+    response = Response(body, mimetype=FORMATS[fmt])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
 
 @api_bp.route('/workers', methods=['POST'])
 def create_worker():
@@ -79,63 +407,63 @@ def update_resource(rid):
 
 @api_bp.route('/resources/active', methods=['GET'])
 def get_active_resources():
-    """Get all active resources (business date constrained to today)."""
+    """Get all active resources (business date constrained to today).
+    
+    Optional paging: limit and cursor (the X-Next-Cursor of the previous page).
+    Optional filters: org (including descendant orgs) and type (repeatable),
+    wid and rid (repeatable or comma-separated), name_prefix; fields
+    (comma-separated) to return only some fields; stream (json or ndjson);
+    assemble=db to have the database build the JSON document; format (json,
+    columns, ndjson, csv, arrow or parquet) or the Accept header.
+    """
     try:
-        resources = ResourceService.get_active_resources()
-        
-        # Convert to JSON-serializable format
-        result = []
-        for r in resources:
-            result.append({
-                'RID': r['rid'],
-                'version': r['version'],
-                'WID': r['wid'],
-                'name': r['name'],
-                'org': r['org'],
-                'type': r['type'],
-                'res_start': r['res_start'].isoformat(),
-                'res_end': r['res_end'].isoformat(),
-                'proc_start': r['proc_start'].isoformat(),
-                'proc_end': r['proc_end'].isoformat()
-            })
-        
-        return jsonify(result), 200
+        query, limit, fields, fmt = _list_args()
+        resources = ResourceService.get_active_resources(**query)
+        return _list_response(resources, query, limit, fields, fmt)
     
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @api_bp.route('/resources/open', methods=['GET'])
 def get_open_resource_records():
-    """Get all open resource records (proc_end = infinity)."""
+    """Get all open resource records (proc_end = infinity).
+    
+    Optional paging: limit and cursor (the X-Next-Cursor of the previous page).
+    Optional filters: org (including descendant orgs) and type (repeatable),
+    wid and rid (repeatable or comma-separated), name_prefix; fields
+    (comma-separated) to return only some fields; stream (json or ndjson);
+    assemble=db to have the database build the JSON document; format (json,
+    columns, ndjson, csv, arrow or parquet) or the Accept header.
+    """
     try:
-        resources = ResourceService.get_open_resource_records()
-        
-        # Convert to JSON-serializable format
-        result = []
-        for r in resources:
-            result.append({
-                'RID': r['rid'],
-                'version': r['version'],
-                'WID': r['wid'],
-                'name': r['name'],
-                'org': r['org'],
-                'type': r['type'],
-                'res_start': r['res_start'].isoformat(),
-                'res_end': r['res_end'].isoformat(),
-                'proc_start': r['proc_start'].isoformat(),
-                'proc_end': r['proc_end'].isoformat()
-            })
-        
-        return jsonify(result), 200
+        query, limit, fields, fmt = _list_args()
+        resources = ResourceService.get_open_resource_records(**query)
+        return _list_response(resources, query, limit, fields, fmt)
     
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @api_bp.route('/resources/as-of', methods=['GET'])
 def as_of_query():
-    """Execute bi-temporal as-of query."""
+    """Execute bi-temporal as-of query.
+    
+    Optional paging: limit and cursor (the X-Next-Cursor of the previous page).
+    Optional filters: org (including descendant orgs) and type (repeatable),
+    wid and rid (repeatable or comma-separated), name_prefix; fields
+    (comma-separated) to return only some fields; stream (json or ndjson);
+    assemble=db to have the database build the JSON document; format (json,
+    columns, ndjson, csv, arrow or parquet) or the Accept header.
+    """
     business_date_str = request.args.get('business_date')
     processing_datetime_str = request.args.get('processing_datetime')
     
@@ -143,6 +471,8 @@ def as_of_query():
         return jsonify({'error': 'business_date parameter is required'}), 400
     
     try:
+        query, limit, fields, fmt = _list_args()
+        
         # Parse dates
         business_date = date.fromisoformat(business_date_str)
         processing_datetime = None
@@ -150,32 +480,55 @@ def as_of_query():
             processing_datetime = datetime.fromisoformat(processing_datetime_str)
         
         # Execute query
-        resources = ResourceService.as_of_query(business_date, processing_datetime)
-        
-        # Convert to JSON-serializable format
-        result = []
-        for r in resources:
-            result.append({
-                'RID': r['rid'],
-                'version': r['version'],
-                'WID': r['wid'],
-                'name': r['name'],
-                'org': r['org'],
-                'type': r['type'],
-                'res_start': r['res_start'].isoformat(),
-                'res_end': r['res_end'].isoformat(),
-                'proc_start': r['proc_start'].isoformat(),
-                'proc_end': r['proc_end'].isoformat()
-            })
-        
-        return jsonify(result), 200
+        resources = ResourceService.as_of_query(business_date, processing_datetime, **query)
+        return _list_response(resources, query, limit, fields, fmt)
     
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/resources/changes', methods=['GET'])
+def get_resource_changes():
+    """Get what changed between two processing times.
+    
+    Query parameters: from and to (processing datetimes, required). Returns
+    one entry per changed RID with the version current at each end.
+    """
+    from_str = request.args.get('from')
+    to_str = request.args.get('to')
+    
+    if not from_str or not to_str:
+        return jsonify({'error': 'from and to parameters are required'}), 400
+    
+    try:
+        since = datetime.fromisoformat(from_str)
+        until = datetime.fromisoformat(to_str)
+    except ValueError:
+        return jsonify({'error': 'Invalid datetime format'}), 400
+    
+    try:
+        changes = ResourceService.get_changes(since, until)
+        encoder = ResourceEncoder()
+        return _json_response(dumps([
+            {
+                'RID': c['rid'],
+                'before': encoder.object(c['before']) if c['before'] else None,
+                'after': encoder.object(c['after']) if c['after'] else None,
+            }
+            for c in changes
+        ]))
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/orgs', methods=['GET'])
 def get_orgs():
     """Get all organizations."""
@@ -204,3 +557,188 @@ def get_forecast_budget(org_name):
         return jsonify(data), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/forecast-budget', methods=['GET'])
+def get_forecast_budget_batch():
+    """Get forecast and budget time series data for several organizations.
+    
+    Query parameters: org (repeatable). Without org, every organization is returned.
+    """
+    try:
+        org_names = request.args.getlist('org') or None
+        data = ResourceService.get_forecast_budget_data_batch(org_names)
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/forecast/<org_name>', methods=['GET'])
+def get_forecast_series(org_name):
+    """Get forecast headcount for an org over a date range.
+    
+    Query parameters: start and end (required, inclusive) and granularity
+    (daily, weekly or monthly; defaults to monthly).
+    """
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
+    granularity = request.args.get('granularity', 'monthly')
+    
+    if not start_str or not end_str:
+        return jsonify({'error': 'start and end parameters are required'}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    
+    try:
+        start = date.fromisoformat(start_str)
+        end = date.fromisoformat(end_str)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    try:
+        data = ResourceService.get_forecast_series(org_name, start, end, granularity)
+        return jsonify(data), 200
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/forecast/<org_name>/evolution', methods=['GET'])
+def get_forecast_evolution(org_name):
+    """Get how an org's forecast changed across processing time.
+    
+    Business dates: date (repeatable), or start and end (inclusive) with
+    granularity (defaults to monthly). Processing times: processing_datetime
+    (repeatable), or from and to (inclusive) with step_days (defaults to 1).
+    """
+    granularity = request.args.get('granularity', 'monthly')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    
+    try:
+        dates = [date.fromisoformat(d) for d in request.args.getlist('date')]
+        if not dates and request.args.get('start') and request.args.get('end'):
+            start = date.fromisoformat(request.args['start'])
+            end = date.fromisoformat(request.args['end'])
+            if start > end:
+                return jsonify({'error': 'start must be less than or equal to end'}), 400
+            dates = date_points(start, end, granularity).tolist()
+        if len(set(dates)) > MAX_EVOLUTION_DATES:
+            return jsonify({'error': f'at most {MAX_EVOLUTION_DATES} business dates per request'}), 400
+        
+        times = [datetime.fromisoformat(t) for t in request.args.getlist('processing_datetime')]
+        if not times and request.args.get('from') and request.args.get('to'):
+            since = datetime.fromisoformat(request.args['from'])
+            until = datetime.fromisoformat(request.args['to'])
+            step_days = float(request.args.get('step_days', 1))
+            if not math.isfinite(step_days) or step_days > MAX_EVOLUTION_STEP_DAYS:
+                return jsonify({'error': f'step_days must be at most {MAX_EVOLUTION_STEP_DAYS}'}), 400
+            step = timedelta(days=step_days)
+            if since > until or step <= timedelta(0):
+                return jsonify({'error': 'from must not be after to and step_days must be positive'}), 400
+            if (until - since) / step >= MAX_EVOLUTION_POINTS:
+                return jsonify({'error': f'at most {MAX_EVOLUTION_POINTS} processing times per request'}), 400
+            while since <= until:
+                times.append(since)
+                since += step
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    if not dates:
+        return jsonify({'error': 'date, or start and end, parameters are required'}), 400
+    if not times:
+        return jsonify({'error': 'processing_datetime, or from and to, parameters are required'}), 400
+    
+    try:
+        data = ResourceService.get_forecast_evolution(org_name, dates, times)
+        return jsonify(data), 200
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/headcount', methods=['GET'])
+def get_headcount():
+    """Get headcount of open resources on one or more business dates.
+    
+    Query parameters: date (repeatable, defaults to today), org and type
+    (repeatable, optional filters on the worker).
+    """
+    try:
+        dates = [date.fromisoformat(d) for d in request.args.getlist('date')] or [date.today()]
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    try:
+        data = ResourceService.get_headcount(
+            dates,
+            orgs=request.args.getlist('org') or None,
+            types=request.args.getlist('type') or None
+        )
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/headcount/series', methods=['GET'])
+def get_headcount_series():
+    """Get headcount per business date over a range, as of a processing time.
+    
+    Query parameters: start and end (required, inclusive), granularity
+    (daily, weekly or monthly; defaults to daily), processing_datetime
+    (defaults to now), and org and type (repeatable, optional filters).
+    """
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
+    granularity = request.args.get('granularity', 'daily')
+    processing_datetime_str = request.args.get('processing_datetime')
+    
+    if not start_str or not end_str:
+        return jsonify({'error': 'start and end parameters are required'}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    
+    try:
+        start = date.fromisoformat(start_str)
+        end = date.fromisoformat(end_str)
+        processing_datetime = None
+        if processing_datetime_str:
+            processing_datetime = datetime.fromisoformat(processing_datetime_str)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    try:
+        data = ResourceService.get_headcount_series(
+            start, end, granularity, processing_datetime,
+            orgs=request.args.getlist('org') or None,
+            types=request.args.getlist('type') or None
+        )
+        return jsonify(data), 200
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/db/pool-stats', methods=['GET'])
+def get_db_pool_stats():
+    """Get database connection pool statistics."""
+    try:
+        return jsonify(get_pool_stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get entry, byte, hit, miss, eviction and invalidation counts of the result caches.
+    
+    A cache that is disabled or has not been used yet is reported as null.
+    """
+    caches = {'as_of': loaded_as_of_cache(), 'forecast_budget': loaded_forecast_budget_cache()}
+    return jsonify({
+        name: cache.entries.stats() if cache is not None else None
+        for name, cache in caches.items()
+    }), 200
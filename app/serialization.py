@@ -0,0 +1,268 @@
+"""Serialization of resource rows to JSON, NDJSON, CSV, Arrow IPC and Parquet.
+
+Resource rows reach the routes either as tuples from a plain cursor (in the
+column order given by resource_columns) or as dicts keyed by lowercase column
+name (the in-memory engines and RealDictCursor). Both are encoded straight to
+bytes in batches: for JSON each row is picked into a dict keyed by response
+field and the whole batch is handed to the encoder in one call, with dates
+and datetimes encoded natively as ISO 8601; for Arrow and Parquet each batch
+becomes a record batch with date32 and timestamp[us] columns. orjson is used
+when installed, the json module otherwise; Arrow and Parquet need pyarrow.
+"""
+import csv
+import io
+import json
+from collections.abc import Mapping
+from itertools import islice
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Resource fields in response order; row keys are the lowercase names
+RESOURCE_FIELDS = ('RID', 'version', 'WID', 'name', 'org', 'type',
+                   'res_start', 'res_end', 'proc_start', 'proc_end')
+
+DATE_FIELDS = ('res_start', 'res_end')
+TIMESTAMP_FIELDS = ('proc_start', 'proc_end')
+
+# Output format -> media type; 'columns' is a JSON object with one array per field
+FORMATS = {
+    'json': 'application/json',
+    'columns': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Formats that need pyarrow
+ARROW_FORMATS = ('arrow', 'parquet')
+
+
+class UnsupportedFormatError(Exception):
+    """Raised when a requested output format cannot be produced."""
+    pass
+
+
+def check_format(fmt):
+    """
+    Check that an output format can be produced here.
+    
+    Raises:
+        UnsupportedFormatError: If fmt is an Arrow format and pyarrow is not installed
+    """
+    if fmt in ARROW_FORMATS and pyarrow is None:
+        raise UnsupportedFormatError(f'{fmt} output requires pyarrow')
+
+
+def resource_columns(fields=None, paged=False):
+    """
+    Row keys selected by a resource list query, in RESOURCE_FIELDS order.
+    
+    Args:
+        fields: Row keys requested, or None for all
+        paged: Whether the query is paged (rid and version are then always selected)
+    """
+    return [
+        name for name in (field.lower() for field in RESOURCE_FIELDS)
+        if fields is None or name in fields or (paged and name in ('rid', 'version'))
+    ]
+
+
+def _default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Serialize obj to compact JSON bytes, with dates and datetimes as ISO 8601 strings."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def _getter(items):
+    """itemgetter that returns a tuple even for a single item."""
+    if len(items) == 1:
+        item = items[0]
+        return lambda row: (row[item],)
+    return itemgetter(*items)
+
+
+def _arrow_type(field):
+    if field in DATE_FIELDS:
+        return pyarrow.date32()
+    if field in TIMESTAMP_FIELDS:
+        return pyarrow.timestamp('us')
+    if field in ('name', 'org', 'type'):
+        return pyarrow.string()
+    return pyarrow.int32()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps written bytes until they are taken."""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def take(self):
+        """Return and forget the bytes written since the last take()."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ResourceEncoder:
+    """Encodes resource rows keyed by response field in each output format."""
+    
+    def __init__(self, fields=None, columns=None):
+        """
+        Args:
+            fields: Response fields (RESOURCE_FIELDS names) in output order, or None for all
+            columns: Row keys of tuple rows in order (see resource_columns), or
+                None when rows are always mappings
+        """
+        self.fields = tuple(fields or RESOURCE_FIELDS)
+        keys = [field.lower() for field in self.fields]
+        self._by_key = _getter(keys)
+        self._by_position = _getter([columns.index(key) for key in keys]) if columns else None
+    
+    def values(self, rows):
+        """Pick the response field values out of rows, as one tuple per row."""
+        if not rows:
+            return []
+        get = self._by_key if isinstance(rows[0], Mapping) else self._by_position
+        return [get(row) for row in rows]
+    
+    def _batches(self, rows, chunk_rows):
+        """Yield values() of an iterable of rows, chunk_rows rows at a time."""
+        rows = iter(rows)
+        while True:
+            values = self.values(list(islice(rows, chunk_rows)))
+            if not values:
+                return
+            yield values
+    
+    def objects(self, rows):
+        """
+        Pick the response fields out of rows.
+        
+        Returns:
+            List of dicts keyed by response field, values unconverted
+        """
+        fields = self.fields
+        return [dict(zip(fields, values)) for values in self.values(rows)]
+    
+    def object(self, row):
+        """Pick the response fields out of one row."""
+        return self.objects([row])[0]
+    
+    def encode(self, rows):
+        """Encode rows as a JSON array."""
+        return dumps(self.objects(rows))
+    
+    def encode_columns(self, rows):
+        """Encode rows as a JSON object mapping each field to the array of its values."""
+        columns = list(zip(*self.values(rows))) or [()] * len(self.fields)
+        return dumps(dict(zip(self.fields, columns)))
+    
+    def arrow_schema(self):
+        """Arrow schema of the response fields."""
+        return pyarrow.schema([(field, _arrow_type(field)) for field in self.fields])
+    
+    def iter_encode(self, rows, fmt='json', chunk_rows=1000):
+        """
+        Encode an iterable of rows, yielding one chunk of bytes per chunk_rows rows.
+        
+        Args:
+            rows: Tuple or mapping rows
+            fmt: 'json' (an array), 'ndjson', 'csv', 'arrow' (IPC stream) or 'parquet'
+            chunk_rows: Rows per chunk (per record batch or row group for Arrow and Parquet)
+        """
+        if fmt == 'json':
+            return self._iter_json(rows, chunk_rows)
+        if fmt == 'ndjson':
+            return self._iter_ndjson(rows, chunk_rows)
+        if fmt == 'csv':
+            return self._iter_csv(rows, chunk_rows)
+        if fmt in ARROW_FORMATS:
+            check_format(fmt)
+            return self._iter_arrow(rows, chunk_rows, parquet=fmt == 'parquet')
+        raise UnsupportedFormatError(f'Unknown format: {fmt}')
+    
+    def _iter_json(self, rows, chunk_rows):
+        yield b'['
+        first = True
+        for values in self._batches(rows, chunk_rows):
+            body = dumps([dict(zip(self.fields, v)) for v in values])[1:-1]
+            yield body if first else b',' + body
+            first = False
+        yield b']'
+    
+    def _iter_ndjson(self, rows, chunk_rows):
+        for values in self._batches(rows, chunk_rows):
+            yield b''.join([dumps(dict(zip(self.fields, v))) + b'\n' for v in values])
+    
+    def _iter_csv(self, rows, chunk_rows):
+        # Dates and datetimes are written in ISO 8601, as in the JSON formats
+        temporal = [
+            i for i, field in enumerate(self.fields) if field in DATE_FIELDS + TIMESTAMP_FIELDS
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(self.fields)
+        for values in self._batches(rows, chunk_rows):
+            if temporal:
+                values = [list(v) for v in values]
+                for v in values:
+                    for i in temporal:
+                        v[i] = v[i].isoformat()
+            writer.writerows(values)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    
+    def _iter_arrow(self, rows, chunk_rows, parquet=False):
+        schema = self.arrow_schema()
+        sink = _ChunkSink()
+        if parquet:
+            writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        else:
+            writer = pyarrow.ipc.new_stream(sink, schema)
+        try:
+            for values in self._batches(rows, chunk_rows):
+                arrays = [
+                    pyarrow.array(column, type=field.type)
+                    for column, field in zip(zip(*values), schema)
+                ]
+                writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+                yield sink.take()
+        finally:
+            writer.close()
+        yield sink.take()
@@ -1,14 +1,400 @@
 """Business logic services for worker and resource management."""
 from datetime import datetime
-from app.database import get_db
-from app.models import INFINITY_DATE, INFINITY_DATETIME
+import numpy as np
+import psycopg2.extensions
+from flask import current_app, has_app_context
+from psycopg2.extras import DateRange
+from app.bitemporal import get_bitemporal_index, loaded_bitemporal_index, open_row
+from app.cache import get_as_of_cache, get_forecast_budget_cache, loaded_as_of_cache
+from app.database import (
+    defer_data_version,
+    get_data_versions,
+    get_db,
+    get_org_data_versions,
+    on_commit,
+    present_write,
+    stream_rows
+)
+from app.forecast import (
+    date_points,
+    forecast_evolution,
+    headcount_at,
+    load_open_periods,
+    load_periods_as_of,
+    load_version_periods
+)
+from app.headcount import get_headcount_index, loaded_headcount_index
+from app.models import INFINITY_DATE, INFINITY_DATETIME, local_naive
+from app.serialization import RESOURCE_FIELDS, resource_columns
+from app.snapshot import get_resource_snapshot, loaded_resource_snapshot
 from app.validation import (
+    validate_date_range,
     validate_required_field,
     validate_business_time_range,
     validate_processing_time_range
 )
 
 
+def _expand_orgs(cursor, orgs):
+    """Expand org names to include all of their descendant orgs."""
+    cursor.execute(
+        "SELECT descendant FROM org_closure WHERE ancestor = ANY(%s)",
+        (list(orgs),)
+    )
+    return set(orgs) | {row['descendant'] for row in cursor.fetchall()}
+
+
+def _headcount_index():
+    """Get the headcount index if enabled with the HEADCOUNT_INDEX config, else None."""
+    if not has_app_context() or not current_app.config.get('HEADCOUNT_INDEX'):
+        return None
+    return get_headcount_index(current_app.config.get('HEADCOUNT_INDEX_MAX_AGE', 300))
+
+
+def _track_headcount(org, type_, old_period=None, new_period=None):
+    """Apply a resource's period change to the loaded headcount index once committed."""
+    index = loaded_headcount_index()
+    if index is None:
+        return
+    
+    def apply():
+        if old_period is not None:
+            index.remove(org, type_, *old_period)
+        if new_period is not None:
+            index.add(org, type_, *new_period)
+    
+    on_commit(apply)
+
+
+def _bitemporal_index():
+    """Get the bi-temporal index if AS_OF_ENGINE is 'memory', else None."""
+    if not has_app_context() or current_app.config.get('AS_OF_ENGINE', 'sql') != 'memory':
+        return None
+    return get_bitemporal_index(current_app.config.get('AS_OF_INDEX_MAX_AGE', 300))
+
+
+def _track_versions(closed=None, opened=None):
+    """Apply closed and opened resource versions to the loaded bi-temporal index once committed."""
+    index = loaded_bitemporal_index()
+    if index is None:
+        return
+    
+    def apply():
+        if closed is not None:
+            index.close_version(*closed)
+        if opened is not None:
+            index.add_version(opened)
+    
+    on_commit(apply)
+
+
+def _resource_snapshot():
+    """Get the columnar resource snapshot if enabled with the RESOURCE_SNAPSHOT config, else None."""
+    if not has_app_context() or not current_app.config.get('RESOURCE_SNAPSHOT'):
+        return None
+    return get_resource_snapshot(current_app.config.get('RESOURCE_SNAPSHOT_MAX_STALENESS', 5))
+
+
+def _track_snapshot():
+    """Have the resource snapshot pick up this transaction's writes on its next read."""
+    snapshot = loaded_resource_snapshot()
+    if snapshot is not None:
+        on_commit(snapshot.mark_stale)
+
+
+def _as_of_cache():
+    """Get the as-of result cache if enabled with the AS_OF_CACHE config, else None."""
+    if not has_app_context() or not current_app.config.get('AS_OF_CACHE'):
+        return None
+    return get_as_of_cache(
+        current_app.config.get('AS_OF_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+        current_app.config.get('AS_OF_CACHE_NOW_TTL', 5)
+    )
+
+
+def enabled_in_memory_engines():
+    """
+    Get the in-process read engines enabled by config.
+    
+    Returns:
+        Set of 'headcount_index', 'as_of_index' and 'resource_snapshot'
+    """
+    if not has_app_context():
+        return set()
+    config = current_app.config
+    engines = set()
+    if config.get('HEADCOUNT_INDEX'):
+        engines.add('headcount_index')
+    if config.get('AS_OF_ENGINE', 'sql') == 'memory':
+        engines.add('as_of_index')
+    if config.get('RESOURCE_SNAPSHOT'):
+        engines.add('resource_snapshot')
+    return engines
+
+
+def _as_of_in_memory():
+    """Whether as_of_query reads from an in-process engine, which may lag the database."""
+    return bool(enabled_in_memory_engines() & {'as_of_index', 'resource_snapshot'})
+
+
+def _track_as_of_cache():
+    """Drop cached as-of results for the current time once this transaction commits."""
+    cache = loaded_as_of_cache()
+    if cache is not None:
+        on_commit(cache.invalidate_now)
+
+
+def _forecast_budget_cache():
+    """
+    Get the forecast and budget series cache if enabled with the FORECAST_CACHE config, else None.
+    
+    Not used with the headcount index, whose forecasts follow writes made
+    elsewhere only when it is rebuilt.
+    """
+    if not has_app_context() or not current_app.config.get('FORECAST_CACHE'):
+        return None
+    if current_app.config.get('HEADCOUNT_INDEX'):
+        return None
+    return get_forecast_budget_cache(current_app.config.get('FORECAST_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+
+def _as_of_key(business_date, processing_datetime, after, limit, filters, fields, tuples, assemble):
+    """Hashable cache key of as_of_query arguments."""
+    frozen = tuple(sorted(
+        (key, tuple(sorted(value)) if isinstance(value, (list, set, tuple)) else value)
+        for key, value in (filters or {}).items()
+    ))
+    return (
+        business_date, processing_datetime, tuple(after) if after else None, limit, frozen,
+        tuple(fields) if fields is not None else None, tuples, assemble
+    )
+
+
+def _keyset(after=None, limit=None):
+    """
+    SQL suffix and parameters for one page of resource rows r in (RID, version) order.
+    
+    Args:
+        after: (rid, version) of the last row of the previous page, or None
+        limit: Maximum number of rows, or None for all rows (unordered)
+    
+    Returns:
+        Tuple of (sql, params) to append to a query's WHERE clause
+    """
+    sql = ''
+    params = {}
+    if after is not None:
+        sql += " AND (r.RID, r.version) > (%(after_rid)s, %(after_version)s)"
+        params.update(after_rid=after[0], after_version=after[1])
+    if limit is not None:
+        sql += " ORDER BY r.RID, r.version LIMIT %(limit)s"
+        params['limit'] = limit
+    return sql, params
+
+
+def _page(rows, after=None, limit=None):
+    """Apply the same paging as _keyset to rows already in memory."""
+    if after is None and limit is None:
+        return rows
+    rows = sorted(
+        (row for row in rows if after is None or (row['rid'], row['version']) > tuple(after)),
+        key=lambda row: (row['rid'], row['version'])
+    )
+    return rows if limit is None else rows[:limit]
+
+
+# Resource list columns by row key
+RESOURCE_COLUMNS = {
+    'rid': 'r.RID',
+    'version': 'r.version',
+    'wid': 'r.WID',
+    'name': 'w.name',
+    'org': 'w.org',
+    'type': 'w.type',
+    'res_start': 'r.res_start',
+    'res_end': 'r.res_end',
+    'proc_start': 'r.proc_start',
+    'proc_end': 'r.proc_end',
+}
+
+
+def _json_value_sql(name, column):
+    """
+    SQL for a resource column as a JSON value matching the app encoder.
+    
+    Timestamps are formatted like datetime.isoformat(), with all six
+    fractional digits when there are microseconds and none otherwise;
+    to_json would drop trailing zeros.
+    """
+    if name not in ('proc_start', 'proc_end'):
+        return column
+    return (
+        f"""to_char({column}, 'YYYY-MM-DD"T"HH24:MI:SS')"""
+        f" || CASE WHEN date_trunc('second', {column}) = {column} THEN ''"
+        f" ELSE to_char({column}, '.US') END"
+    )
+
+
+def _resource_query(where_sql, params, after=None, limit=None, filters=None, fields=None):
+    """
+    Build a resource list query with filters, projection and paging pushed into SQL.
+    
+    worker w is only joined when a worker column or filter needs it.
+    
+    Args:
+        where_sql: Condition on resource r selecting the versions
+        params: Parameters for where_sql, as a dict
+        after: Keyset position, see _keyset
+        limit: Page size, see _keyset
+        filters: Optional dict with orgs (each including its descendant orgs),
+            types, wids and rids (collections) and name_prefix (string)
+        fields: Row keys to return, or None for all (rid and version are
+            always returned when paging)
+    
+    Returns:
+        Tuple of (sql, params); the selected columns are
+        resource_columns(fields, paged=limit is not None)
+    """
+    filters = filters or {}
+    names = resource_columns(fields, paged=limit is not None)
+    params = dict(params)
+    conditions = [where_sql]
+    
+    if filters.get('orgs'):
+        # The org itself also matches when it has no org row, as in _expand_orgs
+        conditions.append(
+            "(w.org = ANY(%(filter_orgs)s)"
+            " OR w.org IN (SELECT descendant FROM org_closure WHERE ancestor = ANY(%(filter_orgs)s)))"
+        )
+        params['filter_orgs'] = list(filters['orgs'])
+    if filters.get('types'):
+        conditions.append("w.type = ANY(%(filter_types)s)")
+        params['filter_types'] = list(filters['types'])
+    if filters.get('wids'):
+        conditions.append("r.WID = ANY(%(filter_wids)s)")
+        params['filter_wids'] = list(filters['wids'])
+    if filters.get('rids'):
+        conditions.append("r.RID = ANY(%(filter_rids)s)")
+        params['filter_rids'] = list(filters['rids'])
+    if filters.get('name_prefix'):
+        conditions.append("w.name LIKE %(filter_name)s")
+        escaped = filters['name_prefix'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params['filter_name'] = escaped + '%'
+    
+    join_worker = (
+        any(RESOURCE_COLUMNS[name].startswith('w.') for name in names)
+        or any(filters.get(key) for key in ('orgs', 'types', 'name_prefix'))
+    )
+    keyset_sql, keyset_params = _keyset(after, limit)
+    sql = (
+        f"SELECT {', '.join(RESOURCE_COLUMNS[name] for name in names)} FROM resource r"
+        + (" JOIN worker w ON r.WID = w.WID" if join_worker else '')
+        + " WHERE " + " AND ".join(f"({c})" for c in conditions)
+        + keyset_sql
+    )
+    params.update(keyset_params)
+    return sql, params
+
+
+def _select_resources(where_sql, params, after=None, limit=None, filters=None, fields=None,
+                      stream=False, tuples=False):
+    """
+    Run a resource list query built by _resource_query.
+    
+    Args:
+        stream: Return a generator reading the rows in batches from a
+            server-side cursor (see stream_rows) instead of a list
+        tuples: Return plain tuples in resource_columns(fields, paged) order
+            instead of row dicts
+        Other arguments: see _resource_query
+    
+    Returns:
+        List (or generator) of row dicts or tuples
+    """
+    sql, params = _resource_query(where_sql, params, after, limit, filters, fields)
+    if stream:
+        return stream_rows(sql, params, tuples=tuples)
+    with get_db() as conn:
+        cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor) if tuples else conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _assemble_resources(where_sql, params, after=None, limit=None, filters=None, fields=None):
+    """
+    Run a resource list query built by _resource_query and have the database
+    assemble the JSON response document.
+    
+    Each row becomes a json_build_object keyed by response field (dates and
+    timestamps in ISO 8601, see _json_value_sql) and json_agg joins them into
+    one array, returned as text, so no Python object is built per row.
+    
+    Args:
+        limit: Page size; one row more is read to tell whether another page follows
+        Other arguments: see _resource_query
+    
+    Returns:
+        Tuple of (document, next_after): the JSON array as a string and, when
+        a further page follows, the (rid, version) of the page's last row
+    """
+    keys = resource_columns(fields)
+    pairs = ', '.join(
+        f"'{field}', {_json_value_sql(field.lower(), 'p.' + field.lower())}"
+        for field in RESOURCE_FIELDS if field.lower() in keys
+    )
+    sql, params = _resource_query(
+        where_sql, params, after, limit + 1 if limit is not None else None, filters, fields
+    )
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if limit is None:
+            cursor.execute(
+                f"""SELECT coalesce(json_agg(json_build_object({pairs})), '[]')::text AS document
+                    FROM ({sql}) p""",
+                params
+            )
+            return cursor.fetchone()['document'], None
+        
+        cursor.execute(
+            f"""SELECT coalesce(json_agg(json_build_object({pairs}) ORDER BY p.n)
+                                FILTER (WHERE p.n <= %(page_size)s), '[]')::text AS document,
+                       max(ARRAY[p.rid, p.version]) FILTER (WHERE p.n = %(page_size)s) AS last,
+                       count(*) > %(page_size)s AS more
+                FROM (SELECT q.*, row_number() OVER (ORDER BY q.rid, q.version) AS n
+                      FROM ({sql}) q) p""",
+            dict(params, page_size=limit)
+        )
+        row = cursor.fetchone()
+        return row['document'], (tuple(row['last']) if row['more'] else None)
+
+
+def _engine_filters(filters):
+    """Expand the org filter to descendant orgs for the in-memory engines."""
+    if not filters or not filters.get('orgs'):
+        return filters or None
+    with get_db() as conn:
+        return dict(filters, orgs=_expand_orgs(conn.cursor(), filters['orgs']))
+
+
+def _filter_rows(rows, filters=None, fields=None):
+    """Apply expanded filters (see _engine_filters) and a projection to rows in memory."""
+    if filters:
+        checks = [
+            (key, set(filters[key])) for key in ('orgs', 'types', 'wids', 'rids') if filters.get(key)
+        ]
+        column = {'orgs': 'org', 'types': 'type', 'wids': 'wid', 'rids': 'rid'}
+        prefix = filters.get('name_prefix')
+        rows = [
+            row for row in rows
+            if all(row[column[key]] in values for key, values in checks)
+            and (not prefix or row['name'].startswith(prefix))
+        ]
+    if fields is not None:
+        keep = set(fields) | {'rid', 'version'}
+        rows = [{key: value for key, value in row.items() if key in keep} for row in rows]
+    return rows
+
+
 class WorkerService:
     """Service for worker operations."""
     
@@ -40,132 +426,284 @@ class ResourceService:
         # Validate business time range (res_start <= INFINITY_DATE)
         validate_business_time_range(res_start, INFINITY_DATE)
         
+        proc_start = datetime.now()
+        
+        # Validate processing time range (proc_start <= INFINITY_DATETIME)
+        validate_processing_time_range(proc_start, INFINITY_DATETIME)
+        
         with get_db() as conn:
             cursor = conn.cursor()
+            defer_data_version(cursor)
             
-            # Create worker
-            cursor.execute(
-                "INSERT INTO worker (name, org, type) VALUES (%s, %s, %s) RETURNING WID",
-                (name, org, type_)
-            )
-            wid = cursor.fetchone()['wid']
-            
-            # Generate RID
-            cursor.execute("SELECT nextval('resource_rid_seq') as rid")
-            rid = cursor.fetchone()['rid']
-            
-            # Create resource
-            proc_start = datetime.now()
+            # Create worker, draw the RID and create the resource in one round trip
+            with present_write(cursor):
+                cursor.execute(
+                    """WITH new_worker AS (
+                           INSERT INTO worker (name, org, type) VALUES (%s, %s, %s)
+                           RETURNING WID
+                       )
+                       INSERT INTO resource
+                       (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                       SELECT nextval('resource_rid_seq'), 1, WID, %s, %s, %s, %s
+                       FROM new_worker
+                       RETURNING RID, WID""",
+                    (name, org, type_, res_start, INFINITY_DATE, proc_start, INFINITY_DATETIME)
+                )
+                row = cursor.fetchone()
             
-            # Validate processing time range (proc_start <= INFINITY_DATETIME)
-            validate_processing_time_range(proc_start, INFINITY_DATETIME)
+            ForecastService.refresh_cells(cursor, org, [(res_start, INFINITY_DATE)])
+            _track_headcount(org, type_, new_period=(res_start, INFINITY_DATE))
+            _track_versions(opened=open_row(
+                row['rid'], 1, row['wid'], name, org, type_, res_start, INFINITY_DATE, proc_start
+            ))
+            _track_snapshot()
+            _track_as_of_cache()
             
-            cursor.execute(
-                """INSERT INTO resource 
-                   (RID, version, WID, res_start, res_end, proc_start, proc_end)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (rid, 1, wid, res_start, INFINITY_DATE, proc_start, INFINITY_DATETIME)
-            )
-            
-            return wid, rid, 1
+            return row['wid'], row['rid'], 1
     
     @staticmethod
     def update_resource(rid, res_start=None, res_end=None):
-        """Update a resource by creating a new version."""
+        """Update a resource by creating a new version.
+        
+        The open version is locked, closed and succeeded by version + 1 in a
+        single statement. The business range check runs inside the statement;
+        if it fails nothing is written and a ValidationError is raised.
+        """
+        # Close current version
+        proc_end = datetime.now()
+        
+        # Validate processing time range (proc_end <= INFINITY_DATETIME)
+        validate_processing_time_range(proc_end, INFINITY_DATETIME)
+        
         with get_db() as conn:
             cursor = conn.cursor()
+            defer_data_version(cursor)
+            with present_write(cursor):
+                cursor.execute(
+                    """WITH open_version AS (
+                           SELECT RID, version, WID, res_start, res_end
+                           FROM resource
+                           WHERE RID = %(rid)s AND proc_end = %(infinity)s
+                           FOR UPDATE
+                       ),
+                       closed AS (
+                           UPDATE resource r SET proc_end = %(now)s
+                           FROM open_version c
+                           WHERE r.RID = c.RID AND r.version = c.version
+                             AND COALESCE(%(res_start)s::date, c.res_start)
+                                 <= COALESCE(%(res_end)s::date, c.res_end)
+                           RETURNING r.RID, r.version, r.WID, r.res_start, r.res_end
+                       ),
+                       inserted AS (
+                           INSERT INTO resource
+                           (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                           SELECT RID, version + 1, WID,
+                                  COALESCE(%(res_start)s::date, res_start),
+                                  COALESCE(%(res_end)s::date, res_end),
+                                  %(now)s, %(infinity)s
+                           FROM closed
+                           RETURNING version, res_start, res_end
+                       )
+                       SELECT c.version, c.WID, c.res_start, c.res_end, w.name, w.org, w.type,
+                              i.version AS new_version,
+                              i.res_start AS new_res_start, i.res_end AS new_res_end
+                       FROM open_version c
+                       JOIN worker w ON w.WID = c.WID
+                       LEFT JOIN inserted i ON TRUE""",
+                    {
+                        'rid': rid,
+                        'res_start': res_start,
+                        'res_end': res_end,
+                        'now': proc_end,
+                        'infinity': INFINITY_DATETIME,
+                    }
+                )
+                row = cursor.fetchone()
             
-            # Get current version
-            cursor.execute(
-                """SELECT * FROM resource 
-                   WHERE RID = %s AND proc_end = %s""",
-                (rid, INFINITY_DATETIME)
-            )
-            current = cursor.fetchone()
-            
-            if not current:
+            if not row:
                 raise ValueError(f"Resource with RID {rid} not found")
             
-            # Close current version
-            proc_end = datetime.now()
-            
-            # Create new version
-            new_version = current['version'] + 1
-            new_res_start = res_start if res_start is not None else current['res_start']
-            new_res_end = res_end if res_end is not None else current['res_end']
-            
-            # Validate business time range
-            validate_business_time_range(new_res_start, new_res_end)
-            
-            # Validate processing time range (proc_end <= INFINITY_DATETIME)
-            validate_processing_time_range(proc_end, INFINITY_DATETIME)
+            if row['new_version'] is None:
+                # Range check rejected the update; raise the usual validation error
+                validate_business_time_range(
+                    res_start if res_start is not None else row['res_start'],
+                    res_end if res_end is not None else row['res_end']
+                )
             
-            cursor.execute(
-                "UPDATE resource SET proc_end = %s WHERE RID = %s AND version = %s",
-                (proc_end, rid, current['version'])
+            ForecastService.refresh_cells(cursor, row['org'], [
+                (row['res_start'], row['res_end']),
+                (row['new_res_start'], row['new_res_end']),
+            ])
+            _track_headcount(
+                row['org'], row['type'],
+                old_period=(row['res_start'], row['res_end']),
+                new_period=(row['new_res_start'], row['new_res_end'])
             )
-            
-            cursor.execute(
-                """INSERT INTO resource 
-                   (RID, version, WID, res_start, res_end, proc_start, proc_end)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (rid, new_version, current['wid'], new_res_start, new_res_end, 
-                 proc_end, INFINITY_DATETIME)
+            _track_versions(
+                closed=(rid, row['version'], proc_end),
+                opened=open_row(
+                    rid, row['new_version'], row['wid'], row['name'], row['org'], row['type'],
+                    row['new_res_start'], row['new_res_end'], proc_end
+                )
             )
+            _track_snapshot()
+            _track_as_of_cache()
             
-            return rid, new_version
+            return rid, row['new_version']
     
     @staticmethod
-    def get_active_resources():
-        """Get all active resources with worker information (business date constrained to today)."""
+    def get_active_resources(after=None, limit=None, filters=None, fields=None, stream=False,
+                             tuples=False, assemble=False):
+        """Get all active resources with worker information (business date constrained to today).
+        
+        Pass limit (and after, the (rid, version) of the last row of the
+        previous page) to get one page in (RID, version) order. filters and
+        fields narrow the rows and columns; stream returns a generator of
+        rows read in batches. With tuples, rows read from the database are
+        plain tuples (rows from the in-memory engines stay dicts). With
+        assemble, the database builds the JSON document and (document,
+        next_after) is returned instead of rows. See _select_resources and
+        _assemble_resources.
+        """
         from datetime import date
         today = date.today()
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """SELECT r.RID, r.version, r.WID, w.name, w.org, w.type,
-                          r.res_start, r.res_end, r.proc_start, r.proc_end
-                   FROM resource r
-                   JOIN worker w ON r.WID = w.WID
-                   WHERE r.proc_end = %s
-                     AND r.res_start <= %s AND r.res_end > %s""",
-                (INFINITY_DATETIME, today, today)
-            )
-            return cursor.fetchall()
+        where_sql = "r.proc_end = %(infinity)s AND r.business_period @> %(today)s::date"
+        params = {'infinity': INFINITY_DATETIME, 'today': today}
+        if assemble:
+            return _assemble_resources(where_sql, params, after, limit, filters, fields)
+        snapshot = _resource_snapshot()
+        if snapshot is not None:
+            return snapshot.active(today, after, limit, _engine_filters(filters), fields)
+        
+        return _select_resources(where_sql, params, after, limit, filters, fields, stream, tuples)
     
     @staticmethod
-    def get_open_resource_records():
-        """Get all open resource records (proc_end = infinity) with worker information."""
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """SELECT r.RID, r.version, r.WID, w.name, w.org, w.type,
-                          r.res_start, r.res_end, r.proc_start, r.proc_end
-                   FROM resource r
-                   JOIN worker w ON r.WID = w.WID
-                   WHERE r.proc_end = %s""",
-                (INFINITY_DATETIME,)
+    def get_open_resource_records(after=None, limit=None, filters=None, fields=None, stream=False,
+                                  tuples=False, assemble=False):
+        """Get all open resource records (proc_end = infinity) with worker information.
+        
+        Paged, filtered, streamed, returned as tuples and assembled like
+        get_active_resources.
+        """
+        where_sql = "r.proc_end = %(infinity)s"
+        params = {'infinity': INFINITY_DATETIME}
+        if assemble:
+            return _assemble_resources(where_sql, params, after, limit, filters, fields)
+        snapshot = _resource_snapshot()
+        if snapshot is not None:
+            return snapshot.open_records(after, limit, _engine_filters(filters), fields)
+        
+        return _select_resources(where_sql, params, after, limit, filters, fields, stream, tuples)
+    
+    @staticmethod
+    def as_of_query(business_date, processing_datetime=None, after=None, limit=None,
+                    filters=None, fields=None, stream=False, tuples=False, assemble=False):
+        """Execute bi-temporal as-of query.
+        
+        Served from the in-memory bi-temporal index when AS_OF_ENGINE is
+        'memory', else from the resource snapshot when RESOURCE_SNAPSHOT is
+        enabled, otherwise from the database (always when assembling).
+        Paged, filtered, streamed, returned as tuples and assembled like
+        get_active_resources.
+        
+        With AS_OF_CACHE enabled, results read from the database (other
+        than streams) are kept in the as-of result cache (see
+        app.cache.AsOfCache); a cached result is shared between callers and
+        must not be modified. Results of the in-memory engines are not
+        cached: in another process they can be minutes behind the database.
+        An offset-aware processing_datetime is converted to local time (see
+        local_naive) before the cache or any engine sees it.
+        """
+        processing_datetime = local_naive(processing_datetime)
+        cache = None if stream or (_as_of_in_memory() and not assemble) else _as_of_cache()
+        if cache is None or not cache.cacheable(processing_datetime):
+            return ResourceService._as_of_query(
+                business_date, processing_datetime, after, limit, filters, fields,
+                stream, tuples, assemble
             )
-            return cursor.fetchall()
+        
+        key = _as_of_key(
+            business_date, processing_datetime, after, limit, filters, fields, tuples, assemble
+        )
+        version, history_version = get_data_versions()
+        result = cache.get(key, processing_datetime, version, history_version)
+        if result is None:
+            result = ResourceService._as_of_query(
+                business_date, processing_datetime, after, limit, filters, fields,
+                stream, tuples, assemble
+            )
+            if not assemble:
+                result = list(result)
+            cache.put(key, processing_datetime, version, history_version, result)
+        return result
     
     @staticmethod
-    def as_of_query(business_date, processing_datetime=None):
-        """Execute bi-temporal as-of query."""
+    def _as_of_query(business_date, processing_datetime, after, limit, filters, fields,
+                     stream, tuples, assemble):
+        """Run an as-of query on the configured engine (see as_of_query)."""
         if processing_datetime is None:
             processing_datetime = datetime.now()
+        where_sql = """r.processing_period @> %(processing)s::timestamp
+                       AND r.business_period @> %(business)s::date"""
+        params = {'processing': processing_datetime, 'business': business_date}
+        if assemble:
+            return _assemble_resources(where_sql, params, after, limit, filters, fields)
+        
+        index = _bitemporal_index()
+        if index is not None:
+            rows = _filter_rows(index.as_of(business_date, processing_datetime), _engine_filters(filters))
+            return _filter_rows(_page(rows, after, limit), fields=fields)
+        snapshot = _resource_snapshot()
+        if snapshot is not None:
+            return snapshot.as_of(
+                business_date, processing_datetime, after, limit, _engine_filters(filters), fields
+            )
+        
+        return _select_resources(where_sql, params, after, limit, filters, fields, stream, tuples)
+    
+    @staticmethod
+    def get_changes(since, until):
+        """Get the net change per resource between two processing times.
+        
+        For every RID with a version opened or closed in (since, until], pairs
+        the version current at since ('before', None if the resource did not
+        exist yet) with the version current at until ('after'). Versions both
+        opened and closed inside the window are superseded and left out. Each
+        side is an index range scan: closed versions on proc_end, new
+        versions on proc_start.
+        
+        Returns:
+            List of {'rid', 'before', 'after'} dicts ordered by RID
+        """
+        # Offset-aware bounds are compared (here and in SQL) in local time
+        since, until = local_naive(since), local_naive(until)
+        validate_date_range(since, until, "from", "to")
         
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """SELECT r.RID, r.version, r.WID, w.name, w.org, w.type,
+                """SELECT 'before' AS side, r.RID, r.version, r.WID, w.name, w.org, w.type,
                           r.res_start, r.res_end, r.proc_start, r.proc_end
                    FROM resource r
                    JOIN worker w ON r.WID = w.WID
-                   WHERE r.proc_start <= %s AND r.proc_end > %s
-                     AND r.res_start <= %s AND r.res_end > %s""",
-                (processing_datetime, processing_datetime, business_date, business_date)
+                   WHERE r.proc_end > %(since)s AND r.proc_end <= %(until)s
+                     AND r.proc_end < %(infinity)s
+                     AND r.proc_start <= %(since)s
+                   UNION ALL
+                   SELECT 'after', r.RID, r.version, r.WID, w.name, w.org, w.type,
+                          r.res_start, r.res_end, r.proc_start, r.proc_end
+                   FROM resource r
+                   JOIN worker w ON r.WID = w.WID
+                   WHERE r.proc_start > %(since)s AND r.proc_start <= %(until)s
+                     AND r.proc_end > %(until)s
+                   ORDER BY RID""",
+                {'since': since, 'until': until, 'infinity': INFINITY_DATETIME}
             )
-            return cursor.fetchall()
+            changes = {}
+            for row in cursor.fetchall():
+                change = changes.setdefault(row['rid'], {'rid': row['rid'], 'before': None, 'after': None})
+                change[row.pop('side')] = row
+            return list(changes.values())
     
     @staticmethod
     def get_orgs():
@@ -190,98 +728,415 @@ class ResourceService:
         """Get forecast and budget time series data for an organization.
         
         Budget data comes from hc_series table (series_type = 'B').
-        Forecast data is calculated from resource table by counting active workers
-        for each budget date (using open records where proc_end = infinity).
+        Forecast data comes from the forecast rows materialized by ForecastService
+        (series_type = 'F'): the count of active workers for each budget date
+        (using open records where proc_end = infinity). Cells not materialized
+        yet are counted from the resource table instead.
+        
+        Values are rolled up over the org and all of its descendants through
+        the org_closure table, so a division sums its departments and teams.
+        """
+        data = ResourceService.get_forecast_budget_data_batch([org_name])
+        return data.get(org_name, {'budget': [], 'forecast': []})
+    
+    @staticmethod
+    def get_forecast_budget_data_batch(org_names=None):
+        """Get forecast and budget time series data for many organizations at once.
+        
+        Same semantics as get_forecast_budget_data, answered for every org by a
+        single query grouped by org and date.
         
-        If org_name is 'All' (root org), sum values across all child orgs.
-        Otherwise, return data for the specific org.
+        Args:
+            org_names: List of org names, or None for all orgs
+        
+        With FORECAST_CACHE enabled, each org's series are kept in the
+        forecast and budget series cache until a resource, worker or budget
+        row of its subtree, or the org hierarchy, changes; only the orgs
+        missing from it are computed. Cached series are shared between
+        callers and must not be modified.
+        
+        Returns:
+            Dict mapping each org name to {'budget': [...], 'forecast': [...]}
         """
+        cache = _forecast_budget_cache()
+        if cache is None:
+            return ResourceService._forecast_budget_data(org_names)
+        
+        if org_names is None:
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM org ORDER BY name")
+                org_names = [row['name'] for row in cursor.fetchall()]
+        hierarchy_version, versions = get_org_data_versions(org_names)
+        
+        result = {name: cache.get(name, hierarchy_version, versions.get(name)) for name in org_names}
+        missing = [name for name, series in result.items() if series is None]
+        if missing:
+            computed = ResourceService._forecast_budget_data(missing)
+            for name in missing:
+                result[name] = computed[name]
+                if name in versions:
+                    cache.put(name, hierarchy_version, versions[name], computed[name])
+        return result
+    
+    @staticmethod
+    def _forecast_budget_data(org_names=None):
+        """Compute forecast and budget series (see get_forecast_budget_data_batch)."""
+        index = _headcount_index()
+        
         with get_db() as conn:
             cursor = conn.cursor()
+            params = {'orgs': list(org_names) if org_names is not None else None}
             
-            # Check if this is the root org by seeing if it has no parent
-            cursor.execute("SELECT parent FROM org WHERE name = %s", (org_name,))
-            org_row = cursor.fetchone()
+            if org_names is None:
+                cursor.execute("SELECT name FROM org ORDER BY name")
+                org_names = [row['name'] for row in cursor.fetchall()]
+            result = {name: {'budget': [], 'forecast': []} for name in org_names}
             
-            if not org_row:
-                return {'budget': [], 'forecast': []}
-            
-            is_root = org_row['parent'] is None
+            # Budget and materialized forecast per (org, date), each org rolled
+            # up over its subtree; only dates with a budget row are returned.
+            # A cell not materialized yet (an org or budget date added with
+            # SQL since the last rebuild) is counted from the resource table
+            cursor.execute("""
+                SELECT c.ancestor AS org, d.date,
+                       SUM(b.value) AS budget_value,
+                       SUM(COALESCE(f.value, (
+                           SELECT COUNT(*)::integer
+                           FROM resource r
+                           JOIN worker w ON r.WID = w.WID
+                           WHERE w.org = c.descendant
+                             AND r.proc_end = %(infinity)s
+                             AND r.business_period @> d.date
+                       ))) AS worker_count
+                FROM org_closure c
+                CROSS JOIN (SELECT DISTINCT date FROM hc_series WHERE series_type = 'B') d
+                LEFT JOIN hc_series b
+                       ON b.series_type = 'B' AND b.org = c.descendant AND b.date = d.date
+                LEFT JOIN hc_series f
+                       ON f.series_type = 'F' AND f.org = c.descendant AND f.date = d.date
+                WHERE %(orgs)s::text[] IS NULL OR c.ancestor = ANY(%(orgs)s::text[])
+                GROUP BY c.ancestor, d.date
+                HAVING COUNT(b.value) > 0
+                ORDER BY c.ancestor, d.date
+            """, dict(params, infinity=INFINITY_DATETIME))
+            rows = cursor.fetchall()
             
-            # Get budget data from hc_series table
-            if is_root:
-                # Sum budget values across all child orgs
+            if index is not None:
+                # Forecast from the in-memory headcount index instead
                 cursor.execute("""
-                    SELECT date, SUM(value) as total_value
-                    FROM hc_series
-                    WHERE series_type = 'B' 
-                      AND org IN (SELECT name FROM org WHERE parent = %s)
-                    GROUP BY date
-                    ORDER BY date
-                """, (org_name,))
+                    SELECT ancestor AS org, array_agg(descendant) AS scope
+                    FROM org_closure
+                    WHERE %(orgs)s::text[] IS NULL OR ancestor = ANY(%(orgs)s::text[])
+                    GROUP BY ancestor
+                """, params)
+                scopes = {row['org']: set(row['scope']) for row in cursor.fetchall()}
+                dates_by_org = {}
+                for row in rows:
+                    dates_by_org.setdefault(row['org'], []).append(row['date'])
+                counts = {
+                    org: iter(index.counts(dates, orgs=scopes[org]))
+                    for org, dates in dates_by_org.items()
+                }
+                worker_counts = [next(counts[row['org']]) for row in rows]
             else:
-                # Get budget data for specific org
-                cursor.execute("""
-                    SELECT date, value
-                    FROM hc_series
-                    WHERE series_type = 'B' AND org = %s
-                    ORDER BY date
-                """, (org_name,))
-            
-            budget_rows = cursor.fetchall()
-            budget_data = []
-            forecast_data = []
-            
-            for row in budget_rows:
-                budget_data.append({
-                    'date': row['date'].isoformat(),
-                    'value': row['total_value'] if is_root else row['value']
-                })
-            
-            # Get forecast data by counting active workers from resource table
-            # For each budget date, count workers where:
-            # - proc_end = infinity (open records)
-            # - res_start <= date AND res_end > date (active on that date)
-            if is_root:
-                # Count workers across all child orgs
-                for row in budget_rows:
-                    budget_date = row['date']
-                    cursor.execute("""
-                        SELECT COUNT(*) as worker_count
-                        FROM resource r
-                        JOIN worker w ON r.WID = w.WID
-                        WHERE r.proc_end = %s
-                          AND r.res_start <= %s 
-                          AND r.res_end > %s
-                          AND w.org IN (SELECT name FROM org WHERE parent = %s)
-                    """, (INFINITY_DATETIME, budget_date, budget_date, org_name))
-                    
-                    count_row = cursor.fetchone()
-                    forecast_data.append({
-                        'date': budget_date.isoformat(),
-                        'value': count_row['worker_count']
-                    })
+                worker_counts = [row['worker_count'] for row in rows]
+        
+        for row, count in zip(rows, worker_counts):
+            series = result.setdefault(row['org'], {'budget': [], 'forecast': []})
+            day = row['date'].isoformat()
+            series['budget'].append({'date': day, 'value': row['budget_value']})
+            series['forecast'].append({'date': day, 'value': count})
+        
+        return result
+    
+    @staticmethod
+    def get_forecast_series(org_name, start, end, granularity='monthly'):
+        """Get forecast headcount for an org over a date range at any granularity.
+        
+        Uses the same rules as get_forecast_budget_data (open records with
+        res_start <= date < res_end, rolled up over the org's subtree) but
+        evaluates every date of the range, not only the budget dates. The
+        org's open periods are loaded once and counted with NumPy.
+        
+        Args:
+            org_name: Org whose subtree is counted
+            start: First date of the range
+            end: Last date of the range
+            granularity: 'daily', 'weekly' or 'monthly'
+        
+        Returns:
+            List of {'date', 'value'} dicts
+        """
+        validate_date_range(start, end, "start", "end")
+        dates = date_points(start, end, granularity)
+        snapshot = _resource_snapshot()
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            if snapshot is not None:
+                res_starts, res_ends = snapshot.open_periods(orgs=_expand_orgs(cursor, [org_name]))
             else:
-                # Count workers for specific org
-                for row in budget_rows:
-                    budget_date = row['date']
-                    cursor.execute("""
-                        SELECT COUNT(*) as worker_count
-                        FROM resource r
-                        JOIN worker w ON r.WID = w.WID
-                        WHERE r.proc_end = %s
-                          AND r.res_start <= %s 
-                          AND r.res_end > %s
-                          AND w.org = %s
-                    """, (INFINITY_DATETIME, budget_date, budget_date, org_name))
-                    
-                    count_row = cursor.fetchone()
-                    forecast_data.append({
-                        'date': budget_date.isoformat(),
-                        'value': count_row['worker_count']
-                    })
-            
-            return {
-                'budget': budget_data,
-                'forecast': forecast_data
+                res_starts, res_ends = load_open_periods(
+                    cursor,
+                    "w.org IN (SELECT descendant FROM org_closure WHERE ancestor = %(org)s)",
+                    {'org': org_name}
+                )
+        
+        counts = headcount_at(res_starts, res_ends, dates)
+        return [
+            {'date': day, 'value': count}
+            for day, count in zip(dates.astype(str).tolist(), counts.tolist())
+        ]
+    
+    @staticmethod
+    def get_forecast_evolution(org_name, dates, processing_times):
+        """Get an org's forecast on business dates as it stood at several processing times.
+        
+        Same counting rules as get_forecast_series, but versions are taken as
+        of each processing time instead of the open ones. The versions of the
+        org's subtree are loaded once and swept over their processing
+        boundaries, so the cost does not grow with repeated as-of queries.
+        
+        Args:
+            org_name: Org whose subtree is counted
+            dates: Business dates to evaluate
+            processing_times: Processing datetimes to evaluate
+        
+        Returns:
+            List of {'processing_datetime', 'forecast'} dicts in processing
+            time order, each forecast a list of {'date', 'value'} dicts
+        """
+        validate_required_field(dates or None, "date")
+        validate_required_field(processing_times or None, "processing_datetime")
+        dates = np.array(sorted(set(dates)), dtype='datetime64[D]')
+        times = np.array(sorted(set(processing_times)), dtype='datetime64[us]')
+        
+        with get_db() as conn:
+            periods = load_version_periods(
+                conn.cursor(), dates[0].item(), dates[-1].item(), times[0].item(), times[-1].item(),
+                "w.org IN (SELECT descendant FROM org_closure WHERE ancestor = %(org)s)",
+                {'org': org_name}
+            )
+        
+        counts = forecast_evolution(*periods, dates, times)
+        date_strings = dates.astype(str).tolist()
+        return [
+            {
+                'processing_datetime': t.isoformat(),
+                'forecast': [
+                    {'date': day, 'value': value}
+                    for day, value in zip(date_strings, row)
+                ],
             }
+            for t, row in zip(times.tolist(), counts.tolist())
+        ]
+    
+    @staticmethod
+    def get_headcount_series(start, end, granularity='daily', processing_datetime=None,
+                             orgs=None, types=None):
+        """Get headcount at every date of a business range as of a processing time.
+        
+        A resource counts on a date when the as-of predicate of as_of_query
+        holds (proc_start <= processing_datetime < proc_end and
+        res_start <= date < res_end). The matching versions are read in one
+        query and counted for all dates at once with NumPy.
+        
+        Args:
+            start: First business date
+            end: Last business date (inclusive)
+            granularity: 'daily', 'weekly' or 'monthly'
+            processing_datetime: Processing time, defaults to now
+            orgs: Org names (each including its descendant orgs), or None for all
+            types: Worker types, or None for all
+        
+        Returns:
+            List of {'date', 'value'} dicts
+        """
+        validate_date_range(start, end, "start", "end")
+        dates = date_points(start, end, granularity)
+        if processing_datetime is None:
+            processing_datetime = datetime.now()
+        
+        conditions = []
+        if orgs:
+            # The org itself also matches when it has no org row (see _expand_orgs)
+            conditions.append(
+                "(w.org = ANY(%(orgs)s)"
+                " OR w.org IN (SELECT descendant FROM org_closure WHERE ancestor = ANY(%(orgs)s)))"
+            )
+        if types:
+            conditions.append("w.type = ANY(%(types)s)")
+        
+        with get_db() as conn:
+            res_starts, res_ends = load_periods_as_of(
+                conn.cursor(), processing_datetime, start, end,
+                ' AND '.join(conditions),
+                {'orgs': list(orgs or []), 'types': list(types or [])}
+            )
+        
+        counts = headcount_at(res_starts, res_ends, dates)
+        return [
+            {'date': day, 'value': count}
+            for day, count in zip(dates.astype(str).tolist(), counts.tolist())
+        ]
+    
+    @staticmethod
+    def get_headcount(dates, orgs=None, types=None):
+        """Get headcount of open resources on each date.
+        
+        Counts open records (proc_end = infinity) with res_start <= date < res_end,
+        optionally restricted to worker types and orgs (each including its
+        descendant orgs). Served from the headcount index when HEADCOUNT_INDEX
+        is enabled, else from the resource snapshot when RESOURCE_SNAPSHOT is
+        enabled, otherwise by one grouped query.
+        
+        Returns:
+            List of {'date', 'value'} dicts in the order of dates
+        """
+        dates = list(dates)
+        index = _headcount_index()
+        snapshot = _resource_snapshot() if index is None else None
+        
+        if index is not None or snapshot is not None:
+            if orgs:
+                with get_db() as conn:
+                    orgs = _expand_orgs(conn.cursor(), orgs)
+            counts = (index.counts if index is not None else snapshot.headcount)(
+                dates,
+                orgs=set(orgs) if orgs else None,
+                types=set(types) if types else None
+            )
+        else:
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT d.date, COUNT(r.RID) AS worker_count
+                    FROM unnest(%(dates)s::date[]) AS d(date)
+                    LEFT JOIN (
+                        resource r JOIN worker w
+                          ON r.WID = w.WID
+                         AND (%(orgs)s::text[] IS NULL
+                              OR w.org = ANY(%(orgs)s::text[])
+                              OR w.org IN (SELECT descendant FROM org_closure
+                                           WHERE ancestor = ANY(%(orgs)s::text[])))
+                         AND (%(types)s::text[] IS NULL OR w.type = ANY(%(types)s::text[]))
+                    ) ON r.proc_end = %(infinity)s AND r.business_period @> d.date
+                    GROUP BY d.date
+                """, {
+                    'dates': dates,
+                    'orgs': list(orgs) if orgs else None,
+                    'types': list(types) if types else None,
+                    'infinity': INFINITY_DATETIME,
+                })
+                by_date = {row['date']: row['worker_count'] for row in cursor.fetchall()}
+                counts = [by_date.get(day, 0) for day in dates]
+        
+        return [
+            {'date': day.isoformat(), 'value': count}
+            for day, count in zip(dates, counts)
+        ]
+
+
+class ForecastService:
+    """Materializes forecast headcount into hc_series rows with series_type = 'F'.
+    
+    A forecast cell (org, date) holds the number of open resources whose worker
+    belongs to exactly that org and is active on the date, for every org and
+    every date that appears in the budget series. Rollups are summed at read time,
+    where cells without a row are counted from the resource table.
+    """
+    
+    @staticmethod
+    def rebuild():
+        """Recompute every forecast cell from the resource table.
+        
+        Run after bulk loads that bypass the services, or when new budget
+        dates are added.
+        
+        Returns:
+            Number of forecast rows written
+        """
+        with get_db() as conn:
+            return ForecastService._rebuild(conn.cursor())
+    
+    @staticmethod
+    def backfill():
+        """Rebuild the forecast cells if some budget date has no forecast row.
+        
+        Run at startup, so databases created before forecasts were
+        materialized, or loaded with budgets through SQL, do not report a
+        forecast of 0 until someone runs rebuild-forecasts.
+        
+        Returns:
+            Number of forecast rows written (0 when nothing was missing)
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('forecast rebuild'))")
+            cursor.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM hc_series b
+                    WHERE b.series_type = 'B' AND NOT EXISTS (
+                        SELECT 1 FROM hc_series f WHERE f.series_type = 'F' AND f.date = b.date
+                    )
+                ) AS missing
+            """)
+            if not cursor.fetchone()['missing']:
+                return 0
+            return ForecastService._rebuild(cursor)
+    
+    @staticmethod
+    def _rebuild(cursor):
+        """Replace every forecast cell within the cursor's transaction (see rebuild)."""
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('forecast rebuild'))")
+        cursor.execute("DELETE FROM hc_series WHERE series_type = 'F'")
+        cursor.execute("""
+            INSERT INTO hc_series (series_type, org, date, value)
+            SELECT 'F', o.name, d.date, COUNT(r.RID)
+            FROM org o
+            CROSS JOIN (
+                SELECT DISTINCT date FROM hc_series WHERE series_type = 'B'
+            ) d
+            LEFT JOIN (
+                resource r JOIN worker w ON r.WID = w.WID
+            ) ON w.org = o.name
+             AND r.proc_end = %s
+             AND r.business_period @> d.date
+            GROUP BY o.name, d.date
+        """, (INFINITY_DATETIME,))
+        return cursor.rowcount
+    
+    @staticmethod
+    def refresh_cells(cursor, org, periods):
+        """Recompute the forecast cells of one org touched by resource periods.
+        
+        Only budget dates inside the given [start, end) periods are recomputed,
+        within the caller's transaction.
+        
+        Args:
+            cursor: Cursor of the write being applied
+            org: Worker org whose resources changed
+            periods: (start, end) business periods before and after the change
+        """
+        # Counts are absolute and read under READ COMMITTED, so concurrent
+        # writes to one org take turns: the later one counts after the
+        # earlier one has committed and does not overwrite it with a stale count
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('forecast ' || %s))", (org,))
+        cursor.execute("""
+            INSERT INTO hc_series (series_type, org, date, value)
+            SELECT 'F', %(org)s, d.date, COUNT(r.RID)
+            FROM (
+                SELECT DISTINCT date FROM hc_series
+                WHERE series_type = 'B' AND date <@ ANY(%(periods)s::daterange[])
+            ) d
+            LEFT JOIN (
+                resource r JOIN worker w ON r.WID = w.WID AND w.org = %(org)s
+            ) ON r.proc_end = %(infinity)s AND r.business_period @> d.date
+            WHERE EXISTS (SELECT 1 FROM org WHERE name = %(org)s)
+            GROUP BY d.date
+            ON CONFLICT (series_type, org, date) DO UPDATE SET value = EXCLUDED.value
+        """, {
+            'org': org,
+            'periods': [DateRange(start, end, '[)') for start, end in periods],
+            'infinity': INFINITY_DATETIME,
+        })
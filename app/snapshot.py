@@ -0,0 +1,273 @@
+"""Columnar snapshot of resource versions for vectorized bi-temporal queries.
+
+Every resource version occupies one position in a set of NumPy arrays, with
+the worker's org and type dictionary-encoded as integer codes. As-of, active,
+open and headcount queries are boolean masks over those arrays. Refreshes are
+incremental: only versions whose proc_start or proc_end moved since the last
+refresh are read back from the database.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import psycopg2.extensions
+from app.bitemporal import ROW_FIELDS
+from app.cache import ProcessWide
+from app.forecast import headcount_at
+from app.models import INFINITY_DATETIME, local_naive
+
+
+INFINITY_TIMESTAMP = np.datetime64(INFINITY_DATETIME, 'us')
+
+# Column name -> dtype, in ROW_FIELDS order (org and type hold codes)
+COLUMNS = (
+    ('rid', np.int32),
+    ('version', np.int32),
+    ('wid', np.int32),
+    ('name', object),
+    ('org', np.int32),
+    ('type', np.int32),
+    ('res_start', 'datetime64[D]'),
+    ('res_end', 'datetime64[D]'),
+    ('proc_start', 'datetime64[us]'),
+    ('proc_end', 'datetime64[us]'),
+)
+
+SELECT_VERSIONS = """
+    SELECT r.RID, r.version, r.WID, w.name, w.org, w.type,
+           r.res_start, r.res_end, r.proc_start, r.proc_end
+    FROM resource r
+    JOIN worker w ON r.WID = w.WID
+"""
+
+
+class ResourceSnapshot:
+    """Resource versions joined with worker attributes, stored column-wise."""
+    
+    # Versions stamped up to this many seconds before the previous refresh are
+    # read again, covering transactions that committed after it
+    REFRESH_OVERLAP = 60
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        self._positions = {}    # (rid, version) -> position in the columns
+        self.orgs = []          # org code -> name
+        self.types = []         # type code -> name
+        self._org_codes = {}
+        self._type_codes = {}
+        self.refreshed_at = None
+        self.checked_at = time.monotonic()
+        self.stale = True
+    
+    def __len__(self):
+        return len(self._columns['rid'])
+    
+    def refresh(self, conn):
+        """
+        Read versions created or closed since the last refresh (all on first use).
+        
+        Args:
+            conn: Database connection to read committed versions with
+        
+        Returns:
+            Number of versions read
+        """
+        started = datetime.now()
+        cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        if self.refreshed_at is None:
+            cursor.execute(SELECT_VERSIONS)
+        else:
+            cursor.execute(
+                SELECT_VERSIONS + """
+                WHERE r.proc_start >= %(since)s
+                   OR (r.proc_end >= %(since)s AND r.proc_end < %(infinity)s)""",
+                {
+                    'since': self.refreshed_at - timedelta(seconds=self.REFRESH_OVERLAP),
+                    'infinity': INFINITY_DATETIME,
+                }
+            )
+        rows = cursor.fetchall()
+        with self._lock:
+            self._merge(rows)
+            self.refreshed_at = started
+            self.checked_at = time.monotonic()
+            self.stale = False
+        return len(rows)
+    
+    def mark_stale(self):
+        """Force a refresh on the next get_resource_snapshot() call."""
+        self.stale = True
+    
+    @staticmethod
+    def _encode(values, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+    
+    def _merge(self, rows):
+        """Upsert rows (tuples in ROW_FIELDS order) by (rid, version). Caller holds the lock."""
+        if not rows:
+            return
+        values = list(zip(*rows))
+        org_index = ROW_FIELDS.index('org')
+        type_index = ROW_FIELDS.index('type')
+        values[org_index] = [self._encode(self.orgs, self._org_codes, v) for v in values[org_index]]
+        values[type_index] = [self._encode(self.types, self._type_codes, v) for v in values[type_index]]
+        batch = {
+            name: np.array(column, dtype=dtype)
+            for (name, dtype), column in zip(COLUMNS, values)
+        }
+        
+        keys = list(zip(values[0], values[1]))
+        positions = np.array([self._positions.get(key, -1) for key in keys], dtype=np.int64)
+        existing = positions >= 0
+        start = len(self)
+        
+        for name, _ in COLUMNS:
+            column = self._columns[name]
+            column[positions[existing]] = batch[name][existing]
+            self._columns[name] = np.concatenate([column, batch[name][~existing]])
+        
+        for offset, key in enumerate(key for key, seen in zip(keys, existing) if not seen):
+            self._positions[key] = start + offset
+    
+    def _mask(self, processing_datetime=None, business_date=None, orgs=None, types=None,
+              wids=None, rids=None, name_prefix=None):
+        """
+        Select versions by processing time (None for open versions), business
+        date, org and type names, WIDs, RIDs and worker name prefix. Caller
+        holds the lock.
+        """
+        c = self._columns
+        if processing_datetime is None:
+            mask = c['proc_end'] == INFINITY_TIMESTAMP
+        else:
+            # numpy would read an offset-aware time as UTC; stored times are local
+            t = np.datetime64(local_naive(processing_datetime), 'us')
+            mask = (c['proc_start'] <= t) & (t < c['proc_end'])
+        if business_date is not None:
+            d = np.datetime64(business_date, 'D')
+            mask &= (c['res_start'] <= d) & (d < c['res_end'])
+        if orgs is not None:
+            mask &= np.isin(c['org'], [self._org_codes[o] for o in orgs if o in self._org_codes])
+        if types is not None:
+            mask &= np.isin(c['type'], [self._type_codes[t] for t in types if t in self._type_codes])
+        if wids is not None:
+            mask &= np.isin(c['wid'], list(wids))
+        if rids is not None:
+            mask &= np.isin(c['rid'], list(rids))
+        if name_prefix is not None:
+            positions = np.flatnonzero(mask)
+            mask[positions] = [name.startswith(name_prefix) for name in c['name'][positions]]
+        return mask
+    
+    def _rows(self, mask, after=None, limit=None, fields=None):
+        """
+        Materialize the selected versions as row dicts. Caller holds the lock.
+        
+        With after ((rid, version) of the last row of the previous page) or
+        limit, only that page is materialized, in (rid, version) order. With
+        fields, only those columns are materialized.
+        """
+        positions = np.flatnonzero(mask)
+        if after is not None or limit is not None:
+            rid = self._columns['rid'][positions]
+            version = self._columns['version'][positions]
+            if after is not None:
+                later = (rid > after[0]) | ((rid == after[0]) & (version > after[1]))
+                positions, rid, version = positions[later], rid[later], version[later]
+            order = np.lexsort((version, rid))
+            positions = positions[order[:limit] if limit is not None else order]
+        names = [
+            name for name in ROW_FIELDS
+            if fields is None or name in fields or (limit is not None and name in ('rid', 'version'))
+        ]
+        columns = []
+        for name in names:
+            column = self._columns[name][positions].tolist()
+            if name == 'org':
+                column = [self.orgs[code] for code in column]
+            elif name == 'type':
+                column = [self.types[code] for code in column]
+            columns.append(column)
+        return [dict(zip(names, values)) for values in zip(*columns)]
+    
+    # The list queries take filters as a dict of _mask keyword arguments
+    # (orgs, types, wids, rids, name_prefix) and fields as column names.
+    
+    def as_of(self, business_date, processing_datetime, after=None, limit=None,
+              filters=None, fields=None):
+        """Versions with proc_start <= processing_datetime < proc_end and res_start <= business_date < res_end."""
+        with self._lock:
+            mask = self._mask(processing_datetime, business_date, **(filters or {}))
+            return self._rows(mask, after, limit, fields)
+    
+    def open_records(self, after=None, limit=None, filters=None, fields=None):
+        """Open versions (proc_end = infinity)."""
+        with self._lock:
+            return self._rows(self._mask(**(filters or {})), after, limit, fields)
+    
+    def active(self, on_date, after=None, limit=None, filters=None, fields=None):
+        """Open versions with res_start <= on_date < res_end."""
+        with self._lock:
+            return self._rows(self._mask(business_date=on_date, **(filters or {})), after, limit, fields)
+    
+    def open_periods(self, orgs=None, types=None):
+        """
+        Business periods of open versions, optionally restricted to orgs and types.
+        
+        Returns:
+            Tuple of (res_starts, res_ends) datetime64[D] arrays
+        """
+        with self._lock:
+            mask = self._mask(orgs=orgs, types=types)
+            return self._columns['res_start'][mask], self._columns['res_end'][mask]
+    
+    def headcount(self, dates, orgs=None, types=None):
+        """
+        Open versions active on each date, optionally restricted to orgs and types.
+        
+        Returns:
+            List of counts in the order of dates
+        """
+        res_starts, res_ends = self.open_periods(orgs, types)
+        return headcount_at(res_starts, res_ends, np.array(list(dates), dtype='datetime64[D]')).tolist()
+
+
+_snapshot = ProcessWide()
+
+
+def get_resource_snapshot(max_staleness=None):
+    """
+    Get the process-wide resource snapshot, refreshing it when needed.
+    
+    The snapshot is refreshed when it has been marked stale (by a local write)
+    or was last refreshed more than max_staleness seconds ago.
+    
+    Args:
+        max_staleness: Seconds between refreshes, or None to refresh only when stale
+    """
+    def needs_load(snapshot):
+        return snapshot is None or snapshot.stale or (
+            max_staleness is not None and time.monotonic() - snapshot.checked_at > max_staleness
+        )
+    
+    def load(snapshot, conn):
+        snapshot = snapshot or ResourceSnapshot()
+        snapshot.refresh(conn)
+        return snapshot
+    
+    return _snapshot.get(load, needs_load)
+
+
+def loaded_resource_snapshot():
+    """Get the resource snapshot if it has been created, else None."""
+    return _snapshot.loaded()
+
+
+def reset_resource_snapshot():
+    """Drop the process-wide snapshot so the next use reloads it."""
+    _snapshot.reset()
@@ -56,6 +56,7 @@ def app():
             cursor.execute("DROP TABLE IF EXISTS resource CASCADE")
             cursor.execute("DROP TABLE IF EXISTS worker CASCADE")
             cursor.execute("DROP SEQUENCE IF EXISTS resource_rid_seq CASCADE")
+            cursor.execute("DROP TABLE IF EXISTS schema_version")
 
 
 @pytest.fixture(scope='function')
@@ -73,3 +74,38 @@ def clean_db(app):
             cursor.execute("TRUNCATE TABLE resource, worker RESTART IDENTITY CASCADE")
             cursor.execute("ALTER SEQUENCE resource_rid_seq RESTART WITH 1")
     yield
+
+
+@pytest.fixture(scope='function')
+def budget_data(app, clean_db):
+    """Load a small org tree with budget series; removed after each test.
+    
+    All -> Sales, Marketing with budget rows on 2024-01-01, 2024-02-01 and
+    2024-03-01.
+    """
+    with app.app_context():
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM hc_series")
+            cursor.execute("""
+                INSERT INTO org (name, parent) VALUES ('All', NULL)
+                ON CONFLICT (name) DO NOTHING
+            """)
+            cursor.execute("""
+                INSERT INTO org (name, parent) VALUES ('Sales', 'All'), ('Marketing', 'All')
+                ON CONFLICT (name) DO NOTHING
+            """)
+            cursor.execute("""
+                INSERT INTO hc_series (series_type, org, date, value) VALUES
+                    ('B', 'Sales', '2024-01-01', 2),
+                    ('B', 'Sales', '2024-02-01', 3),
+                    ('B', 'Sales', '2024-03-01', 4),
+                    ('B', 'Marketing', '2024-01-01', 1),
+                    ('B', 'Marketing', '2024-02-01', 1),
+                    ('B', 'Marketing', '2024-03-01', 2)
+            """)
+    yield
+    with app.app_context():
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM hc_series")
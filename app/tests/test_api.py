@@ -1,6 +1,10 @@
 """Unit tests for API endpoints."""
+import json
 import pytest
-from datetime import date, datetime
+from datetime import date, datetime, timedelta, timezone
+from app import routes
+from app.bitemporal import reset_bitemporal_index
+from app.database import get_pool_stats
 from app.models import INFINITY_DATE, INFINITY_DATETIME
 
 
@@ -226,6 +230,28 @@ class TestUpdateResourceEndpoint:
         data = response.get_json()
         assert 'error' in data
     
+    def test_update_resource_end_before_existing_start(self, client, clean_db):
+        """Test that res_end before the stored res_start is rejected without writing."""
+        create_response = client.post('/api/workers', json={
+            'name': 'Dana Lee',
+            'org': 'Finance',
+            'type': 'Analyst',
+            'res_start': '2024-06-01'
+        })
+        rid = create_response.get_json()['RID']
+        
+        response = client.put(f'/api/resources/{rid}', json={
+            'res_end': '2024-01-01'
+        })
+        
+        assert response.status_code == 400
+        assert 'res_start' in response.get_json()['error']
+        
+        # The open version is untouched
+        open_records = client.get('/api/resources/open').get_json()
+        assert len(open_records) == 1
+        assert open_records[0]['version'] == 1
+    
     def test_update_resource_invalid_date_format(self, client, clean_db):
         """Test error when date format is invalid."""
         # Create a worker and resource first
@@ -461,6 +487,420 @@ class TestAsOfQueryEndpoint:
         assert len(data) == 0
 
 
+class TestResourceListPagination:
+    """Tests for keyset pagination on the resource list endpoints."""
+    
+    def _walk(self, client, url, limit):
+        """Follow X-Next-Cursor from the first page to the last."""
+        pages = []
+        cursor = None
+        while True:
+            separator = '&' if '?' in url else '?'
+            page_url = f'{url}{separator}limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(page_url)
+            assert response.status_code == 200
+            pages.append(response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                return pages
+    
+    def test_pages_cover_all_rows_in_order(self, client, clean_db):
+        """Test that pages are ordered by (RID, version) and add up to the unpaged result."""
+        for i in range(5):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+        client.put('/api/resources/2', json={'res_end': '2030-01-01'})
+        
+        for url in ('/api/resources/open', '/api/resources/active',
+                    '/api/resources/as-of?business_date=2024-06-01'):
+            pages = self._walk(client, url, 2)
+            assert [len(page) for page in pages] == [2, 2, 1]
+            rows = [(r['RID'], r['version']) for page in pages for r in page]
+            assert rows == sorted(rows)
+            assert sorted(rows) == sorted((r['RID'], r['version']) for r in client.get(url).get_json())
+        
+        assert [r['version'] for page in self._walk(client, '/api/resources/open', 2)
+                for r in page if r['RID'] == 2] == [2]
+    
+    def test_exact_page_has_no_next_cursor(self, client, clean_db):
+        """Test that a page that ends the result does not offer a next cursor."""
+        for i in range(2):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+        
+        response = client.get('/api/resources/open?limit=2')
+        
+        assert len(response.get_json()) == 2
+        assert 'X-Next-Cursor' not in response.headers
+    
+    def test_invalid_paging_parameters(self, client):
+        """Test errors for bad limit and cursor values."""
+        assert client.get('/api/resources/open?limit=0').status_code == 400
+        assert client.get('/api/resources/open?limit=abc').status_code == 400
+        assert client.get('/api/resources/active?cursor=not-a-token').status_code == 400
+        assert client.get('/api/resources/as-of?business_date=2024-01-01&cursor=WzFd').status_code == 400
+
+
+class TestResourceListFilters:
+    """Tests for filters and field projection on the resource list endpoints."""
+    
+    @pytest.fixture
+    def workers(self, client, budget_data):
+        """Create workers in Sales and Marketing (both under All)."""
+        created = {}
+        for name, org, type_ in (('Ann', 'Sales', 'Employee'),
+                                 ('Andy', 'Marketing', 'Consultant - T&M'),
+                                 ('A_x', 'Marketing', 'Employee'),
+                                 ('Bob', 'Sales', 'Employee')):
+            created[name] = client.post('/api/workers', json={
+                'name': name, 'org': org, 'type': type_, 'res_start': '2024-01-01'
+            }).get_json()
+        return created
+    
+    def _names(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        return sorted(r['name'] for r in response.get_json())
+    
+    def test_filters(self, client, workers):
+        """Test org subtree, type, WID, RID and name prefix filters."""
+        for base in ('/api/resources/open?', '/api/resources/active?',
+                     '/api/resources/as-of?business_date=2024-06-01&'):
+            assert self._names(client, base + 'org=All') == ['A_x', 'Andy', 'Ann', 'Bob']
+            assert self._names(client, base + 'org=Marketing') == ['A_x', 'Andy']
+            assert self._names(client, base + 'type=Employee&org=Sales') == ['Ann', 'Bob']
+            assert self._names(client, base + f"wid={workers['Ann']['WID']}&wid={workers['Bob']['WID']}") == ['Ann', 'Bob']
+            assert self._names(client, base + f"rid={workers['Andy']['RID']},{workers['Bob']['RID']}") == ['Andy', 'Bob']
+            assert self._names(client, base + 'name_prefix=An') == ['Andy', 'Ann']
+            assert self._names(client, base + 'name_prefix=A_') == ['A_x']
+    
+    def test_org_without_org_row(self, app, client, clean_db):
+        """Test that every engine returns workers of an org missing from the org table."""
+        client.post('/api/workers', json={
+            'name': 'Eve', 'org': 'Finance', 'type': 'Employee', 'res_start': '2024-01-01'
+        })
+        urls = ['/api/resources/open?org=Finance', '/api/resources/open?org=Finance&assemble=db',
+                '/api/resources/as-of?business_date=2024-06-01&org=Finance']
+        
+        for engine in ('sql', 'memory'):
+            app.config['AS_OF_ENGINE'] = engine
+            reset_bitemporal_index()
+            try:
+                assert [self._names(client, url) for url in urls] == [['Eve']] * len(urls)
+            finally:
+                app.config['AS_OF_ENGINE'] = 'sql'
+                reset_bitemporal_index()
+    
+    def test_fields_projection(self, client, workers):
+        """Test that only requested fields are returned, with paging still working."""
+        response = client.get('/api/resources/open?fields=name,RID')
+        
+        assert response.status_code == 200
+        assert all(set(r) == {'RID', 'name'} for r in response.get_json())
+        
+        first = client.get('/api/resources/open?fields=name&limit=3')
+        second = client.get(f"/api/resources/open?fields=name&limit=3&cursor={first.headers['X-Next-Cursor']}")
+        assert [r for r in first.get_json() + second.get_json()] == [
+            {'name': 'Ann'}, {'name': 'Andy'}, {'name': 'A_x'}, {'name': 'Bob'}
+        ]
+    
+    def test_invalid_filters(self, client):
+        """Test errors for unknown fields and non-integer id lists."""
+        assert client.get('/api/resources/open?fields=RID,salary').status_code == 400
+        assert client.get('/api/resources/active?wid=abc').status_code == 400
+        assert client.get('/api/resources/as-of?business_date=2024-01-01&rid=1,x').status_code == 400
+
+
+class TestStreamingResponses:
+    """Tests for stream=json and stream=ndjson on the resource list endpoints."""
+    
+    def test_streamed_results_match_buffered(self, client, clean_db):
+        """Test that both stream formats carry the same rows as the buffered response."""
+        for i in range(3):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+        
+        for url in ('/api/resources/open?', '/api/resources/active?',
+                    '/api/resources/as-of?business_date=2024-06-01&'):
+            expected = sorted(client.get(url).get_json(), key=lambda r: r['RID'])
+            
+            response = client.get(url + 'stream=json')
+            assert response.status_code == 200
+            assert response.is_streamed
+            assert sorted(json.loads(response.get_data()), key=lambda r: r['RID']) == expected
+            
+            response = client.get(url + 'stream=ndjson&fields=RID,name')
+            assert response.mimetype == 'application/x-ndjson'
+            lines = response.get_data(as_text=True).splitlines()
+            assert sorted((json.loads(line) for line in lines), key=lambda r: r['RID']) == [
+                {'RID': r['RID'], 'name': r['name']} for r in expected
+            ]
+    
+    def test_streamed_empty_result(self, client, clean_db):
+        """Test that an empty streamed result is a valid JSON array."""
+        response = client.get('/api/resources/open?stream=1')
+        
+        assert json.loads(response.get_data()) == []
+    
+    def test_stream_holds_one_connection(self, client, clean_db, monkeypatch):
+        """Test that a stream being read holds only its own pool connection."""
+        monkeypatch.setattr(routes, 'STREAM_CHUNK_ROWS', 1)
+        for i in range(3):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+        in_use = get_pool_stats()['in_use']
+        
+        response = client.get('/api/resources/open?stream=ndjson')
+        chunks = iter(response.response)
+        next(chunks)
+        assert get_pool_stats()['in_use'] == in_use + 1
+        
+        response.close()
+        assert get_pool_stats()['in_use'] == in_use
+    
+    def test_stream_bad_parameters(self, client):
+        """Test errors for unknown formats and streaming combined with paging."""
+        assert client.get('/api/resources/open?stream=xml').status_code == 400
+        assert client.get('/api/resources/open?stream=json&limit=10').status_code == 400
+
+
+class TestAssembledResponses:
+    """Tests for assemble=db on the resource list endpoints."""
+    
+    def test_assembled_results_match_app(self, client, clean_db):
+        """Test that the database-built document has the same rows and ISO dates."""
+        for i in range(3):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales' if i else 'Marketing', 'type': 'Employee',
+                'res_start': '2024-01-01'
+            })
+        client.put('/api/resources/1', json={'res_end': '2024-03-01'})
+        
+        for url in ('/api/resources/open?', '/api/resources/active?',
+                    '/api/resources/as-of?business_date=2024-02-01&',
+                    '/api/resources/open?org=Sales&fields=name,proc_start&'):
+            expected = sorted(client.get(url).get_json(), key=lambda r: (r.get('RID'), r['name']))
+            
+            response = client.get(url + 'assemble=db')
+            assert response.status_code == 200
+            assert response.mimetype == 'application/json'
+            assert sorted(response.get_json(), key=lambda r: (r.get('RID'), r['name'])) == expected
+    
+    def test_assembled_pages(self, client, clean_db):
+        """Test that assembled pages follow the same cursors as the app path."""
+        for i in range(3):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+        
+        first = client.get('/api/resources/open?limit=2&fields=RID&assemble=db')
+        assert first.get_json() == [{'RID': 1}, {'RID': 2}]
+        assert first.headers['X-Next-Cursor'] == client.get('/api/resources/open?limit=2').headers['X-Next-Cursor']
+        
+        second = client.get(f"/api/resources/open?limit=2&assemble=db&cursor={first.headers['X-Next-Cursor']}")
+        assert [r['RID'] for r in second.get_json()] == [3]
+        assert 'X-Next-Cursor' not in second.headers
+    
+    def test_assembled_timestamps_match_isoformat(self, app):
+        """Test that database-formatted timestamps keep trailing zeros like isoformat()."""
+        from app.database import get_db
+        from app.services import _json_value_sql
+        
+        times = [datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 9, 0, 0, 120000),
+                 datetime(2024, 1, 1, 9, 0, 0, 1)]
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                for t in times:
+                    cursor.execute(
+                        f"SELECT {_json_value_sql('proc_start', '%(t)s::timestamp')} AS value", {'t': t}
+                    )
+                    assert cursor.fetchone()['value'] == t.isoformat()
+    
+    def test_assembled_empty_result_and_bad_parameters(self, client, clean_db):
+        """Test an empty document and errors for unknown modes and streaming."""
+        assert client.get('/api/resources/open?assemble=db').get_json() == []
+        assert client.get('/api/resources/open?assemble=sql').status_code == 400
+        assert client.get('/api/resources/open?assemble=db&stream=json').status_code == 400
+
+
+class TestResourceListFormats:
+    """Tests for format negotiation on the resource list endpoints."""
+    
+    @pytest.fixture
+    def three_workers(self, client, clean_db):
+        """Create three open resources in Sales."""
+        for i in range(3):
+            client.post('/api/workers', json={
+                'name': f'W{i}', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+            })
+    
+    def test_text_formats(self, client, three_workers):
+        """Test column-oriented JSON, CSV and NDJSON by parameter and Accept header."""
+        expected = sorted(client.get('/api/resources/open').get_json(), key=lambda r: r['RID'])
+        
+        columns = client.get('/api/resources/open?format=columns&fields=RID,name&limit=10').get_json()
+        assert columns == {'RID': [1, 2, 3], 'name': ['W0', 'W1', 'W2']}
+        
+        response = client.get('/api/resources/open?fields=RID,res_start', headers={'Accept': 'text/csv'})
+        assert response.mimetype == 'text/csv'
+        assert response.is_streamed
+        lines = sorted(response.get_data(as_text=True).splitlines())
+        assert lines == ['1,2024-01-01', '2,2024-01-01', '3,2024-01-01', 'RID,res_start']
+        
+        response = client.get('/api/resources/as-of?business_date=2024-06-01&format=ndjson')
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert sorted(rows, key=lambda r: r['RID']) == expected
+    
+    def test_arrow_formats(self, client, three_workers):
+        """Test Arrow IPC and paged Parquet output with typed columns."""
+        pyarrow = pytest.importorskip('pyarrow')
+        import io
+        import pyarrow.ipc
+        import pyarrow.parquet
+        
+        response = client.get('/api/resources/active?format=arrow')
+        assert response.mimetype == 'application/vnd.apache.arrow.stream'
+        table = pyarrow.ipc.open_stream(response.get_data()).read_all()
+        assert sorted(table.column('RID').to_pylist()) == [1, 2, 3]
+        assert table.schema.field('res_start').type == pyarrow.date32()
+        assert table.schema.field('proc_start').type == pyarrow.timestamp('us')
+        
+        first = client.get('/api/resources/open?limit=2&fields=RID,name',
+                           headers={'Accept': 'application/vnd.apache.parquet'})
+        assert first.mimetype == 'application/vnd.apache.parquet'
+        assert pyarrow.parquet.read_table(io.BytesIO(first.get_data())).to_pylist() == [
+            {'RID': 1, 'name': 'W0'}, {'RID': 2, 'name': 'W1'}
+        ]
+        second = client.get(
+            f"/api/resources/open?limit=2&format=parquet&cursor={first.headers['X-Next-Cursor']}"
+        )
+        assert pyarrow.parquet.read_table(io.BytesIO(second.get_data())).column('RID').to_pylist() == [3]
+    
+    def test_negotiation_errors(self, client, clean_db, monkeypatch):
+        """Test 400 for unknown formats, 406 for unacceptable or unavailable ones."""
+        from app import serialization
+        
+        assert client.get('/api/resources/open?format=xml').status_code == 400
+        assert client.get('/api/resources/open?format=columns&stream=1').status_code == 400
+        assert client.get('/api/resources/open?format=csv&assemble=db').status_code == 400
+        assert client.get('/api/resources/open', headers={'Accept': 'image/png'}).status_code == 406
+        assert client.get('/api/resources/open', headers={'Accept': 'text/html, */*;q=0.8'}).is_json
+        as_of = '/api/resources/as-of?business_date=2024-01-01'
+        assert client.get(as_of, headers={'Accept': 'image/png'}).status_code == 406
+        
+        monkeypatch.setattr(serialization, 'pyarrow', None)
+        assert client.get('/api/resources/open?format=arrow').status_code == 406
+        assert client.get(f'{as_of}&format=arrow').status_code == 406
+
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match on the read endpoints."""
+    
+    def test_not_modified_until_a_write(self, client, clean_db):
+        """Test 304 for an unchanged data version and 200 with a new ETag after a write."""
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        })
+        first = client.get('/api/resources/open')
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'] == 'no-cache'
+        assert 'Last-Modified' in first.headers
+        
+        for url in ('/api/resources/open', '/api/orgs', '/api/headcount?date=2024-06-01'):
+            response = client.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert response.get_data() == b''
+        
+        client.put('/api/resources/1', json={'res_end': '2024-06-01'})
+        response = client.get('/api/resources/open', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()[0]['version'] == 2
+    
+    def test_errors_and_pool_stats_are_not_tagged(self, client):
+        """Test that error responses and pool statistics carry no ETag."""
+        assert 'ETag' not in client.get('/api/resources/as-of').headers
+        assert 'ETag' not in client.get('/api/db/pool-stats').headers
+    
+    def test_in_memory_engine_responses_are_not_tagged(self, app, client, clean_db):
+        """Test that endpoints an enabled in-process engine may answer carry no ETag."""
+        as_of = '/api/resources/as-of?business_date=2024-06-01'
+        app.config['AS_OF_ENGINE'] = 'memory'
+        reset_bitemporal_index()
+        try:
+            assert 'ETag' not in client.get(as_of).headers
+            assert 'ETag' in client.get('/api/resources/open').headers
+        finally:
+            app.config['AS_OF_ENGINE'] = 'sql'
+            reset_bitemporal_index()
+        assert 'ETag' in client.get(as_of).headers
+
+
+class TestResourceChangesEndpoint:
+    """Tests for GET /api/resources/changes endpoint."""
+    
+    def test_changes_pair_versions_per_rid(self, client, clean_db):
+        """Test before/after pairs for updated and newly created resources."""
+        rid_a = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        unchanged = client.post('/api/workers', json={
+            'name': 'C', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        since = datetime.now().isoformat()
+        
+        client.put(f'/api/resources/{rid_a}', json={'res_end': '2024-06-01'})
+        client.put(f'/api/resources/{rid_a}', json={'res_end': '2024-09-01'})
+        rid_b = client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        }).get_json()['RID']
+        until = datetime.now().isoformat()
+        
+        response = client.get(f'/api/resources/changes?from={since}&to={until}')
+        
+        assert response.status_code == 200
+        data = {c['RID']: c for c in response.get_json()}
+        assert set(data) == {rid_a, rid_b}
+        assert unchanged not in data
+        
+        # The intermediate version 2 is superseded within the window
+        assert data[rid_a]['before']['version'] == 1
+        assert data[rid_a]['before']['res_end'] == INFINITY_DATE.isoformat()
+        assert data[rid_a]['after']['version'] == 3
+        assert data[rid_a]['after']['res_end'] == '2024-09-01'
+        assert data[rid_b]['before'] is None
+        assert data[rid_b]['after']['name'] == 'B'
+        
+        # Nothing changed after until
+        response = client.get(f'/api/resources/changes?from={until}&to={datetime.now().isoformat()}')
+        assert response.get_json() == []
+        
+        # An offset-aware bound is read in local time, also mixed with a naive one
+        aware_until = datetime.fromisoformat(until).astimezone(timezone(timedelta(hours=5)))
+        response = client.get(
+            f"/api/resources/changes?from={since}&to={aware_until.isoformat().replace('+', '%2B')}"
+        )
+        assert response.status_code == 200
+        assert {c['RID'] for c in response.get_json()} == {rid_a, rid_b}
+    
+    def test_changes_bad_parameters(self, client):
+        """Test errors for missing, invalid or reversed parameters."""
+        assert client.get('/api/resources/changes?from=2024-01-01T00:00:00').status_code == 400
+        assert client.get('/api/resources/changes?from=bad&to=2024-01-01T00:00:00').status_code == 400
+        assert client.get(
+            '/api/resources/changes?from=2024-02-01T00:00:00&to=2024-01-01T00:00:00'
+        ).status_code == 400
+        assert client.get(
+            '/api/resources/changes?from=2024-01-02T00:00:00%2B00:00&to=2024-01-01T00:00:00'
+        ).status_code == 400
+
+
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions."""
     
@@ -527,3 +967,235 @@ class TestEdgeCases:
         data = active_response.get_json()
         assert len(data) == 1
         assert data[0]['version'] == 6
+
+
+class TestForecastBudgetEndpoint:
+    """Tests for GET /api/forecast-budget/<org_name> endpoint."""
+    
+    def _hire(self, client, name, org, res_start):
+        return client.post('/api/workers', json={
+            'name': name, 'org': org, 'type': 'Employee', 'res_start': res_start
+        }).get_json()['RID']
+    
+    def test_forecast_budget_unknown_org(self, client, budget_data):
+        """Test that an unknown org returns empty series."""
+        response = client.get('/api/forecast-budget/Nowhere')
+        
+        assert response.status_code == 200
+        assert response.get_json() == {'budget': [], 'forecast': []}
+    
+    def test_forecast_budget_single_org(self, client, budget_data):
+        """Test budget and forecast for a leaf org."""
+        self._hire(client, 'A', 'Sales', '2024-01-01')
+        rid = self._hire(client, 'B', 'Sales', '2024-01-15')
+        self._hire(client, 'C', 'Marketing', '2024-01-01')
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        
+        response = client.get('/api/forecast-budget/Sales')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['budget'] == [
+            {'date': '2024-01-01', 'value': 2},
+            {'date': '2024-02-01', 'value': 3},
+            {'date': '2024-03-01', 'value': 4},
+        ]
+        assert data['forecast'] == [
+            {'date': '2024-01-01', 'value': 1},
+            {'date': '2024-02-01', 'value': 2},
+            {'date': '2024-03-01', 'value': 1},
+        ]
+    
+    def test_forecast_budget_root_org_sums_children(self, client, budget_data):
+        """Test that the root org sums budget and forecast over its children."""
+        self._hire(client, 'A', 'Sales', '2024-01-01')
+        self._hire(client, 'B', 'Marketing', '2024-02-01')
+        self._hire(client, 'C', 'Elsewhere', '2024-01-01')
+        
+        response = client.get('/api/forecast-budget/All')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [p['value'] for p in data['budget']] == [3, 4, 6]
+        assert [p['value'] for p in data['forecast']] == [1, 2, 2]
+    
+    def test_forecast_rebuild_matches_incremental(self, app, client, budget_data):
+        """Test that a full rebuild produces the incrementally maintained rows."""
+        from app.database import get_db
+        from app.services import ForecastService
+        
+        self._hire(client, 'A', 'Sales', '2024-01-01')
+        rid = self._hire(client, 'B', 'Marketing', '2024-02-01')
+        client.put(f'/api/resources/{rid}', json={'res_start': '2024-01-01'})
+        
+        def forecast_rows():
+            with app.app_context():
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        """SELECT org, date, value FROM hc_series
+                           WHERE series_type = 'F' AND value > 0 ORDER BY org, date"""
+                    )
+                    return cursor.fetchall()
+        
+        incremental = forecast_rows()
+        with app.app_context():
+            ForecastService.rebuild()
+        
+        assert forecast_rows() == incremental
+        assert len(incremental) == 6
+    
+    def test_forecast_backfill_fills_missing_rows(self, app, client, budget_data):
+        """Test that backfill rebuilds forecasts only when a budget date has none."""
+        from app.database import get_db
+        from app.services import ForecastService
+        
+        self._hire(client, 'A', 'Sales', '2024-01-01')
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute("DELETE FROM hc_series WHERE series_type = 'F'")
+        assert [p['value'] for p in client.get('/api/forecast-budget/Sales').get_json()['forecast']] == [1, 1, 1]
+        
+        with app.app_context():
+            assert ForecastService.backfill() > 0
+            assert ForecastService.backfill() == 0
+        assert [p['value'] for p in client.get('/api/forecast-budget/Sales').get_json()['forecast']] == [1, 1, 1]
+    
+    def test_forecast_counts_cells_added_after_rebuild(self, app, client, budget_data):
+        """Test that orgs and budget dates added with SQL are counted, not reported as 0."""
+        from app.database import get_db
+        
+        self._hire(client, 'A', 'Sales', '2024-01-01')
+        self._hire(client, 'B', 'Sales Support', '2024-02-01')
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO org (name, parent) VALUES ('Sales Support', 'Sales')
+                    ON CONFLICT (name) DO NOTHING
+                """)
+                cursor.execute("""
+                    INSERT INTO hc_series (series_type, org, date, value) VALUES
+                        ('B', 'Sales', '2024-04-01', 4), ('B', 'Sales Support', '2024-02-01', 1)
+                """)
+        
+        try:
+            data = client.get('/api/forecast-budget?org=Sales&org=Sales Support&org=All').get_json()
+            assert [p['value'] for p in data['Sales']['forecast']] == [1, 2, 2, 2]
+            assert [p['value'] for p in data['Sales Support']['forecast']] == [1]
+            assert [p['value'] for p in data['All']['forecast']] == [1, 2, 2, 2]
+        finally:
+            with app.app_context():
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM hc_series")
+                    cursor.execute("DELETE FROM org WHERE name = 'Sales Support'")
+    
+    def test_concurrent_refreshes_of_one_org(self, app, budget_data):
+        """Test that two uncommitted writes to one org both end up counted."""
+        import threading
+        import time
+        from app.database import get_connection, release_connection
+        from app.services import ForecastService
+        
+        def hire(conn, name):
+            cursor = conn.cursor()
+            cursor.execute(
+                """WITH w AS (
+                       INSERT INTO worker (name, org, type) VALUES (%s, 'Sales', 'Employee')
+                       RETURNING WID
+                   )
+                   INSERT INTO resource (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                   SELECT nextval('resource_rid_seq'), 1, WID, %s, %s, now(), %s FROM w""",
+                (name, date(2024, 1, 1), INFINITY_DATE, INFINITY_DATETIME)
+            )
+            ForecastService.refresh_cells(cursor, 'Sales', [(date(2024, 1, 1), INFINITY_DATE)])
+        
+        with app.app_context():
+            first, second = get_connection(), get_connection()
+            try:
+                hire(first, 'A')
+                other = threading.Thread(target=lambda: (hire(second, 'B'), second.commit()))
+                other.start()
+                time.sleep(0.5)
+                first.commit()
+                other.join(10)
+                
+                cursor = first.cursor()
+                cursor.execute(
+                    "SELECT value FROM hc_series WHERE series_type = 'F' AND org = 'Sales' ORDER BY date"
+                )
+                assert [row['value'] for row in cursor.fetchall()] == [2, 2, 2]
+                first.rollback()
+            finally:
+                release_connection(first)
+                release_connection(second)
+    
+    def test_forecast_budget_rolls_up_nested_orgs(self, app, client, budget_data):
+        """Test that budgets and forecasts roll up through every level of the tree."""
+        from app.database import get_db
+        
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO org (name, parent) VALUES ('Sales EMEA', 'Sales')
+                    ON CONFLICT (name) DO NOTHING
+                """)
+                cursor.execute("""
+                    INSERT INTO org (name, parent) VALUES ('Sales EMEA North', 'Sales EMEA')
+                    ON CONFLICT (name) DO NOTHING
+                """)
+                cursor.execute("""
+                    INSERT INTO hc_series (series_type, org, date, value)
+                    VALUES ('B', 'Sales EMEA North', '2024-01-01', 10)
+                """)
+        
+        try:
+            self._hire(client, 'A', 'Sales', '2024-01-01')
+            self._hire(client, 'B', 'Sales EMEA North', '2024-01-01')
+            
+            for org, budget, forecast in (('All', 13, 2), ('Sales', 12, 2),
+                                          ('Sales EMEA', 10, 1)):
+                data = client.get(f'/api/forecast-budget/{org}').get_json()
+                assert data['budget'][0] == {'date': '2024-01-01', 'value': budget}
+                assert data['forecast'][0] == {'date': '2024-01-01', 'value': forecast}
+            
+            response = client.get('/api/headcount?date=2024-01-01&org=Sales')
+            assert response.get_json() == [{'date': '2024-01-01', 'value': 2}]
+        finally:
+            with app.app_context():
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM hc_series")
+                    cursor.execute("DELETE FROM org WHERE name LIKE 'Sales EMEA%'")
+
+
+class TestForecastBudgetBatchEndpoint:
+    """Tests for GET /api/forecast-budget endpoint."""
+    
+    def test_batch_matches_single_org_calls(self, client, budget_data):
+        """Test that each org's batch entry equals its single-org response."""
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        })
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        })
+        
+        response = client.get('/api/forecast-budget')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        for org in ('All', 'Sales', 'Marketing'):
+            assert data[org] == client.get(f'/api/forecast-budget/{org}').get_json()
+    
+    def test_batch_selected_orgs(self, client, budget_data):
+        """Test that only requested orgs are returned, unknown ones empty."""
+        response = client.get('/api/forecast-budget?org=Sales&org=Nowhere')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert set(data) == {'Sales', 'Nowhere'}
+        assert [p['value'] for p in data['Sales']['budget']] == [2, 3, 4]
+        assert data['Nowhere'] == {'budget': [], 'forecast': []}
@@ -0,0 +1,179 @@
+"""Tests for the in-memory bi-temporal index and the as-of engine switch."""
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from hypothesis import given, settings, strategies as st
+from app.bitemporal import BitemporalIndex, reset_bitemporal_index
+from app.models import INFINITY_DATE, INFINITY_DATETIME
+
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def _row(rid, version, res_start, res_end, proc_start, proc_end=INFINITY_DATETIME):
+    return {
+        'rid': rid, 'version': version, 'wid': rid, 'name': f'W{rid}', 'org': 'Sales',
+        'type': 'Employee', 'res_start': res_start, 'res_end': res_end,
+        'proc_start': proc_start, 'proc_end': proc_end,
+    }
+
+
+def _keys(rows):
+    return sorted((row['rid'], row['version'], row['proc_end']) for row in rows)
+
+
+class TestBitemporalIndex:
+    """Tests for BitemporalIndex."""
+    
+    def test_half_open_periods(self):
+        """Test that both periods include their start and exclude their end."""
+        index = BitemporalIndex([
+            _row(1, 1, date(2024, 1, 1), date(2024, 3, 1), BASE_TIME, BASE_TIME + timedelta(days=1))
+        ])
+        
+        assert len(index.as_of(date(2024, 1, 1), BASE_TIME)) == 1
+        assert index.as_of(date(2024, 3, 1), BASE_TIME) == []
+        assert index.as_of(date(2024, 1, 1), BASE_TIME + timedelta(days=1)) == []
+        assert index.as_of(date(2024, 1, 1), BASE_TIME - timedelta(seconds=1)) == []
+    
+    def test_close_and_add_version(self):
+        """Test that an update made after loading is visible at the right processing times."""
+        index = BitemporalIndex([_row(1, 1, date(2024, 1, 1), INFINITY_DATE, BASE_TIME)])
+        update_time = BASE_TIME + timedelta(hours=1)
+        index.close_version(1, 1, update_time)
+        index.add_version(_row(1, 2, date(2024, 1, 1), date(2024, 6, 1), update_time))
+        
+        on = date(2024, 7, 1)
+        assert [r['version'] for r in index.as_of(on, BASE_TIME)] == [1]
+        assert index.as_of(on, update_time) == []
+        assert [r['version'] for r in index.as_of(date(2024, 5, 1), update_time)] == [2]
+
+
+versions = st.lists(
+    st.tuples(
+        st.integers(min_value=0, max_value=400),     # res_start offset (days)
+        st.integers(min_value=0, max_value=400),     # business length (days)
+        st.integers(min_value=0, max_value=100),     # proc_start offset (hours)
+        st.one_of(st.none(), st.integers(min_value=0, max_value=100))  # processing length (hours)
+    ),
+    max_size=40
+)
+
+
+# Feature: worker-resource-tracking, In-memory as-of matches the SQL predicate
+@settings(max_examples=100, deadline=None)
+@given(
+    loaded=versions,
+    added=versions,
+    business_offset=st.integers(min_value=-10, max_value=820),
+    processing_offset=st.integers(min_value=-5, max_value=210)
+)
+def test_as_of_matches_predicate(loaded, added, business_offset, processing_offset):
+    """
+    For any versions, loaded up front or added afterwards, as_of SHALL return
+    exactly the versions with proc_start <= t < proc_end and
+    res_start <= d < res_end.
+    """
+    def build(specs, first_rid):
+        rows = []
+        for i, (res_offset, res_length, proc_offset, proc_length) in enumerate(specs):
+            res_start = date(2024, 1, 1) + timedelta(days=res_offset)
+            proc_start = BASE_TIME + timedelta(hours=proc_offset)
+            proc_end = INFINITY_DATETIME if proc_length is None else proc_start + timedelta(hours=proc_length)
+            rows.append(_row(first_rid + i, 1, res_start, res_start + timedelta(days=res_length),
+                             proc_start, proc_end))
+        return rows
+    
+    initial = build(loaded, 0)
+    later = build(added, len(loaded))
+    index = BitemporalIndex(initial, rebuild_threshold=8)
+    for row in later:
+        index.add_version(row)
+    
+    d = date(2024, 1, 1) + timedelta(days=business_offset)
+    t = BASE_TIME + timedelta(hours=processing_offset)
+    expected = [
+        row for row in initial + later
+        if row['proc_start'] <= t < row['proc_end'] and row['res_start'] <= d < row['res_end']
+    ]
+    assert _keys(index.as_of(d, t)) == _keys(expected)
+
+
+@pytest.fixture(params=['sql', 'memory'])
+def as_of_engine(request, app):
+    """Run a test against both as-of engines."""
+    app.config['AS_OF_ENGINE'] = request.param
+    reset_bitemporal_index()
+    yield request.param
+    app.config['AS_OF_ENGINE'] = 'sql'
+    reset_bitemporal_index()
+
+
+class TestAsOfEngines:
+    """Tests that GET /api/resources/as-of agrees across engines."""
+    
+    def test_as_of_history_matches_sql(self, app, client, clean_db, as_of_engine):
+        """Test as-of results at every recorded processing time against the SQL path."""
+        # Load the index (when enabled) before any writes so they apply incrementally
+        client.get('/api/resources/as-of?business_date=2024-01-01')
+        
+        rid = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        })
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        client.put(f'/api/resources/{rid}', json={'res_start': '2024-01-15'})
+        
+        times = sorted({
+            r['proc_start'] for r in
+            client.get('/api/resources/as-of?business_date=2024-02-15').get_json()
+        } | {r['proc_start'] for r in client.get('/api/resources/open').get_json()})
+        
+        def fetch(engine):
+            app.config['AS_OF_ENGINE'] = engine
+            return [
+                sorted(
+                    client.get(f'/api/resources/as-of?business_date={day}&processing_datetime={t}').get_json(),
+                    key=lambda r: (r['RID'], r['version'])
+                )
+                for t in times for day in ('2024-01-10', '2024-02-15', '2024-04-01')
+            ] + [
+                client.get(
+                    f'/api/resources/as-of?business_date=2024-02-15&processing_datetime={times[-1]}'
+                    '&org=Marketing&fields=RID,name'
+                ).get_json()
+            ]
+        
+        assert fetch(as_of_engine) == fetch('sql')
+        
+        # Paging returns rows in (RID, version) order from either engine
+        app.config['AS_OF_ENGINE'] = as_of_engine
+        first = client.get(f'/api/resources/as-of?business_date=2024-02-15&processing_datetime={times[-1]}&limit=1')
+        second = client.get(
+            f'/api/resources/as-of?business_date=2024-02-15&processing_datetime={times[-1]}'
+            f"&limit=1&cursor={first.headers['X-Next-Cursor']}"
+        )
+        assert [r['RID'] for r in first.get_json() + second.get_json()] == [1, 2]
+        assert 'X-Next-Cursor' not in second.headers
+        
+        # The latest state reflects all writes
+        latest = client.get(f'/api/resources/as-of?business_date=2024-02-15&processing_datetime={times[-1]}')
+        assert sorted(r['RID'] for r in latest.get_json()) == [1, 2]
+    
+    def test_offset_aware_processing_time(self, app, client, clean_db, as_of_engine):
+        """Test that an offset-aware processing time selects the same versions as local time."""
+        client.get('/api/resources/as-of?business_date=2024-01-01')
+        rid = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        
+        for row in client.get('/api/resources/open').get_json():
+            t = datetime.fromisoformat(row['proc_start'])
+            aware = t.astimezone(timezone(timedelta(hours=5))).isoformat().replace('+', '%2B')
+            url = '/api/resources/as-of?business_date=2024-02-15&processing_datetime='
+            response = client.get(url + aware)
+            assert response.status_code == 200
+            assert response.get_json() == client.get(url + t.isoformat()).get_json()
+            assert [r['version'] for r in response.get_json()] == [row['version']]
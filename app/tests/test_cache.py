@@ -0,0 +1,222 @@
+"""Tests for the in-process result caches."""
+import pytest
+from datetime import date, datetime, timezone
+from app.bitemporal import reset_bitemporal_index
+from app.cache import (
+    AsOfCache,
+    LRUCache,
+    loaded_as_of_cache,
+    loaded_forecast_budget_cache,
+    reset_as_of_cache,
+    reset_forecast_budget_cache
+)
+from app.database import get_data_versions, get_db
+from app.models import INFINITY_DATE, INFINITY_DATETIME
+from app.services import ResourceService
+
+
+def _create(client, name, org, res_start):
+    return client.post('/api/workers', json={
+        'name': name, 'org': org, 'type': 'Employee', 'res_start': res_start
+    }).get_json()['RID']
+
+
+def _insert_backdated(app, name, proc_start):
+    """Insert a worker and its first resource version directly, recorded at proc_start."""
+    with app.app_context():
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO worker (name, org, type) VALUES (%s, 'Sales', 'Employee') RETURNING WID",
+                (name,)
+            )
+            wid = cursor.fetchone()['wid']
+            cursor.execute(
+                """INSERT INTO resource (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                   VALUES (nextval('resource_rid_seq'), 1, %s, %s, %s, %s, %s) RETURNING RID""",
+                (wid, date(2024, 1, 1), INFINITY_DATE, proc_start, INFINITY_DATETIME)
+            )
+            return cursor.fetchone()['rid']
+
+
+class TestLRUCache:
+    """Tests for LRUCache."""
+    
+    def test_evicts_least_recently_used_by_bytes(self):
+        """Test byte accounting, recency order and counters."""
+        cache = LRUCache(max_bytes=250)
+        cache.put('a', 'A', size=100)
+        cache.put('b', 'B', size=100)
+        assert cache.get('a') == 'A'
+        
+        cache.put('c', 'C', size=100)
+        assert cache.get('b') is None
+        assert cache.get('a') == 'A' and cache.get('c') == 'C'
+        assert not cache.put('d', 'D', size=300)
+        
+        cache.put('a', 'AA', size=50)
+        assert cache.get('a', valid=lambda value: value != 'AA') is None
+        assert cache.stats() == {
+            'entries': 1, 'bytes': 100, 'max_bytes': 250,
+            'hits': 3, 'misses': 2, 'evictions': 1, 'invalidations': 1
+        }
+
+
+class TestAsOfCache:
+    """Tests for AsOfCache."""
+    
+    def test_validity_of_past_and_now_entries(self):
+        """Test that past entries follow the history version, now entries the data version."""
+        cache = AsOfCache(max_bytes=1 << 20, now_ttl=60)
+        past = datetime(2024, 1, 1)
+        assert cache.cacheable(past) and cache.cacheable(None)
+        assert not cache.cacheable(datetime.now())
+        assert cache.cacheable(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        
+        cache.put('q', past, 1, 1, ['past'])
+        cache.put('q', None, 1, 1, ['now'])
+        assert cache.get('q', past, 2, 1) == ['past']
+        assert cache.get('q', None, 2, 1) is None
+        
+        cache.put('q', None, 2, 1, ['now'])
+        cache.invalidate_now()
+        assert cache.get('q', None, 2, 1) is None
+        assert cache.get('q', past, 2, 2) is None
+        
+        cache.now_ttl = -1
+        cache.put('q', None, 2, 2, ['now'])
+        assert cache.get('q', None, 2, 2) is None
+
+
+@pytest.fixture
+def as_of_cache(app):
+    """Enable the as-of result cache for a test."""
+    app.config['AS_OF_CACHE'] = True
+    reset_as_of_cache()
+    yield
+    app.config['AS_OF_CACHE'] = False
+    reset_as_of_cache()
+
+
+class TestAsOfCacheEndpoint:
+    """Tests for as-of queries served through the cache."""
+    
+    def test_past_results_cached_until_history_changes(self, app, client, clean_db, as_of_cache):
+        """Test that API writes keep past results and a backdated insert drops them."""
+        rid = _insert_backdated(app, 'A', datetime(2024, 1, 1))
+        url = '/api/resources/as-of?business_date=2024-02-01&processing_datetime=2025-01-01T00:00:00'
+        
+        first = client.get(url).get_json()
+        assert [r['RID'] for r in first] == [rid]
+        
+        with app.app_context():
+            _, history_version = get_data_versions()
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-01-15'})
+        with app.app_context():
+            assert get_data_versions()[1] == history_version
+        
+        assert client.get(url).get_json() == first
+        assert loaded_as_of_cache().entries.hits == 1
+        
+        _insert_backdated(app, 'B', datetime(2024, 6, 1))
+        assert len(client.get(url).get_json()) == 2
+        assert loaded_as_of_cache().entries.hits == 1
+    
+    def test_backdated_write_after_present_write_in_one_unit(self, app, client, clean_db, as_of_cache):
+        """Test that a present-time write does not hide a later backdated write of the same unit of work."""
+        rid = _insert_backdated(app, 'A', datetime(2024, 1, 1))
+        url = '/api/resources/as-of?business_date=2024-02-01&processing_datetime=2025-01-01T00:00:00'
+        assert len(client.get(url).get_json()) == 1
+        
+        with app.app_context():
+            ResourceService.update_resource(rid, res_end=date(2024, 1, 15))
+            with get_db() as conn:
+                conn.cursor().execute(
+                    "UPDATE resource SET proc_start = %s WHERE RID = %s AND version = 1",
+                    (datetime(2023, 1, 1), rid)
+                )
+        
+        assert len(client.get(url).get_json()) == 1
+        assert loaded_as_of_cache().entries.hits == 0
+    
+    def test_offset_aware_processing_time(self, app, client, clean_db, as_of_cache):
+        """Test that an offset-aware processing_datetime is answered like without the cache."""
+        url = '/api/resources/as-of?business_date=2024-02-01&processing_datetime=2024-01-01T00:00:00%2B00:00'
+        assert client.get(url).status_code == 200
+        assert client.get(url).status_code == 200
+        assert loaded_as_of_cache().entries.hits == 1
+    
+    def test_in_memory_engines_not_cached(self, app, client, clean_db, as_of_cache):
+        """Test that results of the memory engine bypass the cache."""
+        _insert_backdated(app, 'A', datetime(2024, 1, 1))
+        url = '/api/resources/as-of?business_date=2024-02-01&processing_datetime=2025-01-01T00:00:00'
+        app.config['AS_OF_ENGINE'] = 'memory'
+        reset_bitemporal_index()
+        try:
+            assert len(client.get(url).get_json()) == 1
+            assert loaded_as_of_cache() is None
+            assert len(client.get(url + '&assemble=db').get_json()) == 1
+            assert len(loaded_as_of_cache().entries) == 1
+        finally:
+            app.config['AS_OF_ENGINE'] = 'sql'
+            reset_bitemporal_index()
+    
+    def test_now_results_follow_writes(self, app, client, clean_db, as_of_cache):
+        """Test that queries for the current time see API writes immediately."""
+        url = f'/api/resources/as-of?business_date={date.today().isoformat()}'
+        rid = _create(client, 'A', 'Sales', '2024-01-01')
+        assert len(client.get(url).get_json()) == 1
+        assert len(client.get(url).get_json()) == 1
+        assert loaded_as_of_cache().entries.hits == 1
+        
+        _create(client, 'B', 'Sales', '2024-01-01')
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-02-01'})
+        assert [r['name'] for r in client.get(url).get_json()] == ['B']
+
+
+@pytest.fixture
+def forecast_cache(app):
+    """Enable the forecast and budget series cache for a test."""
+    app.config['FORECAST_CACHE'] = True
+    reset_forecast_budget_cache()
+    yield
+    app.config['FORECAST_CACHE'] = False
+    reset_forecast_budget_cache()
+
+
+class TestForecastBudgetCache:
+    """Tests for forecast and budget series served through the cache."""
+    
+    URL = '/api/forecast-budget?org=Sales&org=Marketing&org=All'
+    
+    def _fetch(self, app, client, cached=True):
+        app.config['FORECAST_CACHE'] = cached
+        try:
+            return client.get(self.URL).get_json()
+        finally:
+            app.config['FORECAST_CACHE'] = True
+    
+    def test_writes_invalidate_only_their_subtree(self, app, client, budget_data, forecast_cache):
+        """Test that a resource or budget write drops its org and ancestors only."""
+        assert self._fetch(app, client) == self._fetch(app, client, cached=False)
+        assert self._fetch(app, client) == self._fetch(app, client, cached=False)
+        stats = loaded_forecast_budget_cache().entries
+        assert (stats.misses, stats.hits) == (3, 3)
+        
+        _create(client, 'A', 'Sales', '2024-01-01')
+        data = self._fetch(app, client)
+        assert data == self._fetch(app, client, cached=False)
+        assert [point['value'] for point in data['Sales']['forecast']] == [1, 1, 1]
+        assert (stats.invalidations, stats.hits) == (2, 4)
+        
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute(
+                    "UPDATE hc_series SET value = 5 WHERE series_type = 'B' AND org = 'Marketing'"
+                )
+        data = self._fetch(app, client)
+        assert data == self._fetch(app, client, cached=False)
+        assert [point['value'] for point in data['Marketing']['budget']] == [5, 5, 5]
+        assert (stats.invalidations, stats.hits) == (4, 5)
+        
+        assert client.get('/api/cache/stats').get_json()['forecast_budget']['hits'] == 5
@@ -0,0 +1,312 @@
+"""Tests for database connection management."""
+import psycopg2
+import pytest
+from datetime import date
+from app.database import (
+    ConnectionPool, PoolTimeoutError, MIGRATIONS, create_schema, get_data_version, get_db,
+    get_pool_stats, get_schema_version, on_commit, stream_rows
+)
+from app.services import ResourceService
+
+
+@pytest.fixture
+def pool(app):
+    """Create a small standalone connection pool against the test database."""
+    pool = ConnectionPool(app.config['DATABASE_URL'], min_size=1, max_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+class TestConnectionPool:
+    """Tests for ConnectionPool."""
+    
+    def test_connection_is_reused(self, pool):
+        """Test that a released connection is handed out again."""
+        conn = pool.acquire()
+        pool.release(conn)
+        
+        assert pool.acquire() is conn
+        assert pool.stats()['connections_created'] == 1
+    
+    def test_acquire_times_out_when_exhausted(self, pool):
+        """Test that acquire raises once max_size connections are in use."""
+        first = pool.acquire()
+        second = pool.acquire()
+        
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+        
+        stats = pool.stats()
+        assert stats['in_use'] == 2
+        assert stats['timeouts'] == 1
+        
+        pool.release(first)
+        pool.release(second)
+    
+    def test_closed_connection_is_replaced(self, pool):
+        """Test that a connection closed while idle is not handed out."""
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+        
+        replacement = pool.acquire()
+        assert replacement is not conn
+        assert not replacement.closed
+        pool.release(replacement)
+    
+    def test_expired_connection_is_discarded(self, app):
+        """Test that connections past max_lifetime are closed on release."""
+        pool = ConnectionPool(app.config['DATABASE_URL'], max_size=1, max_lifetime=0)
+        try:
+            conn = pool.acquire()
+            pool.release(conn)
+            
+            assert conn.closed
+            assert pool.stats()['size'] == 0
+        finally:
+            pool.close()
+    
+    def test_open_transaction_rolled_back_on_release(self, pool):
+        """Test that uncommitted work is not leaked to the next borrower."""
+        conn = pool.acquire()
+        cursor = conn.cursor()
+        cursor.execute("CREATE TEMP TABLE pool_probe (x INTEGER)")
+        pool.release(conn)
+        
+        conn = pool.acquire()
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('pg_temp.pool_probe') AS t")
+        assert cursor.fetchone()['t'] is None
+        pool.release(conn)
+
+
+class TestRequestSession:
+    """Tests for the app-context scoped unit of work behind get_db()."""
+    
+    def _count_workers(self, pool):
+        conn = pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) AS n FROM worker")
+            return cursor.fetchone()['n']
+        finally:
+            pool.release(conn)
+    
+    def test_blocks_share_one_connection(self, app):
+        """Test that get_db() blocks in one app context reuse the connection."""
+        with app.app_context():
+            with get_db() as first:
+                pass
+            with get_db() as second:
+                pass
+        
+        assert first is second
+    
+    def test_commit_deferred_to_end_of_context(self, app, clean_db, pool):
+        """Test that writes are committed once, when the app context ends."""
+        committed = []
+        
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO worker (name, org, type) VALUES ('A', 'Sales', 'Employee')"
+                )
+                on_commit(lambda: committed.append(True))
+            
+            assert self._count_workers(pool) == 0
+            assert committed == []
+        
+        assert self._count_workers(pool) == 1
+        assert committed == [True]
+    
+    def test_error_rolls_back_unit_of_work(self, app, clean_db, pool):
+        """Test that an error in any block discards the earlier writes too."""
+        committed = []
+        
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO worker (name, org, type) VALUES ('A', 'Sales', 'Employee')"
+                )
+                on_commit(lambda: committed.append(True))
+            
+            with pytest.raises(RuntimeError):
+                with get_db() as conn:
+                    raise RuntimeError("boom")
+        
+        assert self._count_workers(pool) == 0
+        assert committed == []
+    
+    def test_request_commits_before_response(self, client, clean_db, pool):
+        """Test that a write request is visible once the response is returned."""
+        response = client.post('/api/workers', json={
+            'name': 'John Doe',
+            'org': 'Sales',
+            'type': 'Employee',
+            'res_start': '2024-01-01'
+        })
+        
+        assert response.status_code == 201
+        assert self._count_workers(pool) == 1
+
+
+def test_pool_stats_endpoint(client):
+    """Test GET /api/db/pool-stats."""
+    response = client.get('/api/db/pool-stats')
+    
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['max_size'] >= data['size'] >= data['idle']
+    assert data['acquired'] >= 1
+
+
+class TestStreamRows:
+    """Tests for stream_rows."""
+    
+    def test_yields_all_rows_in_batches(self, app):
+        """Test that every row arrives with a batch smaller than the result."""
+        rows = stream_rows("SELECT g AS n FROM generate_series(1, 5) g ORDER BY g", batch_size=2)
+        
+        assert [row['n'] for row in rows] == [1, 2, 3, 4, 5]
+    
+    def test_connection_returned_when_closed_early(self, app):
+        """Test that abandoning a stream returns its connection to the pool."""
+        in_use = get_pool_stats()['in_use']
+        rows = stream_rows("SELECT g AS n FROM generate_series(1, 100) g", batch_size=10)
+        
+        assert next(rows)['n'] == 1
+        assert get_pool_stats()['in_use'] == in_use + 1
+        rows.close()
+        assert get_pool_stats()['in_use'] == in_use
+
+
+class TestMigrations:
+    """Tests for the schema migration runner."""
+    
+    def test_all_migrations_applied(self, app):
+        """Test that create_schema leaves the schema at the latest version."""
+        with app.app_context():
+            assert get_schema_version() == max(m[0] for m in MIGRATIONS)
+    
+    def test_migrations_are_idempotent(self, app):
+        """Test that re-running create_schema applies nothing new."""
+        with app.app_context():
+            create_schema()
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) AS n FROM schema_version")
+                assert cursor.fetchone()['n'] == len(MIGRATIONS)
+    
+    def test_single_open_version_per_rid_enforced(self, app, clean_db):
+        """Test that a second open version of a RID is rejected."""
+        import psycopg2
+        from datetime import date, datetime
+        from app.models import INFINITY_DATE, INFINITY_DATETIME
+        
+        with app.app_context():
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO worker (name, org, type) VALUES ('A', 'Sales', 'Employee') RETURNING WID"
+                )
+                wid = cursor.fetchone()['wid']
+                row = (wid, date(2024, 1, 1), INFINITY_DATE, datetime(2024, 1, 1), INFINITY_DATETIME)
+                cursor.execute(
+                    """INSERT INTO resource (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                       VALUES (1, 1, %s, %s, %s, %s, %s)""", row
+                )
+                with pytest.raises(psycopg2.IntegrityError):
+                    cursor.execute(
+                        """INSERT INTO resource (RID, version, WID, res_start, res_end, proc_start, proc_end)
+                           VALUES (1, 2, %s, %s, %s, %s, %s)""", row
+                    )
+                conn.rollback()
+    
+    def test_period_columns_follow_bounds(self, app, clean_db):
+        """Test that the generated periods are half-open [start, end) ranges."""
+        from datetime import date
+        from app.services import ResourceService
+        
+        with app.app_context():
+            wid, rid, version = ResourceService.create_worker_and_resource(
+                'A', 'Sales', 'Employee', date(2024, 1, 1)
+            )
+            ResourceService.update_resource(rid, res_end=date(2024, 7, 1))
+            
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT version,
+                              business_period @> DATE '2024-06-30' AS in_business,
+                              business_period @> DATE '2024-07-01' AS at_res_end,
+                              upper(processing_period) = proc_end AS proc_upper
+                       FROM resource WHERE RID = %s ORDER BY version""",
+                    (rid,)
+                )
+                rows = cursor.fetchall()
+        
+        assert [r['version'] for r in rows] == [1, 2]
+        assert all(r['in_business'] for r in rows)
+        assert rows[1]['at_res_end'] is False
+        assert all(r['proc_upper'] for r in rows)
+    
+    def test_writes_bump_data_version(self, app, clean_db):
+        """Test that inserts, truncates and rolled-back writes move the data version as committed."""
+        def version():
+            with app.app_context():
+                return get_data_version()[0]
+        
+        before = version()
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute("INSERT INTO worker_type (type) VALUES ('Bump') ON CONFLICT DO NOTHING")
+        assert version() > before
+        
+        before = version()
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute("TRUNCATE TABLE resource, worker RESTART IDENTITY CASCADE")
+        assert version() > before
+        
+        before = version()
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute("INSERT INTO worker_type (type) VALUES ('Rolled back')")
+                conn.rollback()
+        assert version() == before
+        
+        with app.app_context():
+            with get_db() as conn:
+                conn.cursor().execute("DELETE FROM worker_type WHERE type = 'Bump'")
+        assert version() > before
+    
+    def test_deferred_bump_applied_at_commit(self, app, clean_db):
+        """Test that a resource write leaves the data version unlocked and unchanged until its unit of work commits."""
+        def version_locked(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT version FROM data_version FOR UPDATE NOWAIT")
+            except psycopg2.errors.LockNotAvailable:
+                return True
+            finally:
+                conn.rollback()
+            return False
+        
+        with app.app_context():
+            before = get_data_version()[0]
+        other = psycopg2.connect(app.config['DATABASE_URL'])
+        try:
+            with app.app_context():
+                ResourceService.create_worker_and_resource('A', 'Sales', 'Employee', date(2024, 1, 1))
+                with get_db() as conn:
+                    conn.cursor().execute("INSERT INTO worker_type (type) VALUES ('Deferred')")
+                assert get_data_version()[0] == before
+                assert not version_locked(other)
+        finally:
+            other.close()
+        with app.app_context():
+            assert get_data_version()[0] == before + 1
+            with get_db() as conn:
+                conn.cursor().execute("DELETE FROM worker_type WHERE type = 'Deferred'")
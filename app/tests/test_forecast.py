@@ -0,0 +1,217 @@
+"""Tests for the vectorized forecast engine and endpoint."""
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+from hypothesis import given, settings, strategies as st
+from app.forecast import date_points, forecast_evolution, headcount_at
+
+
+class TestDatePoints:
+    """Tests for date_points."""
+    
+    def test_daily(self):
+        """Test that daily points include both ends."""
+        points = date_points(date(2024, 2, 27), date(2024, 3, 1), 'daily')
+        assert points.astype(str).tolist() == ['2024-02-27', '2024-02-28', '2024-02-29', '2024-03-01']
+    
+    def test_weekly(self):
+        """Test that weekly points step 7 days from start."""
+        points = date_points(date(2024, 1, 3), date(2024, 1, 24), 'weekly')
+        assert points.astype(str).tolist() == ['2024-01-03', '2024-01-10', '2024-01-17', '2024-01-24']
+    
+    def test_monthly(self):
+        """Test that monthly points are month starts within the range."""
+        points = date_points(date(2024, 1, 15), date(2024, 4, 1), 'monthly')
+        assert points.astype(str).tolist() == ['2024-02-01', '2024-03-01', '2024-04-01']
+    
+    def test_invalid_granularity(self):
+        """Test that unknown granularities are rejected."""
+        with pytest.raises(ValueError):
+            date_points(date(2024, 1, 1), date(2024, 2, 1), 'hourly')
+
+
+# Feature: worker-resource-tracking, Vectorized headcount matches per-date counting
+@settings(max_examples=100, deadline=None)
+@given(
+    periods=st.lists(
+        st.tuples(
+            st.dates(min_value=date(2020, 1, 1), max_value=date(2025, 12, 31)),
+            st.integers(min_value=0, max_value=800)
+        ),
+        max_size=30
+    ),
+    dates=st.lists(st.dates(min_value=date(2019, 1, 1), max_value=date(2028, 12, 31)), max_size=20)
+)
+def test_headcount_at_matches_per_date_count(periods, dates):
+    """
+    For any set of [res_start, res_end) periods and dates, headcount_at SHALL
+    equal the number of periods with res_start <= date < res_end.
+    """
+    starts = [start for start, _ in periods]
+    ends = [start + timedelta(days=length) for start, length in periods]
+    
+    counts = headcount_at(
+        np.array(starts, dtype='datetime64[D]'),
+        np.array(ends, dtype='datetime64[D]'),
+        np.array(dates, dtype='datetime64[D]')
+    )
+    
+    expected = [sum(1 for s, e in zip(starts, ends) if s <= d < e) for d in dates]
+    assert counts.tolist() == expected
+
+
+# Feature: worker-resource-tracking, Forecast evolution sweep matches per-time counting
+@settings(max_examples=100, deadline=None)
+@given(
+    versions=st.lists(
+        st.tuples(
+            st.integers(min_value=0, max_value=60),                           # res_start offset (days)
+            st.integers(min_value=0, max_value=60),                           # business length (days)
+            st.integers(min_value=0, max_value=48),                           # proc_start offset (hours)
+            st.one_of(st.none(), st.integers(min_value=0, max_value=48))      # processing length (hours)
+        ),
+        max_size=30
+    ),
+    date_offsets=st.lists(st.integers(min_value=-5, max_value=130), min_size=1, max_size=8),
+    time_offsets=st.lists(st.integers(min_value=-5, max_value=100), min_size=1, max_size=8)
+)
+def test_forecast_evolution_matches_per_time_count(versions, date_offsets, time_offsets):
+    """
+    For any versions, dates and processing times, forecast_evolution SHALL
+    count at (t, d) the versions with proc_start <= t < proc_end and
+    res_start <= d < res_end.
+    """
+    base_day = date(2024, 1, 1)
+    base_time = datetime(2024, 1, 1)
+    rows = []
+    for res_offset, res_length, proc_offset, proc_length in versions:
+        proc_start = base_time + timedelta(hours=proc_offset)
+        proc_end = datetime(9999, 12, 31, 23, 59) if proc_length is None else proc_start + timedelta(hours=proc_length)
+        res_start = base_day + timedelta(days=res_offset)
+        rows.append((res_start, res_start + timedelta(days=res_length), proc_start, proc_end))
+    dates = sorted({base_day + timedelta(days=o) for o in date_offsets})
+    times = sorted({base_time + timedelta(hours=o) for o in time_offsets})
+    
+    counts = forecast_evolution(
+        np.array([r[0] for r in rows], dtype='datetime64[D]'),
+        np.array([r[1] for r in rows], dtype='datetime64[D]'),
+        np.array([r[2] for r in rows], dtype='datetime64[us]'),
+        np.array([r[3] for r in rows], dtype='datetime64[us]'),
+        np.array(dates, dtype='datetime64[D]'),
+        np.array(times, dtype='datetime64[us]')
+    )
+    
+    expected = [
+        [sum(1 for s, e, ps, pe in rows if ps <= t < pe and s <= d < e) for d in dates]
+        for t in times
+    ]
+    assert counts.tolist() == expected
+
+
+class TestForecastSeriesEndpoint:
+    """Tests for GET /api/forecast/<org_name> endpoint."""
+    
+    def test_forecast_series_daily(self, client, budget_data):
+        """Test daily counts across a hire and an end date."""
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-02'
+        })
+        rid = client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-01-03'})
+        
+        response = client.get('/api/forecast/All?start=2024-01-01&end=2024-01-04&granularity=daily')
+        
+        assert response.status_code == 200
+        assert [p['value'] for p in response.get_json()] == [1, 2, 1, 1]
+        
+        response = client.get('/api/forecast/Sales?start=2024-01-01&end=2024-01-04&granularity=daily')
+        assert [p['value'] for p in response.get_json()] == [0, 1, 1, 1]
+    
+    def test_forecast_series_matches_budget_dates(self, client, budget_data):
+        """Test that monthly points agree with the forecast-budget series."""
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-15'
+        })
+        
+        series = client.get('/api/forecast/All?start=2024-01-01&end=2024-03-01').get_json()
+        forecast = client.get('/api/forecast-budget/All').get_json()['forecast']
+        
+        assert series == forecast
+    
+    def test_forecast_series_bad_parameters(self, client):
+        """Test errors for missing, invalid or reversed parameters."""
+        assert client.get('/api/forecast/All?start=2024-01-01').status_code == 400
+        assert client.get('/api/forecast/All?start=2024-01-01&end=2024-02-01&granularity=hourly').status_code == 400
+        assert client.get('/api/forecast/All?start=bad&end=2024-02-01').status_code == 400
+        assert client.get('/api/forecast/All?start=2024-02-01&end=2024-01-01').status_code == 400
+
+
+class TestForecastEvolutionEndpoint:
+    """Tests for GET /api/forecast/<org_name>/evolution endpoint."""
+    
+    def test_evolution_matches_as_of_series(self, client, budget_data):
+        """Test each processing time against the headcount series as of that time."""
+        t0 = datetime.now().isoformat()
+        rid = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-15'
+        }).get_json()['RID']
+        t1 = datetime.now().isoformat()
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        })
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        t2 = datetime.now().isoformat()
+        
+        response = client.get(
+            f'/api/forecast/All/evolution?start=2024-01-01&end=2024-04-01'
+            f'&processing_datetime={t2}&processing_datetime={t0}&processing_datetime={t1}'
+        )
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [entry['processing_datetime'] for entry in data] == [t0, t1, t2]
+        for entry in data:
+            series = client.get(
+                '/api/headcount/series?start=2024-01-01&end=2024-04-01&granularity=monthly'
+                f"&org=All&processing_datetime={entry['processing_datetime']}"
+            ).get_json()
+            assert entry['forecast'] == series
+        assert [[p['value'] for p in entry['forecast']] for entry in data] == [
+            [0, 0, 0, 0],
+            [0, 1, 1, 1],
+            [0, 2, 1, 1],
+        ]
+    
+    def test_evolution_processing_range(self, client, budget_data):
+        """Test processing times generated from from, to and step_days."""
+        response = client.get(
+            '/api/forecast/Sales/evolution?date=2024-02-01'
+            '&from=2024-01-01T00:00:00&to=2024-01-03T00:00:00&step_days=1'
+        )
+        
+        assert response.status_code == 200
+        assert [entry['processing_datetime'] for entry in response.get_json()] == [
+            '2024-01-01T00:00:00', '2024-01-02T00:00:00', '2024-01-03T00:00:00'
+        ]
+    
+    def test_evolution_bad_parameters(self, client):
+        """Test errors for missing or invalid parameters."""
+        assert client.get('/api/forecast/All/evolution?date=2024-01-01').status_code == 400
+        assert client.get('/api/forecast/All/evolution?processing_datetime=2024-01-01T00:00:00').status_code == 400
+        assert client.get(
+            '/api/forecast/All/evolution?date=bad&processing_datetime=2024-01-01T00:00:00'
+        ).status_code == 400
+        assert client.get(
+            '/api/forecast/All/evolution?date=2024-01-01&from=2024-01-01T00:00:00&to=2030-01-01T00:00:00&step_days=0.001'
+        ).status_code == 400
+        for step_days in ('inf', 'nan', '1e20'):
+            assert client.get(
+                '/api/forecast/All/evolution?date=2024-01-01&from=2024-01-01T00:00:00'
+                f'&to=2024-01-02T00:00:00&step_days={step_days}'
+            ).status_code == 400
+        assert client.get(
+            '/api/forecast/All/evolution?start=2000-01-01&end=2030-01-01&granularity=daily'
+            '&processing_datetime=2024-01-01T00:00:00'
+        ).status_code == 400
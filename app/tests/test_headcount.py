@@ -0,0 +1,153 @@
+"""Tests for the headcount index and endpoint."""
+import pytest
+from datetime import date, datetime
+from app.headcount import HeadcountIndex, reset_headcount_index
+from app.models import INFINITY_DATE
+
+
+class TestHeadcountIndex:
+    """Tests for HeadcountIndex."""
+    
+    def test_counts_half_open_periods(self):
+        """Test that a resource counts from res_start up to, not including, res_end."""
+        index = HeadcountIndex()
+        index.add('Sales', 'Employee', date(2024, 1, 1), date(2024, 3, 1))
+        
+        assert index.counts([date(2023, 12, 31), date(2024, 1, 1), date(2024, 2, 29),
+                             date(2024, 3, 1)]) == [0, 1, 1, 0]
+    
+    def test_filters_by_org_and_type(self):
+        """Test org and type restrictions."""
+        index = HeadcountIndex()
+        index.add('Sales', 'Employee', date(2024, 1, 1), INFINITY_DATE)
+        index.add('Sales', 'Consultant - T&M', date(2024, 1, 1), INFINITY_DATE)
+        index.add('Marketing', 'Employee', date(2024, 1, 1), INFINITY_DATE)
+        
+        on = date(2024, 6, 1)
+        assert index.count(on) == 3
+        assert index.count(on, orgs={'Sales'}) == 2
+        assert index.count(on, types={'Employee'}) == 2
+        assert index.count(on, orgs={'Sales'}, types={'Employee'}) == 1
+    
+    def test_remove_reverts_add(self):
+        """Test that removing a period after adding leaves no headcount."""
+        index = HeadcountIndex()
+        index.add('Sales', 'Employee', date(2024, 1, 1), INFINITY_DATE)
+        index.add('Sales', 'Employee', date(2024, 2, 1), date(2024, 4, 1))
+        index.remove('Sales', 'Employee', date(2024, 1, 1), INFINITY_DATE)
+        
+        assert index.counts([date(2024, 1, 15), date(2024, 3, 1), date(2024, 5, 1)]) == [0, 1, 0]
+
+
+@pytest.fixture(params=[False, True], ids=['sql', 'index'])
+def headcount_engine(request, app):
+    """Run a test against both the SQL and in-memory headcount paths."""
+    app.config['HEADCOUNT_INDEX'] = request.param
+    reset_headcount_index()
+    yield request.param
+    app.config['HEADCOUNT_INDEX'] = False
+    reset_headcount_index()
+
+
+class TestHeadcountEndpoint:
+    """Tests for GET /api/headcount endpoint."""
+    
+    def test_headcount_tracks_writes(self, client, clean_db, headcount_engine):
+        """Test counts before and after creates and updates."""
+        # Load the index (when enabled) before any writes so they apply incrementally
+        client.get('/api/headcount?date=2024-01-01')
+        
+        rid = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        }).get_json()['RID']
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        })
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        
+        response = client.get(
+            '/api/headcount?date=2024-01-15&date=2024-02-15&date=2024-03-15'
+        )
+        assert response.status_code == 200
+        assert [p['value'] for p in response.get_json()] == [1, 2, 1]
+        
+        response = client.get('/api/headcount?date=2024-02-15&org=Sales')
+        assert response.get_json() == [{'date': '2024-02-15', 'value': 1}]
+    
+    def test_headcount_invalid_date(self, client):
+        """Test error for an invalid date."""
+        response = client.get('/api/headcount?date=not-a-date')
+        
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+    
+    def test_forecast_budget_matches_across_engines(self, client, budget_data, headcount_engine):
+        """Test that the forecast series is the same with and without the index."""
+        client.get('/api/headcount')
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-01'
+        })
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Employee', 'res_start': '2024-02-01'
+        })
+        
+        data = client.get('/api/forecast-budget/All').get_json()
+        
+        assert [p['value'] for p in data['forecast']] == [1, 2, 2]
+
+
+class TestHeadcountSeriesEndpoint:
+    """Tests for GET /api/headcount/series endpoint."""
+    
+    def test_series_matches_as_of_counts(self, client, clean_db):
+        """Test that each point equals the number of as-of rows on that date."""
+        rid = client.post('/api/workers', json={
+            'name': 'A', 'org': 'Sales', 'type': 'Employee', 'res_start': '2024-01-02'
+        }).get_json()['RID']
+        client.post('/api/workers', json={
+            'name': 'B', 'org': 'Marketing', 'type': 'Consultant - T&M', 'res_start': '2024-01-04'
+        })
+        before_update = datetime.now().isoformat()
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-01-05'})
+        
+        for processing in (before_update, datetime.now().isoformat()):
+            response = client.get(
+                f'/api/headcount/series?start=2024-01-01&end=2024-01-07&processing_datetime={processing}'
+            )
+            assert response.status_code == 200
+            series = response.get_json()
+            assert len(series) == 7
+            for point in series:
+                rows = client.get(
+                    f"/api/resources/as-of?business_date={point['date']}&processing_datetime={processing}"
+                ).get_json()
+                assert point['value'] == len(rows)
+        
+        assert [p['value'] for p in series] == [0, 1, 1, 2, 1, 1, 1]
+        
+        response = client.get('/api/headcount/series?start=2024-01-01&end=2024-01-07&type=Employee')
+        assert [p['value'] for p in response.get_json()] == [0, 1, 1, 1, 0, 0, 0]
+        response = client.get('/api/headcount/series?start=2024-01-01&end=2024-01-15&granularity=weekly&org=Marketing')
+        assert response.get_json() == [
+            {'date': '2024-01-01', 'value': 0},
+            {'date': '2024-01-08', 'value': 1},
+            {'date': '2024-01-15', 'value': 1},
+        ]
+    
+    def test_series_counts_org_without_org_row(self, client, clean_db):
+        """Test that an org missing from the org table is counted like /api/headcount does."""
+        client.post('/api/workers', json={
+            'name': 'A', 'org': 'Finance', 'type': 'Employee', 'res_start': '2024-01-01'
+        })
+        
+        series = client.get('/api/headcount/series?start=2024-01-01&end=2024-01-01&org=Finance')
+        headcount = client.get('/api/headcount?date=2024-01-01&org=Finance')
+        assert [p['value'] for p in series.get_json()] == [1]
+        assert [p['value'] for p in headcount.get_json()] == [1]
+    
+    def test_series_bad_parameters(self, client):
+        """Test errors for missing, invalid or reversed parameters."""
+        assert client.get('/api/headcount/series?start=2024-01-01').status_code == 400
+        assert client.get('/api/headcount/series?start=2024-01-01&end=2024-02-01&granularity=hourly').status_code == 400
+        assert client.get('/api/headcount/series?start=2024-01-01&end=2024-02-01&processing_datetime=bad').status_code == 400
+        assert client.get('/api/headcount/series?start=2024-02-01&end=2024-01-01').status_code == 400
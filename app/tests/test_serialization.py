@@ -0,0 +1,128 @@
+"""Tests for JSON serialization of resource rows."""
+import csv
+import io
+import json
+import pytest
+from datetime import date, datetime
+from app import serialization
+from app.serialization import (
+    RESOURCE_FIELDS,
+    ResourceEncoder,
+    UnsupportedFormatError,
+    resource_columns
+)
+from app.models import INFINITY_DATE, INFINITY_DATETIME
+
+
+ROWS = [
+    (1, 2, 3, 'Zoë "Z" Smith', 'Sales', 'Employee', date(2024, 1, 1), INFINITY_DATE,
+     datetime(2024, 1, 1, 9, 30, 0, 123456), INFINITY_DATETIME),
+    (4, 1, 5, 'B', 'Marketing', 'Contractor', date(2024, 2, 1), date(2024, 3, 1),
+     datetime(2024, 2, 1), datetime(2024, 2, 2, 8, 0)),
+]
+
+
+def _expected(row, fields=RESOURCE_FIELDS):
+    values = dict(zip(RESOURCE_FIELDS, row))
+    return {
+        field: values[field].isoformat() if hasattr(values[field], 'isoformat') else values[field]
+        for field in fields
+    }
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder_backend(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the json fallback."""
+    if request.param == 'orjson' and serialization.orjson is None:
+        pytest.skip('orjson is not installed')
+    if request.param == 'json':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+
+class TestResourceEncoder:
+    """Tests for ResourceEncoder."""
+    
+    def test_tuples_and_mappings_encode_alike(self, encoder_backend):
+        """Test that tuple and dict rows give the same ISO 8601 JSON."""
+        columns = resource_columns()
+        dicts = [dict(zip(columns, row)) for row in ROWS]
+        encoder = ResourceEncoder(columns=columns)
+        
+        assert encoder.encode(ROWS) == encoder.encode(dicts)
+        assert json.loads(encoder.encode(ROWS)) == [_expected(row) for row in ROWS]
+    
+    def test_projection_of_paged_tuples(self, encoder_backend):
+        """Test that rid and version selected for paging are left out of the response."""
+        columns = resource_columns(['name'], paged=True)
+        assert columns == ['rid', 'version', 'name']
+        rows = [(row[0], row[1], row[3]) for row in ROWS]
+        
+        encoded = ResourceEncoder(['name'], columns).encode(rows)
+        assert json.loads(encoded) == [{'name': row[3]} for row in ROWS]
+    
+    def test_iter_encode_matches_encode(self, encoder_backend):
+        """Test chunked JSON array and NDJSON output."""
+        encoder = ResourceEncoder(columns=resource_columns())
+        rows = ROWS * 3
+        
+        assert b''.join(encoder.iter_encode(rows, chunk_rows=4)) == encoder.encode(rows)
+        assert b''.join(encoder.iter_encode([], chunk_rows=4)) == b'[]'
+        lines = b''.join(encoder.iter_encode(rows, 'ndjson', chunk_rows=4)).splitlines()
+        assert [json.loads(line) for line in lines] == [_expected(row) for row in rows]
+    
+    def test_columns_and_csv(self):
+        """Test the column-oriented JSON shape and CSV with ISO dates."""
+        encoder = ResourceEncoder(['RID', 'name', 'res_start'], resource_columns())
+        
+        assert json.loads(encoder.encode_columns(ROWS)) == {
+            'RID': [1, 4], 'name': [ROWS[0][3], 'B'], 'res_start': ['2024-01-01', '2024-02-01']
+        }
+        assert json.loads(encoder.encode_columns([])) == {'RID': [], 'name': [], 'res_start': []}
+        
+        text = b''.join(encoder.iter_encode(ROWS, 'csv', chunk_rows=1)).decode()
+        assert list(csv.reader(io.StringIO(text))) == [
+            ['RID', 'name', 'res_start'], ['1', ROWS[0][3], '2024-01-01'], ['4', 'B', '2024-02-01']
+        ]
+    
+    def test_arrow_and_parquet_types(self):
+        """Test that Arrow and Parquet carry int32, string, date32 and timestamp[us] columns."""
+        pyarrow = pytest.importorskip('pyarrow')
+        import pyarrow.ipc
+        import pyarrow.parquet
+        encoder = ResourceEncoder(columns=resource_columns())
+        rows = ROWS * 3
+        
+        chunks = list(encoder.iter_encode(rows, 'arrow', chunk_rows=2))
+        table = pyarrow.ipc.open_stream(b''.join(chunks)).read_all()
+        assert len(chunks) > 2
+        assert table.schema.field('RID').type == pyarrow.int32()
+        assert table.schema.field('res_end').type == pyarrow.date32()
+        assert table.schema.field('proc_start').type == pyarrow.timestamp('us')
+        assert table.to_pylist() == [dict(zip(RESOURCE_FIELDS, row)) for row in rows]
+        
+        table = pyarrow.parquet.read_table(io.BytesIO(b''.join(encoder.iter_encode(rows, 'parquet', 2))))
+        assert table.num_rows == len(rows)
+        assert table.column('proc_end').to_pylist()[0] == ROWS[0][9]
+        
+        empty = pyarrow.parquet.read_table(io.BytesIO(b''.join(encoder.iter_encode([], 'parquet'))))
+        assert empty.num_rows == 0
+    
+    def test_arrow_formats_need_pyarrow(self, monkeypatch):
+        """Test that Arrow output without pyarrow raises UnsupportedFormatError."""
+        monkeypatch.setattr(serialization, 'pyarrow', None)
+        
+        with pytest.raises(UnsupportedFormatError):
+            ResourceEncoder().iter_encode(ROWS, 'parquet')
+
+
+class TestBenchSerializationCommand:
+    """Tests for the bench-serialization CLI command."""
+    
+    def test_runs_every_case(self, app, encoder_backend):
+        """Test that the benchmark encodes with each path and reports its throughput."""
+        result = app.test_cli_runner().invoke(args=['bench-serialization', '--rows', '100'])
+        
+        assert result.exit_code == 0, result.output
+        assert 'ndjson stream' in result.output
+        assert result.output.count('rows/s') == 4
@@ -0,0 +1,128 @@
+"""Tests for the columnar resource snapshot."""
+import time
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from app.database import get_connection, release_connection
+from app.snapshot import ResourceSnapshot, reset_resource_snapshot
+
+
+def _refresh(snapshot):
+    conn = get_connection()
+    try:
+        return snapshot.refresh(conn)
+    finally:
+        conn.rollback()
+        release_connection(conn)
+
+
+def _create(client, name, org, res_start):
+    return client.post('/api/workers', json={
+        'name': name, 'org': org, 'type': 'Employee', 'res_start': res_start
+    }).get_json()['RID']
+
+
+class TestResourceSnapshot:
+    """Tests for ResourceSnapshot."""
+    
+    def test_incremental_refresh_reads_only_changed_versions(self, app, client, clean_db):
+        """Test that a refresh after an update reads the closed and the new version only."""
+        rid = _create(client, 'A', 'Sales', '2024-01-01')
+        _create(client, 'B', 'Marketing', '2024-02-01')
+        
+        with app.app_context():
+            snapshot = ResourceSnapshot()
+            snapshot.REFRESH_OVERLAP = 0
+            assert _refresh(snapshot) == 2
+            
+            client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+            assert _refresh(snapshot) == 2
+            assert _refresh(snapshot) == 0
+        
+        assert len(snapshot) == 3
+        assert sorted((r['rid'], r['version']) for r in snapshot.open_records()) == [(1, 2), (2, 1)]
+        
+        updated_at = next(r['proc_start'] for r in snapshot.open_records() if r['rid'] == rid)
+        before = snapshot.as_of(date(2024, 6, 1), updated_at - timedelta(microseconds=1))
+        assert [r['version'] for r in before if r['rid'] == rid] == [1]
+        assert [r for r in snapshot.as_of(date(2024, 6, 1), updated_at) if r['rid'] == rid] == []
+    
+    def test_offset_aware_processing_time_is_local(self, app, client, clean_db, monkeypatch):
+        """Test that an offset-aware processing time is read as local time, not UTC."""
+        rid = _create(client, 'A', 'Sales', '2024-01-01')
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        with app.app_context():
+            snapshot = ResourceSnapshot()
+            _refresh(snapshot)
+        updated_at = next(r['proc_start'] for r in snapshot.open_records())
+        
+        monkeypatch.setenv('TZ', 'America/New_York')
+        time.tzset()
+        try:
+            for t in (updated_at - timedelta(microseconds=1), updated_at):
+                aware = t.astimezone(timezone(timedelta(hours=5)))
+                assert snapshot.as_of(date(2024, 2, 15), aware) == snapshot.as_of(date(2024, 2, 15), t)
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+    
+    def test_filters_by_org_and_type_codes(self, app, client, clean_db):
+        """Test headcount restricted to dictionary-encoded orgs and types."""
+        _create(client, 'A', 'Sales', '2024-01-01')
+        _create(client, 'B', 'Marketing', '2024-02-01')
+        
+        with app.app_context():
+            snapshot = ResourceSnapshot()
+            _refresh(snapshot)
+        
+        dates = [date(2024, 1, 15), date(2024, 2, 15)]
+        assert snapshot.headcount(dates) == [1, 2]
+        assert snapshot.headcount(dates, orgs={'Marketing'}) == [0, 1]
+        assert snapshot.headcount(dates, orgs={'Unknown'}) == [0, 0]
+        assert snapshot.headcount(dates, types={'Employee'}) == [1, 2]
+
+
+@pytest.fixture(params=[False, True], ids=['sql', 'snapshot'])
+def snapshot_engine(request, app):
+    """Run a test with and without the resource snapshot."""
+    app.config['RESOURCE_SNAPSHOT'] = request.param
+    reset_resource_snapshot()
+    yield request.param
+    app.config['RESOURCE_SNAPSHOT'] = False
+    reset_resource_snapshot()
+
+
+class TestSnapshotEndpoints:
+    """Tests that read endpoints agree with and without the snapshot."""
+    
+    def test_reads_match_sql(self, app, client, clean_db, snapshot_engine):
+        """Test open, active, as-of and headcount reads against the SQL path."""
+        # Load the snapshot (when enabled) before any writes so they arrive by refresh
+        client.get('/api/resources/open')
+        
+        rid = _create(client, 'A', 'Sales', '2024-01-01')
+        _create(client, 'B', 'Marketing', date.today().isoformat())
+        client.put(f'/api/resources/{rid}', json={'res_end': '2024-03-01'})
+        
+        times = sorted({r['proc_start'] for r in client.get('/api/resources/open').get_json()})
+        urls = ['/api/resources/open', '/api/resources/open?limit=1', '/api/resources/active',
+                '/api/resources/open?org=Sales&name_prefix=A&fields=RID,version,name',
+                '/api/headcount?date=2024-01-15&date=2024-04-01&org=Sales']
+        urls += [
+            f'/api/resources/as-of?business_date=2024-02-15&processing_datetime={t}' for t in times
+        ]
+        urls += [
+            '/api/resources/as-of?business_date=2024-02-15&processing_datetime=' + datetime.fromisoformat(t)
+            .astimezone(timezone(timedelta(hours=5))).isoformat().replace('+', '%2B')
+            for t in times
+        ]
+        
+        def fetch(enabled):
+            app.config['RESOURCE_SNAPSHOT'] = enabled
+            responses = [client.get(url).get_json() for url in urls]
+            return [
+                sorted(body, key=lambda r: (r['RID'], r['version'])) if body and 'RID' in body[0] else body
+                for body in responses
+            ]
+        
+        assert fetch(snapshot_engine) == fetch(False)
+        assert len(client.get('/api/resources/open').get_json()) == 2
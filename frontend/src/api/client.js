@@ -59,6 +59,21 @@ export async function getOpenResourceRecords() {
   return handleResponse(response);
 }
 
+/**
+ * Get one page of open resource records in (RID, version) order.
+ * Resolves to { records, nextCursor }; nextCursor is null on the last page.
+ */
+export async function getOpenResourceRecordsPage(cursor = null, limit = 500) {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) {
+    params.append('cursor', cursor);
+  }
+  
+  const response = await fetch(`${API_BASE_URL}/resources/open?${params}`);
+  const records = await handleResponse(response);
+  return { records, nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
 /**
  * Execute a bi-temporal as-of query
  */
@@ -95,3 +110,15 @@ export async function getForecastBudgetData(orgName) {
   const response = await fetch(`${API_BASE_URL}/forecast-budget/${encodeURIComponent(orgName)}`);
   return handleResponse(response);
 }
+
+/**
+ * Get forecast and budget time series data for several organizations in one call.
+ * Pass null to get every organization. Resolves to an object keyed by org name.
+ */
+export async function getForecastBudgetDataBatch(orgNames = null) {
+  const params = new URLSearchParams();
+  (orgNames || []).forEach((name) => params.append('org', name));
+  const query = params.toString();
+  const response = await fetch(`${API_BASE_URL}/forecast-budget${query ? `?${query}` : ''}`);
+  return handleResponse(response);
+}
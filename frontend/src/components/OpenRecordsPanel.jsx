@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getOpenResourceRecords } from '../api/client';
+import { getOpenResourceRecordsPage } from '../api/client';
 import './ViewingPanel.css';
 
 /**
@@ -7,7 +7,9 @@ import './ViewingPanel.css';
  */
 function OpenRecordsPanel() {
   const [resources, setResources] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   /**
@@ -18,15 +20,16 @@ function OpenRecordsPanel() {
   }, []);
 
   /**
-   * Fetch open resource records from the API
+   * Fetch the first page of open resource records from the API
    */
   const fetchOpenRecords = async () => {
     setLoading(true);
     setError('');
     
     try {
-      const data = await getOpenResourceRecords();
-      setResources(data);
+      const { records, nextCursor: cursor } = await getOpenResourceRecordsPage();
+      setResources(records);
+      setNextCursor(cursor);
     } catch (err) {
       setError(`Error loading open resource records: ${err.message}`);
     } finally {
@@ -34,6 +37,24 @@ function OpenRecordsPanel() {
     }
   };
 
+  /**
+   * Append the next page of open resource records
+   */
+  const fetchMoreRecords = async () => {
+    setLoadingMore(true);
+    setError('');
+    
+    try {
+      const { records, nextCursor: cursor } = await getOpenResourceRecordsPage(nextCursor);
+      setResources((previous) => [...previous, ...records]);
+      setNextCursor(cursor);
+    } catch (err) {
+      setError(`Error loading open resource records: ${err.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   /**
    * Format date for display
    */
@@ -57,7 +78,7 @@ function OpenRecordsPanel() {
   return (
     <div className="panel viewing-panel">
       <div className="panel-header">
-        <h2>Open Resource Records {!loading && resources.length > 0 && `(${resources.length})`}</h2>
+        <h2>Open Resource Records {!loading && resources.length > 0 && `(${resources.length}${nextCursor ? '+' : ''})`}</h2>
         <button 
           onClick={fetchOpenRecords} 
           className="btn btn-refresh"
@@ -115,6 +136,15 @@ function OpenRecordsPanel() {
               ))}
             </tbody>
           </table>
+          {nextCursor && (
+            <button
+              onClick={fetchMoreRecords}
+              className="btn btn-refresh"
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>